@@ -0,0 +1,103 @@
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import faiss
+import numpy as np
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+
+from metadata_index import metadata_index_for, search_selected
+
+ScoredDocuments = List[Tuple[Document, float]]
+
+
+def embed_topics(vector_store: FAISS, topics: List[str]) -> np.ndarray:
+    """Embeds every topic with a single batched request to the store's embeddings."""
+    vectors = vector_store.embedding_function.embed_documents(topics)
+    return np.asarray(vectors, dtype=np.float32).reshape(len(topics), -1)
+
+
+def search_vectors(
+    vector_store: FAISS,
+    query_vectors: np.ndarray,
+    k: int,
+    score_threshold: Optional[float] = None,
+    filter: Optional[Dict[str, Any]] = None,
+    fetch_k: int = 20,
+) -> List[ScoredDocuments]:
+    """Runs one matrix search for all query vectors.
+
+    Scores are converted with the store's relevance function and filtered with
+    ``>= score_threshold``, the same semantics as
+    ``FAISS.similarity_search_with_relevance_scores``. Filters on fields of the
+    metadata index run inside FAISS and always return k hits when enough
+    documents match; other filters fall back to over-fetching ``fetch_k`` hits.
+    """
+    vectors = np.array(query_vectors, dtype=np.float32)
+    if vector_store._normalize_L2:
+        faiss.normalize_L2(vectors)
+
+    selected_ids = None
+    if filter is not None:
+        selected_ids = metadata_index_for(vector_store).select(filter)
+
+    filter_func = None
+    if selected_ids is not None:
+        distances, indices = search_selected(vector_store.index, vectors, k, selected_ids)
+    elif filter is not None:
+        distances, indices = vector_store.index.search(vectors, max(k, fetch_k))
+        filter_func = vector_store._create_filter_func(filter)
+    else:
+        distances, indices = vector_store.index.search(vectors, k)
+    relevance_score_fn = vector_store._select_relevance_score_fn()
+
+    results = []
+    for row_distances, row_indices in zip(distances, indices):
+        docs = []
+        for distance, i in zip(row_distances, row_indices):
+            if i == -1:
+                continue
+            doc = vector_store.docstore.search(vector_store.index_to_docstore_id[i])
+            if filter_func is not None and not filter_func(doc.metadata):
+                continue
+            score = relevance_score_fn(float(distance))
+            if score_threshold is not None and score < score_threshold:
+                continue
+            docs.append((doc, score))
+        results.append(docs[:k])
+    return results
+
+
+def search_many(
+    vector_stores: Dict[str, FAISS],
+    topics: List[str],
+    k: Union[int, Dict[str, int]],
+    score_threshold: Union[None, float, Dict[str, Optional[float]]] = None,
+) -> List[Dict[str, ScoredDocuments]]:
+    """Searches several topics in several vector stores at once.
+
+    Topics are embedded once per distinct embeddings object, so stores built
+    with the same model share a single batched embeddings request. Returns one
+    ``{store name: [(document, relevance score), ...]}`` dict per topic.
+    """
+    vectors_by_embeddings: Dict[int, np.ndarray] = {}
+    results: List[Dict[str, ScoredDocuments]] = [{} for _ in topics]
+    if not topics:
+        return results
+
+    for name, vector_store in vector_stores.items():
+        key = id(vector_store.embedding_function)
+        if key not in vectors_by_embeddings:
+            vectors_by_embeddings[key] = embed_topics(vector_store, topics)
+
+        store_k = k[name] if isinstance(k, dict) else k
+        store_threshold = (
+            score_threshold.get(name)
+            if isinstance(score_threshold, dict)
+            else score_threshold
+        )
+        matches = search_vectors(
+            vector_store, vectors_by_embeddings[key], store_k, store_threshold
+        )
+        for topic_results, docs in zip(results, matches):
+            topic_results[name] = docs
+    return results
@@ -5,7 +5,12 @@ from langchain_community.vectorstores import FAISS
 from langchain_openai import OpenAIEmbeddings
 import pandas as pd
 
-embeddings = OpenAIEmbeddings(model="text-embedding-3-large")
+from batch_search import embed_topics, search_vectors
+from embedding_cache import CachedEmbeddings
+from mmap_store import load_vector_store
+
+# Same SQLite cache as the RAG tools (set RAIA_EMBEDDING_CACHE to share one file).
+embeddings = CachedEmbeddings(OpenAIEmbeddings(model="text-embedding-3-large"))
 
 
 user_inputs = [
@@ -70,25 +75,22 @@ vector_store = FAISS(
     index_to_docstore_id={},
 )
 breakpoint()
-db = vector_store.load_local(
-    folder_path="artifacts/questions_faiss",
-    embeddings=embeddings,
-    allow_dangerous_deserialization=True,
-)
+db = load_vector_store("artifacts/questions_faiss", embeddings)
 
 questions_dict = {'input': [], 'output': []}
-for user_input in user_inputs:
 
-    documents = db.similarity_search(
-        query=user_input,
-        k=3,
-        filter={"university": "ENEM"},
-    )
-    # add prints
-    
+# One batched embeddings request and one matrix search for all user inputs.
+query_vectors = embed_topics(db, user_inputs)
+results = search_vectors(
+    db,
+    query_vectors,
+    k=3,
+    filter={"university": "ENEM"},
+)
+for user_input, documents in zip(user_inputs, results):
     question = "No relevant document found."
     if documents:
-        question = documents[0].page_content
+        question = documents[0][0].page_content
     # breakpoint()
     print(f"User input: {user_input}")
     print(f"Documents found: {question}")
@@ -96,6 +98,7 @@ for user_input in user_inputs:
     questions_dict['output'].append(question)
     # breakpoint()
 
+print(f"Embedding cache: {embeddings.stats()}")
 
 questions_df = pd.DataFrame.from_dict(questions_dict)
 print("DataFrame from column-oriented dictionary:")
@@ -0,0 +1,139 @@
+import weakref
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import faiss
+import numpy as np
+from langchain_community.vectorstores import FAISS
+
+from mmap_store import MmapDocstore
+
+DEFAULT_FIELDS = ("university", "year", "disciplina", "question_id")
+
+
+class MetadataIndex:
+    """Inverted index from metadata values to the FAISS ids of a vector store.
+
+    It turns metadata filters into sets of vector ids, so the filter runs inside
+    FAISS through an ``IDSelector`` instead of over-fetching and discarding
+    results afterwards.
+    """
+
+    def __init__(self, vector_store: FAISS, fields: Iterable[str] = DEFAULT_FIELDS):
+        self.fields = tuple(fields)
+        postings: Dict[str, Dict[Any, List[int]]] = {
+            field: defaultdict(list) for field in self.fields
+        }
+        docstore = vector_store.docstore
+        for i, docstore_id in vector_store.index_to_docstore_id.items():
+            if isinstance(docstore, MmapDocstore):
+                # Reads only the metadata column, not the question texts.
+                metadata = docstore.metadata(i)
+            else:
+                metadata = docstore.search(docstore_id).metadata
+            for field in self.fields:
+                value = metadata.get(field)
+                if value is not None and isinstance(value, (str, int, float, bool)):
+                    postings[field][value].append(i)
+
+        self.postings = {
+            field: {
+                value: np.array(sorted(ids), dtype=np.int64)
+                for value, ids in values.items()
+            }
+            for field, values in postings.items()
+        }
+
+    def _ids_for_condition(self, field: str, condition: Any) -> Optional[np.ndarray]:
+        values = self.postings[field]
+        if isinstance(condition, dict):
+            if set(condition) == {"$eq"}:
+                condition = condition["$eq"]
+            elif set(condition) == {"$in"}:
+                condition = list(condition["$in"])
+            else:
+                return None
+        if isinstance(condition, list):
+            ids = [values[value] for value in condition if value in values]
+            return np.unique(np.concatenate(ids)) if ids else np.empty(0, np.int64)
+        return values.get(condition, np.empty(0, np.int64))
+
+    def select(self, filter: Dict[str, Any]) -> Optional[np.ndarray]:
+        """Returns the sorted ids matching ``filter``.
+
+        Supports equality, lists, ``$eq``, ``$in`` and ``$and`` on indexed fields.
+        Returns None for anything else, meaning the caller must post-filter.
+        """
+        conditions: List[Tuple[str, Any]] = []
+        for field, condition in filter.items():
+            if field == "$and":
+                for sub_filter in condition:
+                    conditions.extend(sub_filter.items())
+            else:
+                conditions.append((field, condition))
+
+        selected = None
+        for field, condition in conditions:
+            if field not in self.postings:
+                return None
+            ids = self._ids_for_condition(field, condition)
+            if ids is None:
+                return None
+            selected = ids if selected is None else np.intersect1d(selected, ids)
+        return selected
+
+
+_metadata_indexes: "weakref.WeakKeyDictionary[FAISS, MetadataIndex]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def metadata_index_for(vector_store: FAISS) -> MetadataIndex:
+    """Returns the metadata index of ``vector_store``, building it on first use."""
+    if vector_store not in _metadata_indexes:
+        _metadata_indexes[vector_store] = MetadataIndex(vector_store)
+    return _metadata_indexes[vector_store]
+
+
+def _search_parameters(index: faiss.Index, selector, k: int, exhaustive: bool):
+    if isinstance(index, faiss.IndexIVF):
+        nprobe = index.nlist if exhaustive else index.nprobe
+        return faiss.SearchParametersIVF(sel=selector, nprobe=nprobe)
+    if isinstance(index, faiss.IndexHNSW):
+        ef_search = max(index.hnsw.efSearch, k) * (16 if exhaustive else 1)
+        return faiss.SearchParametersHNSW(sel=selector, efSearch=ef_search)
+    return faiss.SearchParameters(sel=selector)
+
+
+def search_selected(
+    index: faiss.Index, query_vectors: np.ndarray, k: int, ids: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Searches only among ``ids``, returning ``min(k, len(ids))`` hits per query.
+
+    Approximate indexes can miss selected vectors under a selective filter, so
+    queries that come back short are searched again exhaustively (all IVF lists,
+    or exact distances over the selected vectors for HNSW).
+    """
+    selector = faiss.IDSelectorBatch(ids)
+    distances, indices = index.search(
+        query_vectors, k, params=_search_parameters(index, selector, k, False)
+    )
+    expected = min(k, len(ids))
+    short = np.flatnonzero((indices != -1).sum(axis=1) < expected)
+    if len(short) == 0:
+        return distances, indices
+
+    if isinstance(index, faiss.IndexHNSW):
+        vectors = index.reconstruct_batch(ids)
+        exact = faiss.IndexFlatL2(vectors.shape[1])
+        exact.add(vectors)
+        retry_distances, positions = exact.search(query_vectors[short], k)
+        retry_indices = np.where(positions == -1, -1, ids[positions])
+    else:
+        retry_distances, retry_indices = index.search(
+            query_vectors[short], k, params=_search_parameters(index, selector, k, True)
+        )
+
+    distances[short] = retry_distances
+    indices[short] = retry_indices
+    return distances, indices
@@ -11,6 +11,10 @@ Example:
 The script is called evaluate.py and the csv file is called enem_questoes_teste.csv. Ommit the .csv.
 python evaluate.py enem_questoes_teste enem
 
+Rows already evaluated are skipped. Add --resume to also retry the failed rows,
+--reevaluate 5 15 17 to evaluate given rows again and --restart to evaluate
+every row again.
+
 The output will be saved in the eval_result/<optional dir name> directory with the name of the csv file.
 The output will be a JSON file with the evaluation results.
 """
@@ -22,11 +26,14 @@ from typing import Optional
 from dotenv import load_dotenv
 import csv
 import pathlib
+import time
 
 from deepeval.evaluate.evaluate import assert_test
 from deepeval.metrics.g_eval.g_eval import GEval
 from deepeval.test_case.llm_test_case import LLMTestCase, LLMTestCaseParams
 
+from etc.run_manifest import RunManifest
+
 
 load_dotenv()
 def escape_latex_backslashes(text: str) -> str:
@@ -149,9 +156,38 @@ sem_erro_conceitual_metric = GEval(
 )
 
 
+def write_results(json_output_path: str, manifest: RunManifest) -> None:
+    """Merges the results recorded in the manifest into the JSON file, by index.
+
+    Results already in the file for other rows are kept. The file is replaced
+    atomically, so concurrent evaluators never leave it half-written.
+    """
+    aggregated_results: list[dict[str, object]] = []
+    if os.path.exists(json_output_path):
+        with open(json_output_path, "r", encoding="utf-8") as jf:
+            try:
+                aggregated_results = json.load(jf)
+            except json.JSONDecodeError:
+                aggregated_results = []
+
+    by_index = {result.get("index"): result for result in aggregated_results}
+    for item in manifest.items(status="done"):
+        if item["result"] is not None:
+            by_index[item["result"]["index"]] = item["result"]
+    aggregated_results = sorted(by_index.values(), key=lambda x: x.get("index", 0))
+
+    temporary_path = f"{json_output_path}.{os.getpid()}.tmp"
+    with open(temporary_path, "w", encoding="utf-8") as jf:
+        json.dump(aggregated_results, jf, ensure_ascii=False, indent=2)
+    os.replace(temporary_path, json_output_path)
+
+
 def main(
     csv_file_name: str,
     output_dir: Optional[str] = None,
+    resume: bool = False,
+    reevaluate: Optional[list[int]] = None,
+    restart: bool = False,
 ) -> None:
     """Evaluate questions listed in a CSV file and write JSON results.
 
@@ -167,6 +203,13 @@ def main(
     output_dir : Optional[str]
         Directory where the evaluation JSON will be stored. Defaults to
         ``<current_module>/eval_result``.
+    resume : bool
+        Also retry the rows that failed in the previous runs (rows already
+        done, see the ``manifest.sqlite`` of ``output_dir``, are skipped).
+    reevaluate : Optional[list[int]]
+        Row indexes to evaluate again even if already done.
+    restart : bool
+        Evaluate every row again.
     """
     if output_dir is not None:
         output_dir = os.path.join(os.path.dirname(__file__), "eval_result", output_dir)
@@ -181,86 +224,72 @@ def main(
 
     os.makedirs(output_dir, exist_ok=True)
 
-    # Prepare container for all evaluation results --------------------------------
-    aggregated_results: list[dict[str, object]] = []
     json_output_path = os.path.join(output_dir, "enem", f"eval_{csv_file_name}.json")
-    indexes_to_reavaluate = [5, 15, 17, 22, 24, 39, 45]
-    starting_index = 0
 
-    # Read CSV and perform evaluation -------------------------------------------
+    # The manifest records the status of each row: only the rows not done yet
+    # are evaluated (--resume adds the failed ones), --reevaluate queues given rows.
+    manifest = RunManifest(
+        os.path.join(output_dir, "manifest.sqlite"), run_id=csv_file_name, strategy="geval"
+    )
     with open(csv_path, newline="", encoding="utf-8-sig") as csvfile:
-        reader = csv.DictReader(csvfile)
-
-        for idx, row in enumerate(reader):
-            if len(indexes_to_reavaluate) == 0 and idx < starting_index:
-                print(
-                    f"Skipping row {idx + 1} (before starting index {starting_index})"
-                )
-                continue
-            print(f"Processing row {idx + 1}...")
-            print(f"Row {row}...")
-
-            if os.path.exists(json_output_path):
-                with open(json_output_path, "r", encoding="utf-8") as jf:
-                    try:
-                        aggregated_results = json.load(jf)
-                    except json.JSONDecodeError:
-                        aggregated_results = []
-            else:
-                aggregated_results = []
-
-            if len(indexes_to_reavaluate) > 0:
-                if idx not in indexes_to_reavaluate:
-                    print(
-                        f"Skipping row {idx + 1} as it is not in the re-evaluation list."
-                    )
-                    continue
-                if idx in indexes_to_reavaluate and aggregated_results:
-                    for i, result in enumerate(aggregated_results):
-                        if result.get("index") == idx:
-                            aggregated_results.pop(i)
-                            print(f"Re-evaluating result at index {idx}...")
-                            break
-            user_input = (
-                row.get("input")
-                or row.get("user_input")
-                or row.get("prompt")
-                or row.get("question")
-            )
-            output = (
-                row.get("output")
-                or row.get("generated")
-                or row.get("answer")
-                or row.get("question_generated")
-            )
-            
-            output = escape_latex_backslashes(output)
-            retrieval_context = row.get("retrieval_context", "")
-
-            if not user_input or not output:
-                print(user_input)
-                print(output)
-                # Skip rows that don't have the essential information.
-                continue
-
-            # Build LLM test case ------------------------------------------------
-            llm_test_case = LLMTestCase(
-                input=user_input,
-                actual_output=output,
-                expected_output=user_input,  # As per original logic
-                retrieval_context=[retrieval_context],
-            )
+        rows = list(csv.DictReader(csvfile))
+    manifest.enqueue(
+        {str(idx): row for idx, row in enumerate(rows)}, reset=restart, retry_failed=resume
+    )
+    if reevaluate:
+        manifest.requeue(reevaluate)
 
-            # Edit the assert_test method inside your virtual environment
-            # Click on the method to open it and then add:
-            #     ```
-            #     return test_result
-            #     ```
-            # right before:
-            #     ```
-            #     if not test_result.success:
-            #     ```
-            # Run evaluation -----------------------------------------------------
+    # Read CSV and perform evaluation -------------------------------------------
+    # Rows are claimed one at a time, so several evaluator processes can share a run.
+    while (item_id := manifest.claim()) is not None:
+        idx = int(item_id)
+        row = rows[idx]
+        print(f"Processing row {idx + 1}...")
+        print(f"Row {row}...")
+
+        user_input = (
+            row.get("input")
+            or row.get("user_input")
+            or row.get("prompt")
+            or row.get("question")
+        )
+        output = (
+            row.get("output")
+            or row.get("generated")
+            or row.get("answer")
+            or row.get("question_generated")
+        )
+
+        output = escape_latex_backslashes(output)
+        retrieval_context = row.get("retrieval_context", "")
+
+        if not user_input or not output:
+            print(user_input)
+            print(output)
+            # Skip rows that don't have the essential information.
+            manifest.complete(item_id)
+            continue
+
+        # Build LLM test case ------------------------------------------------
+        llm_test_case = LLMTestCase(
+            input=user_input,
+            actual_output=output,
+            expected_output=user_input,  # As per original logic
+            retrieval_context=[retrieval_context],
+        )
+
+        # Edit the assert_test method inside your virtual environment
+        # Click on the method to open it and then add:
+        #     ```
+        #     return test_result
+        #     ```
+        # right before:
+        #     ```
+        #     if not test_result.success:
+        #     ```
+        # Run evaluation -----------------------------------------------------
+        start = time.perf_counter()
+        try:
             response = assert_test(
                 llm_test_case,
                 [
@@ -274,41 +303,41 @@ def main(
                     sem_erro_conceitual_metric,
                 ],
             )
-            print(response)
-            # Collect metrics ----------------------------------------------------
-            metrics_info = []
-            for metric in response.metrics_data:
-                try:
-                    parsed_details = json.loads(metric.reason)
-                except Exception:
-                    # In case JSON parsing fails, store raw text
-                    parsed_details = {"raw_reason": metric.reason}
-
-                metrics_info.append(
-                    {
-                        "metric_name": metric.name,
-                        "score": metric.score,
-                        "details": parsed_details,
-                    }
-                )
-
-            current_result = {
-                "index": (
-                    len(aggregated_results)
-                    if len(indexes_to_reavaluate) == 0 and starting_index == 0
-                    else idx
-                ),
-                "input": user_input,
-                "output": output,
-                "metrics": metrics_info,
-            }
-            aggregated_results.append(current_result)
-            aggregated_results.sort(key=lambda x: x.get("index", 0))
-            with open(json_output_path, "w", encoding="utf-8") as jf:
-                json.dump(aggregated_results, jf, ensure_ascii=False, indent=2)
-
-            print(f"Updated results in: {json_output_path}")
+        except Exception as error:
+            # Recorded as failed and retried by the next --resume.
+            manifest.fail(item_id, error, time.perf_counter() - start)
+            print(f"Row {idx + 1} failed: {error}")
+            continue
+        print(response)
+        # Collect metrics ----------------------------------------------------
+        metrics_info = []
+        for metric in response.metrics_data:
+            try:
+                parsed_details = json.loads(metric.reason)
+            except Exception:
+                # In case JSON parsing fails, store raw text
+                parsed_details = {"raw_reason": metric.reason}
+
+            metrics_info.append(
+                {
+                    "metric_name": metric.name,
+                    "score": metric.score,
+                    "details": parsed_details,
+                }
+            )
+
+        current_result = {
+            "index": idx,
+            "input": user_input,
+            "output": output,
+            "metrics": metrics_info,
+        }
+        manifest.complete(item_id, time.perf_counter() - start, result=current_result)
+        write_results(json_output_path, manifest)
 
+        print(f"Updated results in: {json_output_path}")
+
+    print("Run manifest:", manifest.summary())
     print(f"Evaluation finished. Results saved to: {json_output_path}")
 
 
@@ -330,10 +359,33 @@ if __name__ == "__main__":
         default=None,
         help="Directory to write evaluation JSON files. Defaults to <module>/eval_result.",
     )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Also retry the rows that failed in previous runs.",
+    )
+    parser.add_argument(
+        "--reevaluate",
+        type=int,
+        nargs="+",
+        default=None,
+        help="Row indexes to evaluate again.",
+    )
+    parser.add_argument(
+        "--restart",
+        action="store_true",
+        help="Evaluate every row again, including the ones already done.",
+    )
 
     args = parser.parse_args()
 
     # Remove potential '.csv' extension from the provided name -------------------
     file_stem = os.path.splitext(args.csv_file_name)[0]
 
-    main(file_stem, output_dir=args.output_dir)
+    main(
+        file_stem,
+        output_dir=args.output_dir,
+        resume=args.resume,
+        reevaluate=args.reevaluate,
+        restart=args.restart,
+    )
@@ -1,10 +1,12 @@
-from typing import List
+from typing import Dict, List, Optional
 
 from crewai import Agent, Crew, Process, Task
 from crewai.agents.agent_builder.base_agent import BaseAgent
 from crewai.project import CrewBase, agent, crew, task
 
 from src.raia_agents.tools.custom_tool import RetrieveQuestoesTool
+from src.raia_agents.tools.request_cache import apply_cached_outputs
+from src.raia_agents.tools.task_graph import schedule_parallel
 
 
 @CrewBase
@@ -14,9 +16,13 @@ class RaiaAgents:
     agents: List[BaseAgent]
     tasks: List[Task]
 
-    def __init__(self, question_id, prompt):
+    def __init__(
+        self, question_id, prompt, cached_outputs: Optional[Dict[str, str]] = None
+    ):
         self.question_id = question_id
         self.prompt = prompt
+        # Outputs of melhorar_pergunta/filtrar_topicos reused from the request cache.
+        self.cached_outputs = cached_outputs
 
     agents_config = "config/agents.yaml"
     tasks_config = "config/tasks.yaml"
@@ -45,25 +51,23 @@ class RaiaAgents:
             verbose=True,
         )
 
+    # The result files of the tasks are written by main.py through ResultSink.
     @task
     def melhorar_pergunta(self) -> Task:
         return Task(  # type: ignore
             config=self.tasks_config["melhorar_pergunta"],
-            output_file=f"resultados/{self.question_id}/prompt_melhorado.json",
         )
 
     @task
     def filtrar_topicos(self) -> Task:
         return Task(
             config=self.tasks_config["filtrar_topicos"],
-            output_file=f"resultados/{self.question_id}/topicos_questao.json",
         )
 
     @task
     def selecionar_questoes(self) -> Task:
         return Task(
             config=self.tasks_config["selecionar_questoes"],
-            output_file=f"resultados/{self.question_id}/few_shot_prompt.json",
         )
 
     @crew
@@ -72,7 +76,8 @@ class RaiaAgents:
 
         return Crew(
             agents=self.agents,  # Automatically created by the @agent decorator
-            tasks=self.tasks,  # Automatically created by the @task decorator
+            # Automatically created by the @task decorator
+            tasks=schedule_parallel(apply_cached_outputs(self.tasks, self.cached_outputs)),
             process=Process.sequential,
             verbose=True,
             output_log_file="logs.json",
@@ -117,7 +122,6 @@ class RaiaRedacaoCrew:
     def geração_questao(self) -> Task:
         return Task(
             config=self.tasks_config["geração_questao"],
-            output_file=f"resultados/{self.question_id}/questao_gerada.json",
             context=[],
         )
 
@@ -125,21 +129,19 @@ class RaiaRedacaoCrew:
     def resolucao_questao(self) -> Task:
         return Task(
             config=self.tasks_config["resolucao_questao"],
-            output_file=f"resultados/{self.question_id}/resolucao.json",
         )
 
     @task
     def correção_questao(self) -> Task:
         return Task(
             config=self.tasks_config["correção_questao"],
-            output_file=f"resultados/{self.question_id}/questao_corrigida.json",
         )
 
     @crew
     def crew(self) -> Crew:
         return Crew(
             agents=self.agents,
-            tasks=self.tasks,
+            tasks=schedule_parallel(self.tasks),
             process=Process.sequential,
             verbose=True,
             output_log_file="logs.json",
@@ -1,6 +1,14 @@
 import warnings
 
 from raia_agents.crew import RaiaAgents, RaiaRedacaoCrew
+from src.raia_agents.tools.batch_runner import BatchRunner, print_summary
+from src.raia_agents.tools.crew_factory import CrewFactory
+# Same module object as the tool used by crew.py.
+from src.raia_agents.tools.custom_tool import embeddings, prompt_cache
+from src.raia_agents.tools.few_shot import tokenizer_for
+from src.raia_agents.tools.request_cache import SemanticRequestCache, task_outputs
+from src.raia_agents.tools.result_sink import ResultSink
+from src.raia_agents.tools.run_manifest import RunManifest, restart_requested, resume_requested
 import time
 warnings.filterwarnings("ignore", category=SyntaxWarning, module="pysbd")
 
@@ -61,39 +69,62 @@ def run():
         # {"input_user": "Gera uma questão de química sobre equilíbrio químico."},
         # {"input_user": "Preciso de uma questão de geografia sobre biomas brasileiros."},
     ]
-    try:
-        for idx, request in enumerate(inputs):
-            start_time = time.time()
-            busca_crew = RaiaAgents(idx, request.get("input_user")).crew()
-            busca_crew.kickoff(inputs=request)
+    request_cache = SemanticRequestCache(embeddings)
+    result_sink = ResultSink()
+    # Configs, agents, LLMs and tools are built once; each question gets a copy.
+    busca_factory = CrewFactory(lambda question_id: RaiaAgents(question_id, None).crew())
+    redacao_factory = CrewFactory(lambda question_id: RaiaRedacaoCrew(question_id).crew())
 
-            with open(f"./resultados/{idx}/few_shot_prompt.json", encoding="utf-8") as f:
-                few_shot_prompt = f.read()
+    def run_question(idx, request):
+        start_time = time.time()
+        cached_outputs = request_cache.lookup(request["input_user"])
+        busca_crew = busca_factory.create(idx, cached_outputs)
+        busca_result = busca_crew.kickoff(inputs=request)
+        if cached_outputs is None:
+            request_cache.store(request["input_user"], task_outputs(busca_result))
 
-            with open(f"./resultados/{idx}/topicos_questao.json", encoding="utf-8") as f:
-                topicos = f.read()
+        # Outputs of the skipped (cached) tasks are not in busca_result.
+        busca_outputs = {**(cached_outputs or {}), **task_outputs(busca_result, names=None)}
+        few_shot_prompt = busca_outputs["selecionar_questoes"]
+        outputs = {
+            "solicitacao_melhorada": busca_outputs["melhorar_pergunta"],
+            "topicos": busca_outputs["filtrar_topicos"],
+            "few_shot_prompt": few_shot_prompt,
+        }
+        redacao_crew = redacao_factory.create(idx)
+        redacao_result = redacao_crew.kickoff(inputs=outputs)
+        end_time = time.time()
 
-            with open(f"./resultados/{idx}/prompt_melhorado.json", encoding="utf-8") as f:
-                solicitacao_melhorada = f.read()
+        metrics_busca = busca_crew.usage_metrics
+        metrics_redacao = redacao_crew.usage_metrics
+        total_tokens = metrics_busca.prompt_tokens + metrics_busca.completion_tokens + metrics_redacao.prompt_tokens + metrics_redacao.completion_tokens
+        few_shot_tokens = tokenizer_for().count(few_shot_prompt)
+        print("Total tokens used:", total_tokens)
+        print(f"Execution time for crew {idx}: {end_time - start_time} seconds")
 
-            outputs = {
-                "solicitacao_melhorada": f"{solicitacao_melhorada}",
-                "topicos": f"{topicos}",
-                "few_shot_prompt": f"{few_shot_prompt}",
-            }
-            redacao_crew = RaiaRedacaoCrew(idx).crew()
-            redacao_crew.kickoff(inputs=outputs)
-            end_time = time.time()
-            
-            metrics_busca = busca_crew.usage_metrics
-            metrics_redacao = redacao_crew.usage_metrics
-            total_tokens = metrics_busca.prompt_tokens + metrics_busca.completion_tokens + metrics_redacao.prompt_tokens + metrics_redacao.completion_tokens
-            print("Total tokens used:", total_tokens)
-            print(f"Execution time for crew {idx}: {end_time - start_time} seconds")
-            
-            with open(f"./resultados/{idx}/usage.json", "w") as log_file:
-                log_file.write("{\n"+f'"token_usage": {total_tokens},\n')
-                log_file.write(f'"execution_time": {end_time - start_time} seconds\n'+ "}")
+        result_sink.write_outputs(idx, busca_outputs)
+        result_sink.write_outputs(idx, task_outputs(redacao_result, names=None))
+        result_sink.write(
+            idx,
+            "usage.json",
+            "{\n"+f'"token_usage": {total_tokens},\n'
+            + f'"few_shot_prompt_tokens": {few_shot_tokens},\n'
+            + f'"execution_time": {end_time - start_time} seconds\n'+ "}",
+        )
+        return [busca_result, redacao_result]
 
-    except Exception as e:
-        raise Exception(f"An error occurred while running the crew: {e}")
+    # Questions already done (or running in another worker of the run) are
+    # skipped; --resume also retries the failed ones, --restart runs them all again.
+    manifest = RunManifest(strategy="fewshot")
+    manifest.enqueue(
+        {str(idx): request for idx, request in enumerate(inputs)},
+        reset=restart_requested(),
+        retry_failed=resume_requested(),
+    )
+    try:
+        print_summary(BatchRunner(run_question).run(inputs, manifest=manifest))
+        print("Run manifest:", manifest.summary())
+        print("Few-shot prompt cache:", prompt_cache.stats())
+        print("Request cache:", request_cache.stats())
+    finally:
+        result_sink.close()
@@ -0,0 +1,378 @@
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Type
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Number of questions run at the same time.
+DEFAULT_CONCURRENCY = int(os.environ.get("RAIA_BATCH_CONCURRENCY", "4"))
+# API budget shared by the whole batch (0 = no limit).
+DEFAULT_REQUESTS_PER_MINUTE = int(os.environ.get("RAIA_RPM", "0"))
+DEFAULT_TOKENS_PER_MINUTE = int(os.environ.get("RAIA_TPM", "0"))
+# Extra attempts for a failed question.
+DEFAULT_RETRIES = int(os.environ.get("RAIA_BATCH_RETRIES", "2"))
+# Completion tokens reserved for an LLM call until its real usage is known.
+DEFAULT_COMPLETION_TOKENS = int(os.environ.get("RAIA_COMPLETION_TOKENS", "1000"))
+
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute budget over a sliding window.
+
+    ``acquire`` blocks until the estimated cost fits in what the last minute
+    left of both budgets and reserves it; ``settle`` replaces the estimate
+    with the measured cost once known. A single cost above a budget is let
+    through when the window is empty, so it cannot block forever.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: int = DEFAULT_REQUESTS_PER_MINUTE,
+        tokens_per_minute: int = DEFAULT_TOKENS_PER_MINUTE,
+        window_seconds: float = 60.0,
+    ):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.window_seconds = window_seconds
+        self._entries: "deque[List[float]]" = deque()
+        self._condition = threading.Condition()
+
+    def _expire(self, now: float) -> None:
+        while self._entries and self._entries[0][0] <= now - self.window_seconds:
+            self._entries.popleft()
+
+    def _fits(self, requests: float, tokens: float) -> bool:
+        if not self._entries:
+            return True
+        used_requests = sum(entry[1] for entry in self._entries)
+        used_tokens = sum(entry[2] for entry in self._entries)
+        return (
+            not self.requests_per_minute or used_requests + requests <= self.requests_per_minute
+        ) and (not self.tokens_per_minute or used_tokens + tokens <= self.tokens_per_minute)
+
+    def acquire(self, requests: float, tokens: float) -> List[float]:
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                self._expire(now)
+                if self._fits(requests, tokens):
+                    entry = [now, requests, tokens]
+                    self._entries.append(entry)
+                    return entry
+                wait = self._entries[0][0] + self.window_seconds - now
+                self._condition.wait(timeout=max(wait, 0.05))
+
+    def settle(self, entry: List[float], requests: float, tokens: float) -> None:
+        with self._condition:
+            entry[1], entry[2] = requests, tokens
+            self._condition.notify_all()
+
+
+class LLMCallLimit:
+    """Spends a RateLimiter per LLM call, through litellm's callbacks.
+
+    crewAI calls every model through litellm. Before each call, one request and its prompt tokens plus the expected
+    completion (``max_tokens``, else ``completion_tokens``) are reserved,
+    blocking the calling thread until they fit. A successful call is then
+    settled with the usage the provider reported; a failed one keeps one
+    request and its prompt tokens.
+    """
+
+    def __init__(self, limiter: RateLimiter, completion_tokens: int = DEFAULT_COMPLETION_TOKENS):
+        self.limiter = limiter
+        self.completion_tokens = completion_tokens
+        self._calls: Dict[Any, Tuple[List[float], int]] = {}
+        self._lock = threading.Lock()
+        self._litellm = None
+
+    @staticmethod
+    def _call_id(kwargs: Dict[str, Any]) -> Any:
+        return kwargs.get("litellm_call_id") or id(kwargs)
+
+    def _prompt_tokens(self, kwargs: Dict[str, Any]) -> int:
+        messages = kwargs.get("messages") or []
+        try:
+            return self._litellm.token_counter(model=kwargs.get("model", ""), messages=messages)
+        except Exception:
+            return sum(len(str(message.get("content") or "")) for message in messages) // 4
+
+    def _before_call(self, kwargs: Dict[str, Any]) -> None:
+        prompt_tokens = self._prompt_tokens(kwargs)
+        max_tokens = (kwargs.get("optional_params") or {}).get("max_tokens")
+        entry = self.limiter.acquire(1, prompt_tokens + (max_tokens or self.completion_tokens))
+        with self._lock:
+            self._calls[self._call_id(kwargs)] = (entry, prompt_tokens)
+
+    def _pop(self, kwargs: Dict[str, Any]) -> Optional[Tuple[List[float], int]]:
+        with self._lock:
+            return self._calls.pop(self._call_id(kwargs), None)
+
+    def _on_success(self, kwargs, response, start_time, end_time) -> None:
+        call = self._pop(kwargs)
+        usage = getattr(response, "usage", None)
+        if call is not None and usage is not None:
+            self.limiter.settle(call[0], 1, usage.total_tokens)
+
+    def _on_failure(self, kwargs, response, start_time, end_time) -> None:
+        call = self._pop(kwargs)
+        if call is not None:
+            self.limiter.settle(call[0], 1, call[1])
+
+    def install(self) -> bool:
+        """Registers the callbacks; returns False when litellm is not installed."""
+        try:
+            import litellm
+        except ImportError:
+            return False
+        self._litellm = litellm
+        # crewAI replaces litellm.callbacks on every call, but not these lists.
+        litellm.input_callback.append(self._before_call)
+        litellm.success_callback.append(self._on_success)
+        litellm.failure_callback.append(self._on_failure)
+        return True
+
+    def uninstall(self) -> None:
+        if self._litellm is None:
+            return
+        for callbacks, callback in (
+            (self._litellm.input_callback, self._before_call),
+            (self._litellm.success_callback, self._on_success),
+            (self._litellm.failure_callback, self._on_failure),
+        ):
+            if callback in callbacks:
+                callbacks.remove(callback)
+        self._litellm = None
+
+
+def crew_usage(result) -> Tuple[int, int]:
+    """Returns (LLM requests, tokens) of a CrewOutput, or of a list of them."""
+    results = result if isinstance(result, (list, tuple)) else [result]
+    requests = tokens = 0
+    for output in results:
+        usage = getattr(output, "token_usage", None)
+        if usage is not None:
+            requests += usage.successful_requests
+            tokens += usage.total_tokens
+    return requests, tokens
+
+
+@dataclass
+class ItemResult:
+    index: int
+    result: Any = None
+    error: Optional[BaseException] = None
+    attempts: int = 0
+    seconds: float = 0.0
+    requests: int = 0
+    tokens: int = 0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+@dataclass
+class BatchReport:
+    items: List[ItemResult] = field(default_factory=list)
+    wall_seconds: float = 0.0
+
+    @property
+    def failed(self) -> List[ItemResult]:
+        return [item for item in self.items if not item.ok]
+
+    def summary(self) -> Dict[str, float]:
+        latencies = [item.seconds for item in self.items if item.ok] or [0.0]
+        tokens = sum(item.tokens for item in self.items)
+        minutes = max(self.wall_seconds, 1e-9) / 60
+        p50, p95 = np.percentile(latencies, [50, 95])
+        return {
+            "items": len(self.items),
+            "succeeded": len(self.items) - len(self.failed),
+            "failed": len(self.failed),
+            "retries": sum(max(item.attempts - 1, 0) for item in self.items),
+            "wall_seconds": self.wall_seconds,
+            "items_per_minute": len(self.items) / minutes,
+            "item_seconds_p50": float(p50),
+            "item_seconds_p95": float(p95),
+            "requests": sum(item.requests for item in self.items),
+            "tokens": tokens,
+            "tokens_per_minute": tokens / minutes,
+        }
+
+
+class BatchRunner:
+    """Runs ``run_item(index, item)`` over a batch with bounded concurrency.
+
+    The shared RateLimiter is spent per LLM call (see LLMCallLimit). Without
+    litellm, each question reserves the average cost of the questions
+    finished so far, and the first one a whole minute of budget, so no
+    burst starts before a cost is known. A failing item is retried with
+    exponential backoff and then recorded as failed, without stopping the
+    others; exceptions in ``no_retry_errors`` fail their item at once.
+    """
+
+    def __init__(
+        self,
+        run_item: Callable[[int, Any], Any],
+        concurrency: int = DEFAULT_CONCURRENCY,
+        limiter: Optional[RateLimiter] = None,
+        retries: int = DEFAULT_RETRIES,
+        backoff_seconds: float = 2.0,
+        no_retry_errors: Tuple[Type[BaseException], ...] = (),
+        usage: Callable[[Any], Tuple[int, int]] = crew_usage,
+    ):
+        self.run_item = run_item
+        self.concurrency = max(concurrency, 1)
+        self.limiter = limiter or RateLimiter()
+        self.retries = retries
+        self.backoff_seconds = backoff_seconds
+        self.no_retry_errors = no_retry_errors
+        self.usage = usage
+        self._per_call = False
+        self._lock = threading.Lock()
+        self._finished_requests = 0
+        self._finished_tokens = 0
+        self._finished = 0
+
+    @property
+    def _limited(self) -> bool:
+        return bool(self.limiter.requests_per_minute or self.limiter.tokens_per_minute)
+
+    def _estimated_cost(self) -> Tuple[float, float]:
+        with self._lock:
+            if not self._finished:
+                return (
+                    float(self.limiter.requests_per_minute or 1),
+                    float(self.limiter.tokens_per_minute),
+                )
+            return (
+                self._finished_requests / self._finished,
+                self._finished_tokens / self._finished,
+            )
+
+    def _acquire(self) -> Optional[List[float]]:
+        if self._per_call or not self._limited:
+            return None
+        return self.limiter.acquire(*self._estimated_cost())
+
+    def _run_one(self, index: int, item: Any) -> ItemResult:
+        outcome = ItemResult(index)
+        start = time.perf_counter()
+        while True:
+            outcome.attempts += 1
+            entry = self._acquire()
+            try:
+                outcome.result = self.run_item(index, item)
+            except Exception as error:
+                # A failed attempt keeps its reservation: its calls were spent.
+                retry = outcome.attempts <= self.retries and not isinstance(
+                    error, self.no_retry_errors
+                )
+                logger.warning(
+                    "Item %d failed (attempt %d%s): %s",
+                    index,
+                    outcome.attempts,
+                    ", retrying" if retry else "",
+                    error,
+                )
+                if not retry:
+                    outcome.error = error
+                    break
+                time.sleep(self.backoff_seconds * 2 ** (outcome.attempts - 1))
+                continue
+            outcome.requests, outcome.tokens = self.usage(outcome.result)
+            if entry is not None:
+                self.limiter.settle(entry, outcome.requests, outcome.tokens)
+            with self._lock:
+                self._finished += 1
+                self._finished_requests += outcome.requests
+                self._finished_tokens += outcome.tokens
+            break
+        outcome.seconds = time.perf_counter() - start
+        return outcome
+
+    def _report(self, report: BatchReport, outcome: ItemResult, total: int, start: float):
+        with self._lock:
+            report.items.append(outcome)
+            done = len(report.items)
+        elapsed = time.perf_counter() - start
+        status = "ok" if outcome.ok else f"failed: {outcome.error}"
+        print(
+            f"[{done}/{total}] item {outcome.index} {status} "
+            f"in {outcome.seconds:.1f}s (attempts={outcome.attempts}, "
+            f"tokens={outcome.tokens}) - {done / elapsed * 60:.1f} items/min"
+        )
+
+    def _drain(self, items, manifest, report: BatchReport, total: int, start: float) -> None:
+        """Worker loop: claims item ids from the manifest until none is left."""
+        while True:
+            item_id = manifest.claim()
+            if item_id is None:
+                return
+            outcome = self._run_one(int(item_id), items[int(item_id)])
+            if outcome.ok:
+                manifest.complete(
+                    item_id, outcome.seconds, outcome.requests, outcome.tokens
+                )
+            else:
+                manifest.fail(item_id, outcome.error, outcome.seconds)
+            self._report(report, outcome, total, start)
+
+    def run(self, items: Sequence[Any], manifest=None) -> BatchReport:
+        """Runs every item, or with a RunManifest only the items it hands out.
+
+        With a manifest the items are taken by id from its queue, so other
+        processes running the same manifest share the work, and each result
+        is recorded there as it finishes.
+        """
+        report = BatchReport()
+        call_limit = LLMCallLimit(self.limiter) if self._limited else None
+        self._per_call = call_limit is not None and call_limit.install()
+        try:
+            self._run_items(items, manifest, report)
+        finally:
+            if call_limit is not None:
+                call_limit.uninstall()
+            self._per_call = False
+        return report
+
+    def _run_items(self, items: Sequence[Any], manifest, report: BatchReport) -> None:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(
+            max_workers=self.concurrency, thread_name_prefix="batch"
+        ) as executor:
+            if manifest is not None:
+                total = manifest.summary()["pending"]
+                workers = [
+                    executor.submit(self._drain, items, manifest, report, total, start)
+                    for _ in range(self.concurrency)
+                ]
+                for worker in workers:
+                    worker.result()
+            else:
+                futures = [
+                    executor.submit(self._run_one, i, item) for i, item in enumerate(items)
+                ]
+                for future in as_completed(futures):
+                    self._report(report, future.result(), len(items), start)
+        report.items.sort(key=lambda outcome: outcome.index)
+        report.wall_seconds = time.perf_counter() - start
+
+
+def print_summary(report: BatchReport) -> None:
+    summary = report.summary()
+    print(
+        f"Batch: {summary['succeeded']}/{summary['items']} succeeded, "
+        f"{summary['failed']} failed, {summary['retries']} retries in "
+        f"{summary['wall_seconds']:.1f}s ({summary['items_per_minute']:.1f} items/min, "
+        f"p50={summary['item_seconds_p50']:.1f}s, p95={summary['item_seconds_p95']:.1f}s, "
+        f"{summary['tokens']} tokens, {summary['tokens_per_minute']:.0f} tokens/min)"
+    )
+    for item in report.failed:
+        print(f"  item {item.index} failed after {item.attempts} attempts: {item.error}")
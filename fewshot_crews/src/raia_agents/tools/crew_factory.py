@@ -0,0 +1,87 @@
+import threading
+from typing import Callable, Dict, List, Optional, Sequence
+
+from crewai import Crew, Task
+
+from .request_cache import apply_cached_outputs
+from .task_graph import schedule_parallel
+
+# Stands for the question id in the template's output paths.
+QUESTION_ID = "__question_id__"
+# Task fields set per copy, or filled in while a task runs; every other field
+# the YAML or the Task constructor set is copied as is.
+NOT_COPIED_TASK_FIELDS = frozenset(
+    "id agent context tools output_file output processed_by_agents used_tools tools_errors "
+    "delegations retry_count start_time end_time".split()
+)
+
+
+class CrewFactory:
+    """Builds a crew once per process and stamps out per-question copies.
+
+    ``build(question_id)`` (e.g. ``lambda question_id:
+    RaiaAgents(question_id).crew()``) runs once, with the QUESTION_ID
+    placeholder: the YAML configs are parsed and the agents, their LLMs and
+    tools are created a single time. ``create`` then returns a new Crew whose
+    agents are ``Agent.copy()`` of the template's (sharing the LLM and tool
+    objects) and whose tasks are new Task objects with the question's output
+    paths (every other field copied), so concurrent questions never share
+    mutable agent or task state.
+    """
+
+    def __init__(self, build: Callable[[str], Crew]):
+        self.template = build(QUESTION_ID)
+        self._lock = threading.Lock()
+
+    def _copy_tasks(self, agents: Dict[int, object], question_id) -> List[Task]:
+        copies: Dict[int, Task] = {}
+        tasks = []
+        for task in self.template.tasks:
+            output_file = task.output_file
+            if output_file:
+                output_file = output_file.replace(QUESTION_ID, str(question_id))
+            fields = {
+                name: getattr(task, name)
+                for name in task.model_fields_set - NOT_COPIED_TASK_FIELDS
+            }
+            copy = Task(
+                **fields,
+                agent=agents[id(task.agent)] if task.agent is not None else None,
+                tools=list(task.tools or []),
+                output_file=output_file,
+            )
+            # Set after creation: Task treats a missing context differently from [].
+            if isinstance(task.context, list):
+                copy.context = [copies[id(context)] for context in task.context]
+            copies[id(task)] = copy
+            tasks.append(copy)
+        return tasks
+
+    def create(
+        self,
+        question_id,
+        cached_outputs: Optional[Dict[str, str]] = None,
+        task_names: Optional[Sequence[str]] = None,
+    ) -> Crew:
+        """Returns the crew of one question.
+
+        Tasks in ``cached_outputs`` are skipped (see apply_cached_outputs) and,
+        with ``task_names``, only those tasks are kept, so a crew can also run
+        one phase of a pipeline.
+        """
+        with self._lock:
+            agents = {id(agent): agent.copy() for agent in self.template.agents}
+            tasks = self._copy_tasks(agents, question_id)
+        tasks = apply_cached_outputs(tasks, cached_outputs)
+        if task_names is not None:
+            tasks = [task for task in tasks if task.name in task_names]
+            used_agents = {id(task.agent) for task in tasks}
+            agents = {key: agent for key, agent in agents.items() if id(agent) in used_agents}
+        return Crew(
+            agents=list(agents.values()),
+            tasks=schedule_parallel(tasks),
+            process=self.template.process,
+            verbose=self.template.verbose,
+            memory=self.template.memory,
+            output_log_file=self.template.output_log_file,
+        )
@@ -1,4 +1,4 @@
-from typing import Type
+from typing import Optional, Type
 
 import faiss
 from crewai.tools import BaseTool
@@ -8,14 +8,36 @@ from langchain_community.vectorstores import FAISS
 from langchain_openai import OpenAIEmbeddings
 from litellm import BaseModel, Field
 
+from .batch_search import DEFAULT_SEARCH_MODE, search_many
+from .embedding_cache import CachedEmbeddings
+from .few_shot import (
+    DEFAULT_TOKEN_BUDGET,
+    DEFAULT_TRIM_PASSAGES,
+    PromptCache,
+    pack_examples,
+    parsed_question,
+    tokenizer_for,
+)
+from .index_registry import IndexRegistry
+
 index = faiss.IndexFlatL2()
-embeddings = OpenAIEmbeddings(model="text-embedding-ada-002")
+embeddings = CachedEmbeddings(OpenAIEmbeddings(model="text-embedding-ada-002"))
 vector_store = FAISS(
     embedding_function=embeddings,
     index=index,
     docstore=InMemoryDocstore(),
     index_to_docstore_id={},
 )
+index_registry = IndexRegistry(embeddings)
+# Formatted prompts keyed by the arguments of the call and the index version.
+prompt_cache = PromptCache()
+
+QUESTIONS_FOLDER = "artifacts/questions_faiss_v2/"
+EXAMPLE_PROMPT = PromptTemplate(
+    input_variables=["questao"], template="Questão: \n{questao}\n\n"
+)
+FEW_SHOT_PREFIX = "Aqui estão exemplos de questões no tópico fornecido:"
+FEW_SHOT_SUFFIX = "Gere uma nova questão de acordo com o tema: {input}"
 
 
 class RagToolSchema(BaseModel):
@@ -30,6 +52,10 @@ class RagToolSchema(BaseModel):
     threshold: float = Field(
         description="Limite de similaridade para considerar um trecho relevante. Um valor razoável é 0.3 e no máximo 0.5, mas pode ser ajustado conforme necessário."
     )
+    diversity: Optional[float] = Field(
+        default=None,
+        description="Peso de diversidade entre 0 e 1 para evitar exemplos de questões quase idênticos (0 ordena só por similaridade). Um valor razoável é 0.3.",
+    )
 
 
 class RetrieveQuestoesTool(BaseTool):
@@ -38,45 +64,74 @@ class RetrieveQuestoesTool(BaseTool):
         "Function that retrieves data of a database, based on user topic of interest, so that it helps to generate questions."
     )
     args_schema: Type[BaseModel] = RagToolSchema
+    # "vector", "hybrid" (vector + BM25) or "lexical" (BM25 only, no API call).
+    search_mode: str = DEFAULT_SEARCH_MODE
+    # Token budget of the whole prompt for the target model (0 = no limit).
+    token_budget: int = DEFAULT_TOKEN_BUDGET
+    trim_passages: bool = DEFAULT_TRIM_PASSAGES
 
     def _run(
-        self, topic: str, amount_to_retrieve: int = 5, threshold: float = 0.3
+        self,
+        topic: str,
+        amount_to_retrieve: int = 5,
+        threshold: float = 0.3,
+        diversity: Optional[float] = None,
     ) -> str:
-        vector_store = FAISS.load_local(
-            "artifacts/questions_faiss_v2/",
-            embeddings,
-            allow_dangerous_deserialization=True,
-        )
-        docs = vector_store.similarity_search_with_relevance_scores(
-            k=amount_to_retrieve,
-            query=topic,
-            score_threshold=threshold,
+        vector_store = index_registry.get(QUESTIONS_FOLDER)
+        cache_key = (
+            topic,
+            amount_to_retrieve,
+            threshold,
+            diversity or 0.0,
+            self.search_mode,
+            self.token_budget,
+            self.trim_passages,
+            index_registry.version(QUESTIONS_FOLDER),
         )
+        prompt = prompt_cache.get(cache_key)
+        if prompt is not None:
+            return prompt
 
-        examples = [
-            {
-                "questao":
-                    f"{doc.page_content.split('Alternatives')[0].strip()}\n\n" +
-                    (
-                        f"Alternativas:\n{doc.page_content.split('Alternatives:')[1].strip()}"
-                        if "Alternatives:" in doc.page_content
-                        else "Alternativas não encontradas."
-                    )
-            }
-            for doc, _ in docs
-        ]
+        if self.search_mode == "vector" and not diversity:
+            docs = vector_store.similarity_search_with_relevance_scores(
+                k=amount_to_retrieve,
+                query=topic,
+                score_threshold=threshold,
+            )
+        else:
+            docs = search_many(
+                {"questions": vector_store},
+                [topic],
+                amount_to_retrieve,
+                threshold,
+                self.search_mode,
+                diversity or 0.0,
+            )[0]["questions"]
 
-        example_prompt = PromptTemplate(
-            input_variables=["questao"], template="Questão: \n{questao}\n\n"
-        )
+        questions = [parsed_question(vector_store, doc) for doc, _ in docs]
+        if self.token_budget:
+            tokenizer = tokenizer_for()
+            fixed_tokens = tokenizer.count(
+                f"{FEW_SHOT_PREFIX}\n\n{FEW_SHOT_SUFFIX.format(input=topic)}"
+            )
+            questions, _ = pack_examples(
+                questions,
+                self.token_budget - fixed_tokens,
+                tokenizer,
+                # Each example is followed by the "\n\n" example separator.
+                render=lambda question: EXAMPLE_PROMPT.format(questao=question.example)
+                + "\n\n",
+                trim=self.trim_passages,
+            )
 
         few_shot_prompt = FewShotPromptTemplate(
-            examples=examples,
-            example_prompt=example_prompt,
-            prefix="Aqui estão exemplos de questões no tópico fornecido:",
-            suffix="Gere uma nova questão de acordo com o tema: {input}",
+            examples=[{"questao": question.example} for question in questions],
+            example_prompt=EXAMPLE_PROMPT,
+            prefix=FEW_SHOT_PREFIX,
+            suffix=FEW_SHOT_SUFFIX,
             input_variables=["input"],
         )
 
         prompt = few_shot_prompt.format(input=topic)
+        prompt_cache.put(cache_key, prompt)
         return prompt
@@ -0,0 +1,150 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from array import array
+from typing import Dict, List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+DEFAULT_CACHE_PATH = os.environ.get(
+    "RAIA_EMBEDDING_CACHE", "artifacts/embedding_cache.sqlite"
+)
+
+
+def normalize_text(text: str) -> str:
+    """Normalizes unicode and whitespace so trivially different strings share a key."""
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFC", text)).strip()
+
+
+class CachedEmbeddings(Embeddings):
+    """Disk-backed cache in front of an embeddings model.
+
+    Vectors are stored in SQLite keyed by model name and normalized text, so the
+    cache can be shared between processes and survives restarts. When the cache
+    holds more than ``max_entries`` vectors the least recently used ones are
+    evicted.
+    """
+
+    def __init__(
+        self,
+        underlying: Embeddings,
+        path: str = DEFAULT_CACHE_PATH,
+        max_entries: int = 100_000,
+        model_name: Optional[str] = None,
+    ):
+        self.underlying = underlying
+        self.path = path
+        self.max_entries = max_entries
+        self.model_name = model_name or getattr(
+            underlying, "model", type(underlying).__name__
+        )
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                model TEXT NOT NULL,
+                text TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (model, text)
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)"
+        )
+        self._conn.commit()
+
+    def _lookup(self, keys: List[str]) -> Dict[str, List[float]]:
+        found = {}
+        with self._lock:
+            for key in set(keys):
+                row = self._conn.execute(
+                    "SELECT vector FROM embeddings WHERE model = ? AND text = ?",
+                    (self.model_name, key),
+                ).fetchone()
+                if row is not None:
+                    found[key] = array("d", row[0]).tolist()
+            if found:
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE model = ? AND text = ?",
+                    [(time.time(), self.model_name, key) for key in found],
+                )
+                self._conn.commit()
+        return found
+
+    def _store(self, vectors: Dict[str, List[float]]) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?)",
+                [
+                    (self.model_name, key, array("d", vector).tobytes(), now)
+                    for key, vector in vectors.items()
+                ],
+            )
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+            if count > self.max_entries:
+                self._conn.execute(
+                    """
+                    DELETE FROM embeddings WHERE rowid IN (
+                        SELECT rowid FROM embeddings ORDER BY last_used LIMIT ?
+                    )
+                    """,
+                    (count - self.max_entries,),
+                )
+            self._conn.commit()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [normalize_text(text) for text in texts]
+        cached = self._lookup(keys)
+        missing = list(dict.fromkeys(key for key in keys if key not in cached))
+
+        with self._lock:
+            self.hits += sum(1 for key in keys if key in cached)
+            self.misses += len(missing)
+        if missing:
+            computed = dict(zip(missing, self.underlying.embed_documents(missing)))
+            self._store(computed)
+            cached.update(computed)
+        return [cached[key] for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        key = normalize_text(text)
+        cached = self._lookup([key])
+        if key in cached:
+            with self._lock:
+                self.hits += 1
+            return cached[key]
+
+        with self._lock:
+            self.misses += 1
+        vector = self.underlying.embed_query(key)
+        self._store({key: vector})
+        return vector
+
+    def stats(self) -> Dict[str, float]:
+        """Returns hit/miss counters of this instance and the cache size on disk."""
+        with self._lock:
+            (entries,) = self._conn.execute(
+                "SELECT COUNT(*) FROM embeddings"
+            ).fetchone()
+            hits, misses = self.hits, self.misses
+        total = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / total if total else 0.0,
+            "entries": entries,
+        }
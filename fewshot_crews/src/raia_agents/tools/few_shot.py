@@ -0,0 +1,195 @@
+import logging
+import math
+import os
+import threading
+import weakref
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from functools import lru_cache
+from typing import Dict, Hashable, List, Optional, Tuple
+
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+
+logger = logging.getLogger(__name__)
+
+# crewAI's default model, overridden by the MODEL environment variable.
+TARGET_MODEL = os.environ.get("MODEL", "gpt-4o-mini")
+# Maximum tokens of the few-shot prompt: about five ENEM questions with their
+# reading passages, so only unusually long examples are left out. Set
+# RAIA_FEW_SHOT_TOKEN_BUDGET=0 to keep every retrieved example.
+DEFAULT_TOKEN_BUDGET = int(os.environ.get("RAIA_FEW_SHOT_TOKEN_BUDGET", "4000"))
+# Whether oversized reading passages are shortened instead of dropped.
+DEFAULT_TRIM_PASSAGES = os.environ.get("RAIA_FEW_SHOT_TRIM", "") not in ("", "0", "false")
+
+
+@dataclass(frozen=True)
+class ParsedQuestion:
+    """Statement and alternatives of a question stored as "<statement> Alternatives: <...>"."""
+
+    statement: str
+    alternatives: Optional[str]
+
+    @property
+    def example(self) -> str:
+        """The question as written in the few-shot prompt."""
+        alternatives = (
+            f"Alternativas:\n{self.alternatives}"
+            if self.alternatives is not None
+            else "Alternativas não encontradas."
+        )
+        return f"{self.statement}\n\n{alternatives}"
+
+    def trimmed(self, tokenizer: "Tokenizer", max_tokens: int) -> Optional["ParsedQuestion"]:
+        """Shortens the reading passage so the example fits in ``max_tokens``.
+
+        The last paragraph of the statement (the actual question) and the
+        alternatives are kept whole. Returns None if they alone do not fit.
+        """
+        passage, _, command = self.statement.rpartition("\n")
+        if not passage.strip():
+            return None
+        without_passage = replace(self, statement=f"[...]\n{command}")
+        available = max_tokens - tokenizer.count(without_passage.example)
+        if available <= 0:
+            return None
+        passage = tokenizer.truncate(passage, available).rstrip()
+        return replace(self, statement=f"{passage} [...]\n{command}")
+
+
+def parse_question(page_content: str) -> ParsedQuestion:
+    alternatives = None
+    if "Alternatives:" in page_content:
+        alternatives = page_content.split("Alternatives:")[1].strip()
+    return ParsedQuestion(page_content.split("Alternatives")[0].strip(), alternatives)
+
+
+class Tokenizer:
+    """Token counting with the tokenizer of ``model`` (tiktoken).
+
+    When the encoding cannot be loaded (tiktoken missing or its files not
+    downloadable) counts are approximated with 4 characters per token.
+    """
+
+    def __init__(self, model: str = TARGET_MODEL):
+        self.model = model
+        try:
+            import tiktoken
+
+            try:
+                self.encoding = tiktoken.encoding_for_model(model)
+            except KeyError:
+                self.encoding = tiktoken.get_encoding("o200k_base")
+        except Exception as error:
+            logger.warning("No tokenizer for %s (%s), approximating token counts", model, error)
+            self.encoding = None
+
+    def count(self, text: str) -> int:
+        if self.encoding is None:
+            return math.ceil(len(text) / 4)
+        return len(self.encoding.encode(text))
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        if self.encoding is None:
+            return text[: max_tokens * 4]
+        return self.encoding.decode(self.encoding.encode(text)[:max_tokens])
+
+
+@lru_cache(maxsize=None)
+def tokenizer_for(model: str = TARGET_MODEL) -> Tokenizer:
+    return Tokenizer(model)
+
+
+def pack_examples(
+    questions: List[ParsedQuestion],
+    budget: int,
+    tokenizer: Tokenizer,
+    render=lambda question: question.example,
+    trim: bool = False,
+) -> Tuple[List[ParsedQuestion], int]:
+    """Keeps questions, in relevance order, while their rendered tokens fit in ``budget``.
+
+    A question that does not fit is skipped, or with ``trim`` shortened to the
+    remaining budget when possible, and packing goes on with the next ones.
+    Returns the kept questions and the tokens they use.
+    """
+    packed, used = [], 0
+    for question in questions:
+        tokens = tokenizer.count(render(question))
+        if used + tokens > budget and trim:
+            overhead = tokens - tokenizer.count(question.example)
+            trimmed = question.trimmed(tokenizer, budget - used - overhead)
+            if trimmed is not None:
+                question, tokens = trimmed, tokenizer.count(render(trimmed))
+        if used + tokens > budget:
+            continue
+        packed.append(question)
+        used += tokens
+    return packed, used
+
+
+_parsed_questions: "weakref.WeakKeyDictionary[FAISS, Dict[str, ParsedQuestion]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def parsed_question(vector_store: FAISS, doc: Document) -> ParsedQuestion:
+    """Returns the parsed fields of a document of ``vector_store``.
+
+    Indexes built with "statement" and "alternatives" metadata columns are
+    used as is; otherwise each document is parsed once, on first retrieval,
+    and kept for the lifetime of the loaded store.
+    """
+    if "statement" in doc.metadata:
+        return ParsedQuestion(doc.metadata["statement"], doc.metadata.get("alternatives"))
+
+    parsed = _parsed_questions.setdefault(vector_store, {})
+    key = doc.id or doc.page_content
+    if key not in parsed:
+        parsed[key] = parse_question(doc.page_content)
+    return parsed[key]
+
+
+class PromptCache:
+    """Thread-safe LRU cache of formatted few-shot prompts."""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._prompts: "OrderedDict[Hashable, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[str]:
+        with self._lock:
+            prompt = self._prompts.get(key)
+            if prompt is None:
+                self.misses += 1
+                return None
+            self._prompts.move_to_end(key)
+            self.hits += 1
+            return prompt
+
+    def put(self, key: Hashable, prompt: str) -> None:
+        with self._lock:
+            self._prompts[key] = prompt
+            self._prompts.move_to_end(key)
+            while len(self._prompts) > self.max_entries:
+                self._prompts.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._prompts),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._prompts.clear()
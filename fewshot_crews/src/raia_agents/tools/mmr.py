@@ -0,0 +1,84 @@
+import threading
+from typing import List, Sequence, Tuple
+
+import faiss
+import numpy as np
+
+ScoredIds = List[Tuple[int, float]]
+
+# Indexes are shared by concurrent questions; the map is built by one thread.
+_direct_map_lock = threading.Lock()
+
+
+def ensure_direct_map(index: faiss.Index) -> None:
+    """Builds the direct map an IVF index needs to reconstruct vectors by id.
+
+    Does nothing for other indexes or when the map already exists. The map
+    lives in memory, so memory-mapped indexes are not written to.
+    """
+    try:
+        ivf = faiss.extract_index_ivf(index)
+    except RuntimeError:
+        return
+    with _direct_map_lock:
+        if ivf.direct_map.type == faiss.DirectMap.NoMap:
+            ivf.make_direct_map()
+
+
+def reconstruct_vectors(index: faiss.Index, ids: Sequence[int]) -> np.ndarray:
+    """Reads the stored vectors of ``ids`` back from the index, without re-embedding.
+
+    IVF indexes need a direct map to reconstruct by id; IndexRegistry builds
+    it on load, and it is built here for indexes loaded otherwise. PQ
+    indexes return the decoded (approximate) vectors.
+    """
+    ensure_direct_map(index)
+    return index.reconstruct_batch(np.asarray(ids, dtype=np.int64))
+
+
+def mmr_select(
+    relevance: np.ndarray, vectors: np.ndarray, k: int, diversity: float
+) -> List[int]:
+    """Greedy maximal marginal relevance over the candidates.
+
+    Each step picks the candidate maximizing
+    ``(1 - diversity) * relevance - diversity * max cosine similarity to the
+    already selected ones``. The pairwise similarities are computed once as a
+    single matrix product. Returns positions into ``relevance``.
+    """
+    n = len(relevance)
+    if n == 0 or k <= 0:
+        return []
+    unit = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    similarity = unit @ unit.T
+
+    relevance = np.asarray(relevance, dtype=np.float64)
+    max_similarity = np.full(n, -np.inf)
+    available = np.ones(n, dtype=bool)
+    selected = []
+    for _ in range(min(k, n)):
+        penalty = np.where(np.isfinite(max_similarity), max_similarity, 0.0)
+        scores = (1 - diversity) * relevance - diversity * penalty
+        scores[~available] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        available[best] = False
+        max_similarity = np.maximum(max_similarity, similarity[best])
+    return selected
+
+
+def rerank(
+    index: faiss.Index, candidates: ScoredIds, k: int, diversity: float = 0.0
+) -> ScoredIds:
+    """Keeps ``k`` of the ``(FAISS id, score)`` candidates, ranked by score.
+
+    With ``diversity`` > 0 they are chosen by MMR over the stored vectors instead,
+    trading relevance for examples that differ from each other (1 = only
+    diversity). Candidates must be sorted by decreasing score.
+    """
+    if not diversity or len(candidates) <= 1:
+        return candidates[:k]
+    ids = [i for i, _ in candidates]
+    relevance = np.array([score for _, score in candidates])
+    vectors = reconstruct_vectors(index, ids)
+    return [candidates[position] for position in mmr_select(relevance, vectors, k, diversity)]
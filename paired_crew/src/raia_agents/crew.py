@@ -1,11 +1,17 @@
-from typing import List
+from typing import Dict, List, Optional
 
 from crewai import Agent, Crew, Process, Task
 from crewai.agents.agent_builder.base_agent import BaseAgent
 from crewai.project import CrewBase, agent, crew, task
 from crewai_tools import SerperDevTool
 
-from src.raia_agents.tools.custom_tool import RawParagraphTool, RetrieveQuestoesTool
+from src.raia_agents.tools.custom_tool import (
+    RawParagraphsBatchTool,
+    RawParagraphTool,
+    RetrieveQuestoesTool,
+)
+from src.raia_agents.tools.request_cache import apply_cached_outputs
+from src.raia_agents.tools.task_graph import schedule_parallel
 
 @CrewBase
 class RaiaAgents:
@@ -14,9 +20,13 @@ class RaiaAgents:
     agents: List[BaseAgent]
     tasks: List[Task]
 
-    def __init__(self, question_id, prompt):
+    def __init__(
+        self, question_id, prompt, cached_outputs: Optional[Dict[str, str]] = None
+    ):
         self.question_id = question_id
         self.prompt = prompt
+        # Outputs of melhorar_pergunta/filtrar_topicos reused from the request cache.
+        self.cached_outputs = cached_outputs
 
     agents_config = "config/agents.yaml"
     tasks_config = "config/tasks.yaml"
@@ -46,25 +56,23 @@ class RaiaAgents:
             verbose=True,
         )
 
+    # The result files of the tasks are written by main.py through ResultSink.
     @task
     def melhorar_pergunta(self) -> Task:
         return Task(  # type: ignore
             config=self.tasks_config["melhorar_pergunta"],
-            output_file=f"resultados/{self.question_id}/prompt_melhorado.json",
         )
 
     @task
     def filtrar_topicos(self) -> Task:
         return Task(
             config=self.tasks_config["filtrar_topicos"],
-            output_file=f"resultados/{self.question_id}/topicos_questao.json",
         )
 
     @task
     def selecionar_questoes(self) -> Task:
         return Task(
             config=self.tasks_config["selecionar_questoes"],
-            output_file=f"resultados/{self.question_id}/few_shot_prompt.json",
         )
 
     @crew
@@ -73,7 +81,8 @@ class RaiaAgents:
 
         return Crew(
             agents=self.agents,  # Automatically created by the @agent decorator
-            tasks=self.tasks,  # Automatically created by the @task decorator
+            # Automatically created by the @task decorator
+            tasks=schedule_parallel(apply_cached_outputs(self.tasks, self.cached_outputs)),
             process=Process.sequential,
             verbose=True,
             output_log_file="logs.json",
@@ -94,7 +103,7 @@ class RaiaRedacaoCrew:
     def pesquisa_e_extracao(self) -> Agent:
         return Agent(
             config=self.agents_config["pesquisa_e_extracao"],
-            tools=[SerperDevTool(), RawParagraphTool()],
+            tools=[SerperDevTool(), RawParagraphTool(), RawParagraphsBatchTool()],
             verbose=True,
         )
 
@@ -126,14 +135,12 @@ class RaiaRedacaoCrew:
     def pesquisa_questao(self) -> Task:
         return Task(
             config=self.tasks_config["buscar_dados_para_questao"],
-            output_file=f"resultados/{self.question_id}/buscar_dados_para_questao.json",
         )
 
     @task
     def geração_questao(self) -> Task:
         return Task(
             config=self.tasks_config["geração_questao"],
-            output_file=f"resultados/{self.question_id}/questao_gerada.json",
             context=[],
         )
 
@@ -141,21 +148,19 @@ class RaiaRedacaoCrew:
     def resolucao_questao(self) -> Task:
         return Task(
             config=self.tasks_config["resolucao_questao"],
-            output_file=f"resultados/{self.question_id}/resolucao.json",
         )
 
     @task
     def correção_questao(self) -> Task:
         return Task(
             config=self.tasks_config["correção_questao"],
-            output_file=f"resultados/{self.question_id}/questao_corrigida.json",
         )
 
     @crew
     def crew(self) -> Crew:
         return Crew(
             agents=self.agents,
-            tasks=self.tasks,
+            tasks=schedule_parallel(self.tasks),
             process=Process.sequential,
             verbose=True,
             output_log_file="logs.json",
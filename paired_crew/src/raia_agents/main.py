@@ -1,6 +1,16 @@
+import json
 import warnings
 
 from raia_agents.crew import RaiaAgents, RaiaRedacaoCrew
+from src.raia_agents.tools.batch_runner import BatchRunner, crew_usage, print_summary
+from src.raia_agents.tools.crew_factory import CrewFactory
+# Same module object as the tool used by crew.py.
+from src.raia_agents.tools.custom_tool import embeddings, page_cache, prompt_cache
+from src.raia_agents.tools.few_shot import tokenizer_for
+from src.raia_agents.tools.paired_pipeline import PairedPipeline
+from src.raia_agents.tools.request_cache import CACHED_TASKS, SemanticRequestCache
+from src.raia_agents.tools.result_sink import ResultSink
+from src.raia_agents.tools.run_manifest import RunManifest, restart_requested, resume_requested
 import time
 warnings.filterwarnings("ignore", category=SyntaxWarning, module="pysbd")
 
@@ -61,39 +71,55 @@ def run():
         #{"input_user": "Gera uma questão de química sobre equilíbrio químico."},
         #{"input_user": "Preciso de uma questão de geografia sobre biomas brasileiros."},
     ]
-    try:
-        for idx, request in enumerate(inputs):
-            start_time = time.time()
-            busca_crew = RaiaAgents(idx, request.get("input_user")).crew()
-            busca_crew.kickoff(inputs=request)
-            RaiaAgents(idx, request.get("input_user")).crew().kickoff(inputs=request)
-
-            with open(f"./resultados/{idx}/few_shot_prompt.json", encoding="utf-8") as f:
-                few_shot_prompt = f.read()
+    request_cache = SemanticRequestCache(embeddings)
+    result_sink = ResultSink()
+    # Configs, agents, LLMs and tools are built once; each question gets a copy.
+    busca_factory = CrewFactory(lambda question_id: RaiaAgents(question_id, None).crew())
+    redacao_factory = CrewFactory(lambda question_id: RaiaRedacaoCrew(question_id).crew())
 
-            with open(f"./resultados/{idx}/topicos_questao.json", encoding="utf-8") as f:
-                topicos = f.read()
+    pipeline = PairedPipeline(busca_factory, redacao_factory)
 
-            with open(f"./resultados/{idx}/prompt_melhorado.json", encoding="utf-8") as f:
-                solicitacao_melhorada = f.read()
-            outputs = {
-                "solicitacao_melhorada": f"{solicitacao_melhorada}",
-                "topicos": f"{topicos}",
-                "few_shot_prompt": f"{few_shot_prompt}",
-            }
-            redacao_crew = RaiaRedacaoCrew(idx).crew()
-            redacao_crew.kickoff(inputs=outputs)
-            end_time = time.time()
+    def run_question(idx, request):
+        start_time = time.time()
+        cached_outputs = request_cache.lookup(request["input_user"])
+        result = pipeline.run(idx, request, cached_outputs)
+        if cached_outputs is None:
+            request_cache.store(
+                request["input_user"],
+                {name: result.outputs[name] for name in CACHED_TASKS},
+            )
+        end_time = time.time()
 
-            metrics_busca = busca_crew.usage_metrics
-            metrics_redacao = redacao_crew.usage_metrics
-            total_tokens = metrics_busca.prompt_tokens + metrics_busca.completion_tokens + metrics_redacao.prompt_tokens + metrics_redacao.completion_tokens
-            print("Total tokens used:", total_tokens)
-            print(f"Execution time for crew {idx}: {end_time - start_time} seconds")
+        total_tokens = crew_usage(result.crew_outputs)[1]
+        few_shot_tokens = tokenizer_for().count(result.outputs["selecionar_questoes"])
+        timings = ", ".join(f"{name}={seconds:.1f}s" for name, seconds in result.timings.items())
+        print("Total tokens used:", total_tokens)
+        print(f"Execution time for crew {idx}: {end_time - start_time} seconds ({timings})")
 
-            with open(f"./resultados/{idx}/usage.json", "w") as log_file:
-                log_file.write("{\n"+f'"token_usage": {total_tokens},\n')
-                log_file.write(f'"execution_time": {end_time - start_time} seconds\n'+ "}")
+        result_sink.write_outputs(idx, result.outputs)
+        result_sink.write(
+            idx,
+            "usage.json",
+            "{\n"+f'"token_usage": {total_tokens},\n'
+            + f'"few_shot_prompt_tokens": {few_shot_tokens},\n'
+            + f'"phase_seconds": {json.dumps(result.timings)},\n'
+            + f'"execution_time": {end_time - start_time} seconds\n'+ "}",
+        )
+        return result.crew_outputs
 
-    except Exception as e:
-        raise Exception(f"An error occurred while running the crew: {e}")
+    # Questions already done (or running in another worker of the run) are
+    # skipped; --resume also retries the failed ones, --restart runs them all again.
+    manifest = RunManifest(strategy="paired")
+    manifest.enqueue(
+        {str(idx): request for idx, request in enumerate(inputs)},
+        reset=restart_requested(),
+        retry_failed=resume_requested(),
+    )
+    try:
+        print_summary(BatchRunner(run_question).run(inputs, manifest=manifest))
+        print("Run manifest:", manifest.summary())
+        print("Few-shot prompt cache:", prompt_cache.stats())
+        print("Request cache:", request_cache.stats())
+        print("Page cache:", page_cache.stats())
+    finally:
+        result_sink.close()
@@ -1,4 +1,4 @@
-from typing import Type
+from typing import List, Optional, Type
 
 import faiss
 from crewai.tools import BaseTool
@@ -8,14 +8,56 @@ from langchain_community.vectorstores import FAISS
 from langchain_openai import OpenAIEmbeddings
 from litellm import BaseModel, Field
 
+from .batch_search import DEFAULT_SEARCH_MODE, search_many
+from .embedding_cache import CachedEmbeddings
+from .few_shot import (
+    DEFAULT_TOKEN_BUDGET,
+    DEFAULT_TRIM_PASSAGES,
+    PromptCache,
+    pack_examples,
+    parsed_question,
+    tokenizer_for,
+)
+from .html_stream import aread_paragraphs, read_paragraphs
+from .index_registry import IndexRegistry
+from .lexical_index import tokenize
+from .page_cache import PageCache
+from .page_fetcher import fetcher
+from .paragraph_ranker import (
+    DEFAULT_CANDIDATE_CHARS,
+    DEFAULT_MIN_WORDS,
+    DEFAULT_SCRAPE_MODE,
+    clean_paragraphs,
+    rank_pages,
+)
+
 index = faiss.IndexFlatL2()
-embeddings = OpenAIEmbeddings(model="text-embedding-ada-002")
+embeddings = CachedEmbeddings(OpenAIEmbeddings(model="text-embedding-ada-002"))
 vector_store = FAISS(
     embedding_function=embeddings,
     index=index,
     docstore=InMemoryDocstore(),
     index_to_docstore_id={},
 )
+index_registry = IndexRegistry(embeddings)
+# Formatted prompts keyed by the arguments of the call and the index version.
+prompt_cache = PromptCache()
+# Pages already scraped are served from disk (see PageCache).
+page_cache = PageCache(fetcher)
+
+QUESTIONS_FOLDER = "artifacts/questions_faiss_v2/"
+EXAMPLE_PROMPT = PromptTemplate(
+    input_variables=["questao"], template="Questão: \n{questao}\n\n"
+)
+FEW_SHOT_PREFIX = "Aqui estão exemplos de questões no tópico fornecido:"
+FEW_SHOT_SUFFIX = "Gere uma nova questão de acordo com o tema: {input}"
+# Characters of paragraphs returned per page by RawParagraphTool.
+RAW_PARAGRAPHS_MAX_CHARS = 10000
+# Names the RawParagraphTool extraction in the page cache.
+RAW_PARAGRAPHS_EXTRACTOR = f"raw_html_paragraphs:stream:{RAW_PARAGRAPHS_MAX_CHARS}"
+TEXT_PARAGRAPHS_EXTRACTOR = (
+    f"text_paragraphs:stream:{DEFAULT_CANDIDATE_CHARS}:{DEFAULT_MIN_WORDS}"
+)
 
 class RagToolSchema(BaseModel):
     """Schema para pegar o tópico de interesse do usuário para poder gerar questões"""
@@ -29,6 +71,10 @@ class RagToolSchema(BaseModel):
     threshold: float = Field(
         description="Limite de similaridade para considerar um trecho relevante. Um valor razoável é 0.3 e no máximo 0.5, mas pode ser ajustado conforme necessário."
     )
+    diversity: Optional[float] = Field(
+        default=None,
+        description="Peso de diversidade entre 0 e 1 para evitar exemplos de questões quase idênticos (0 ordena só por similaridade). Um valor razoável é 0.3.",
+    )
 
 
 class RetrieveQuestoesTool(BaseTool):
@@ -37,84 +83,190 @@ class RetrieveQuestoesTool(BaseTool):
         "Function that retrieves data of a database, based on user topic of interest, so that it helps to generate questions."
     )
     args_schema: Type[BaseModel] = RagToolSchema
+    # "vector", "hybrid" (vector + BM25) or "lexical" (BM25 only, no API call).
+    search_mode: str = DEFAULT_SEARCH_MODE
+    # Token budget of the whole prompt for the target model (0 = no limit).
+    token_budget: int = DEFAULT_TOKEN_BUDGET
+    trim_passages: bool = DEFAULT_TRIM_PASSAGES
 
     def _run(
-        self, topic: str, amount_to_retrieve: int = 5, threshold: float = 0.3
+        self,
+        topic: str,
+        amount_to_retrieve: int = 5,
+        threshold: float = 0.3,
+        diversity: Optional[float] = None,
     ) -> str:
-        vector_store = FAISS.load_local(
-            "artifacts/questions_faiss_v2/",
-            embeddings,
-            allow_dangerous_deserialization=True,
-        )
-        docs = vector_store.similarity_search_with_relevance_scores(
-            k=amount_to_retrieve,
-            query=topic,
-            score_threshold=threshold,
+        vector_store = index_registry.get(QUESTIONS_FOLDER)
+        cache_key = (
+            topic,
+            amount_to_retrieve,
+            threshold,
+            diversity or 0.0,
+            self.search_mode,
+            self.token_budget,
+            self.trim_passages,
+            index_registry.version(QUESTIONS_FOLDER),
         )
+        prompt = prompt_cache.get(cache_key)
+        if prompt is not None:
+            return prompt
 
-        examples = [
-            {
-                "questao":
-                    f"{doc.page_content.split('Alternatives')[0].strip()}\n\n" +
-                    (
-                        f"Alternativas:\n{doc.page_content.split('Alternatives:')[1].strip()}"
-                        if "Alternatives:" in doc.page_content
-                        else "Alternativas não encontradas."
-                    )
-            }
-            for doc, _ in docs
-        ]
-
-        example_prompt = PromptTemplate(
-            input_variables=["questao"], template="Questão: \n{questao}\n\n"
-        )
+        if self.search_mode == "vector" and not diversity:
+            docs = vector_store.similarity_search_with_relevance_scores(
+                k=amount_to_retrieve,
+                query=topic,
+                score_threshold=threshold,
+            )
+        else:
+            docs = search_many(
+                {"questions": vector_store},
+                [topic],
+                amount_to_retrieve,
+                threshold,
+                self.search_mode,
+                diversity or 0.0,
+            )[0]["questions"]
+
+        questions = [parsed_question(vector_store, doc) for doc, _ in docs]
+        if self.token_budget:
+            tokenizer = tokenizer_for()
+            fixed_tokens = tokenizer.count(
+                f"{FEW_SHOT_PREFIX}\n\n{FEW_SHOT_SUFFIX.format(input=topic)}"
+            )
+            questions, _ = pack_examples(
+                questions,
+                self.token_budget - fixed_tokens,
+                tokenizer,
+                # Each example is followed by the "\n\n" example separator.
+                render=lambda question: EXAMPLE_PROMPT.format(questao=question.example)
+                + "\n\n",
+                trim=self.trim_passages,
+            )
 
         few_shot_prompt = FewShotPromptTemplate(
-            examples=examples,
-            example_prompt=example_prompt,
-            prefix="Aqui estão exemplos de questões no tópico fornecido:",
-            suffix="Gere uma nova questão de acordo com o tema: {input}",
+            examples=[{"questao": question.example} for question in questions],
+            example_prompt=EXAMPLE_PROMPT,
+            prefix=FEW_SHOT_PREFIX,
+            suffix=FEW_SHOT_SUFFIX,
             input_variables=["input"],
         )
 
         prompt = few_shot_prompt.format(input=topic)
+        prompt_cache.put(cache_key, prompt)
         return prompt
 
 
+def _scraped_results(pages: dict) -> dict:
+    if DEFAULT_SCRAPE_MODE == "raw":
+        return {
+            url: {"erro": str(page)} if isinstance(page, Exception) else page
+            for url, page in pages.items()
+        }
+    return {
+        url: {"erro": str(page)} if isinstance(page, Exception) else {"paragrafos": page}
+        for url, page in pages.items()
+    }
+
+
+def _rank_pages(pages: dict, topic: str) -> dict:
+    # Same stemming as the BM25 index of the questions, and the model's token counts.
+    return rank_pages(pages, topic, tokenize=tokenize, count_tokens=tokenizer_for().count)
+
+
 class RawParagraphInput(BaseModel):
     url: str = Field(..., description="URL da página a extrair")
+    topic: str = Field("", description="Tema da busca, usado para escolher os parágrafos")
 
 
 class RawParagraphTool(BaseTool):
     # → ANOTAÇÃO de tipo obrigatória
-    name: str = "raw_paragraphs"
+    name: str = "page_paragraphs"
     description: str = (
         "Dada uma URL, retorna todos os parágrafos <p> na íntegra, sem limpar "
         "ou alterar nada no texto original."
+        if DEFAULT_SCRAPE_MODE == "raw"
+        else "Dada uma URL e o tema da busca, retorna o texto dos parágrafos da "
+        "página mais relevantes para o tema, na íntegra e na ordem da página, sem "
+        "menus, avisos ou parágrafos repetidos."
     )
     args_schema: Type[BaseModel] = RawParagraphInput
 
-    def _run(self, url: str) -> dict:
-        import requests
-        from bs4 import BeautifulSoup
+    # The page is parsed while it downloads and reading stops once the
+    # paragraphs reach RAW_PARAGRAPHS_MAX_CHARS (see html_stream).
+    @staticmethod
+    def _read(response) -> dict:
+        paras = read_paragraphs(response, max_chars=RAW_PARAGRAPHS_MAX_CHARS)
+        return {"raw_html_paragraphs": paras}
+
+    @staticmethod
+    async def _aread(response) -> dict:
+        paras = await aread_paragraphs(response, max_chars=RAW_PARAGRAPHS_MAX_CHARS)
+        return {"raw_html_paragraphs": paras}
+
+    # Ranked mode caches the clean paragraphs and ranks them for each topic.
+    @staticmethod
+    def _read_text(response) -> List[str]:
+        return clean_paragraphs(
+            read_paragraphs(response, max_chars=DEFAULT_CANDIDATE_CHARS, text_only=True)
+        )
+
+    @staticmethod
+    async def _aread_text(response) -> List[str]:
+        return clean_paragraphs(
+            await aread_paragraphs(response, max_chars=DEFAULT_CANDIDATE_CHARS, text_only=True)
+        )
 
-        resp = requests.get(url)
-        resp.raise_for_status()
-        soup = BeautifulSoup(resp.text, "html.parser")
+    def _run(self, url: str, topic: str = "") -> dict:
+        if DEFAULT_SCRAPE_MODE == "raw":
+            return page_cache.paragraphs(url, self._read, RAW_PARAGRAPHS_EXTRACTOR)
+        paragraphs = page_cache.paragraphs(url, self._read_text, TEXT_PARAGRAPHS_EXTRACTOR)
+        return _scraped_results(_rank_pages({url: paragraphs}, topic))[url]
 
-        paras = []
-        total_chars = 0
-        max_chars = 10000
+    async def _arun(self, url: str, topic: str = "") -> dict:
+        if DEFAULT_SCRAPE_MODE == "raw":
+            return await page_cache.aparagraphs(url, self._aread, RAW_PARAGRAPHS_EXTRACTOR)
+        paragraphs = await page_cache.aparagraphs(
+            url, self._aread_text, TEXT_PARAGRAPHS_EXTRACTOR
+        )
+        return _scraped_results(_rank_pages({url: paragraphs}, topic))[url]
 
-        for p in soup.find_all("p"):
-            p_str = str(p)
-            if total_chars + len(p_str) > max_chars:
-                break
-            paras.append(p_str)
-            total_chars += len(p_str)
 
-        return {"raw_html_paragraphs": paras}
+class RawParagraphsBatchInput(BaseModel):
+    urls: List[str] = Field(..., description="URLs das páginas a extrair")
+    topic: str = Field("", description="Tema da busca, usado para escolher os parágrafos")
 
-    async def _arun(self, url: str) -> dict:
-        # se seu framework chamar async
-        return self._run(url)
+
+class RawParagraphsBatchTool(BaseTool):
+    name: str = "page_paragraphs_batch"
+    description: str = (
+        "Dada uma lista de URLs (por exemplo, os resultados da busca), baixa as "
+        "páginas ao mesmo tempo e retorna, para cada URL, os parágrafos <p> "
+        "na íntegra, sem limpar ou alterar nada no texto original."
+        if DEFAULT_SCRAPE_MODE == "raw"
+        else "Dada uma lista de URLs (por exemplo, os resultados da busca) e o tema "
+        "da busca, baixa as páginas ao mesmo tempo e retorna, para cada URL, o "
+        "texto na íntegra dos parágrafos mais relevantes para o tema."
+    )
+    args_schema: Type[BaseModel] = RawParagraphsBatchInput
+
+    def _run(self, urls: List[str], topic: str = "") -> dict:
+        if DEFAULT_SCRAPE_MODE == "raw":
+            return _scraped_results(
+                page_cache.paragraphs_many(urls, RawParagraphTool._read, RAW_PARAGRAPHS_EXTRACTOR)
+            )
+        pages = page_cache.paragraphs_many(
+            urls, RawParagraphTool._read_text, TEXT_PARAGRAPHS_EXTRACTOR
+        )
+        return _scraped_results(_rank_pages(pages, topic))
+
+    async def _arun(self, urls: List[str], topic: str = "") -> dict:
+        if DEFAULT_SCRAPE_MODE == "raw":
+            return _scraped_results(
+                await page_cache.aparagraphs_many(
+                    urls, RawParagraphTool._aread, RAW_PARAGRAPHS_EXTRACTOR
+                )
+            )
+        pages = await page_cache.aparagraphs_many(
+            urls, RawParagraphTool._aread_text, TEXT_PARAGRAPHS_EXTRACTOR
+        )
+        return _scraped_results(_rank_pages(pages, topic))
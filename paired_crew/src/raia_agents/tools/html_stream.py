@@ -0,0 +1,212 @@
+import codecs
+import os
+from html.parser import HTMLParser
+from typing import List, Optional
+
+# Bytes read from a page at most; the rest of the body is never downloaded.
+DEFAULT_MAX_BYTES = int(float(os.environ.get("RAIA_SCRAPE_MAX_MB", "2")) * (1 << 20))
+
+HTML_CONTENT_TYPES = ("text/html", "application/xhtml+xml")
+# Start tags that close an open <p> (HTML's implied </p>).
+CLOSES_PARAGRAPH = frozenset(
+    "address article aside blockquote details div dl fieldset figcaption figure footer "
+    "form h1 h2 h3 h4 h5 h6 header hr main menu nav ol p pre section table ul".split()
+)
+VOID_TAGS = frozenset(
+    "area base br col embed hr img input link meta source track wbr".split()
+)
+# With text_only: elements whose text is never page content...
+SKIPPED_TAGS = frozenset("script style noscript template svg".split())
+# ...and page chrome, whose paragraphs are menus, banners and legal notes.
+CHROME_TAGS = frozenset("nav header footer aside form".split())
+# With text_only, paragraphs with a larger share of link text are dropped.
+MAX_LINK_SHARE = 0.5
+
+
+class NotHtmlError(ValueError):
+    pass
+
+
+class ParagraphParser(HTMLParser):
+    """Incremental parser that collects the <p> elements of a page.
+
+    Fed chunk by chunk, it keeps only the open paragraph, never the
+    document. Paragraphs are closed by </p>, by a tag that implies </p> or
+    by the end of an enclosing element. By default a paragraph is kept as
+    written in the page (tags, attributes and entities included). With
+    ``text_only`` it is reduced to its whitespace-normalized text. Scripts,
+    styles and paragraphs inside page chrome (nav, header, footer, aside,
+    form) are then left out, as are paragraphs that are mostly link text.
+    With ``max_chars``, ``done`` is set once the next paragraph would not
+    fit, and parsing can stop.
+    """
+
+    def __init__(self, max_chars: Optional[int] = None, text_only: bool = False):
+        super().__init__(convert_charrefs=text_only)
+        self.max_chars = max_chars
+        self.text_only = text_only
+        self.paragraphs: List[str] = []
+        self.chars = 0
+        self.done = False
+        self._current: Optional[List[str]] = None
+        self._open: List[str] = []
+        self._link_chars = 0
+        self._in_link = 0
+        self._skipped = 0
+        self._chrome = 0
+
+    def _close_paragraph(self) -> None:
+        if self._current is None:
+            return
+        if self.text_only:
+            paragraph = " ".join("".join(self._current).split())
+            keep = paragraph and self._link_chars <= MAX_LINK_SHARE * len(paragraph)
+        else:
+            paragraph = "".join(self._current) + "</p>"
+            keep = True
+        self._current = None
+        self._open = []
+        self._link_chars = self._in_link = 0
+        if not keep:
+            return
+        if self.max_chars is not None and self.chars + len(paragraph) > self.max_chars:
+            self.done = True
+            return
+        self.paragraphs.append(paragraph)
+        self.chars += len(paragraph)
+
+    def handle_starttag(self, tag, attrs):
+        if self.done:
+            return
+        if tag in CLOSES_PARAGRAPH:
+            self._close_paragraph()
+        if self.text_only:
+            if tag in SKIPPED_TAGS:
+                self._skipped += 1
+            elif tag in CHROME_TAGS:
+                self._chrome += 1
+        if tag == "p":
+            if not (self.text_only and self._chrome):
+                self._current = [] if self.text_only else [self.get_starttag_text()]
+        elif self._current is not None:
+            if tag == "a":
+                self._in_link += 1
+            if not self.text_only:
+                self._current.append(self.get_starttag_text())
+            elif tag == "br":
+                self._current.append(" ")
+            if tag not in VOID_TAGS:
+                self._open.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        if self._current is not None and not self.done:
+            self._current.append(" " if self.text_only else self.get_starttag_text())
+
+    def handle_endtag(self, tag):
+        if self.done:
+            return
+        if self.text_only:
+            if tag in SKIPPED_TAGS and self._skipped:
+                self._skipped -= 1
+            elif tag in CHROME_TAGS and self._chrome:
+                self._close_paragraph()
+                self._chrome -= 1
+        if self._current is None:
+            return
+        if tag in self._open:
+            while self._open and self._open.pop() != tag:
+                pass
+            if tag == "a" and self._in_link:
+                self._in_link -= 1
+            if not self.text_only:
+                self._current.append(f"</{tag}>")
+        else:
+            # </p> or the end of an element around the paragraph.
+            self._close_paragraph()
+
+    def handle_data(self, data):
+        if self._current is None or self.done or (self.text_only and self._skipped):
+            return
+        self._current.append(data)
+        if self._in_link:
+            self._link_chars += len(data.strip())
+
+    def handle_entityref(self, name):
+        self.handle_data(f"&{name};")
+
+    def handle_charref(self, name):
+        self.handle_data(f"&#{name};")
+
+    def finish(self) -> List[str]:
+        """Ends the document, closing a paragraph still open, and returns the paragraphs."""
+        if not self.done:
+            self.close()
+            self._close_paragraph()
+        return self.paragraphs
+
+
+def check_html(response) -> None:
+    content_type = response.headers.get("content-type", "")
+    media_type = content_type.split(";", 1)[0].strip().lower()
+    if media_type and media_type not in HTML_CONTENT_TYPES:
+        raise NotHtmlError(f"{response.url} não é uma página HTML ({media_type})")
+
+
+class _Reader:
+    """Feeds the chunks of a streamed response to a ParagraphParser."""
+
+    def __init__(self, response, max_chars: Optional[int], max_bytes: int, text_only: bool):
+        check_html(response)
+        self.response = response
+        self.max_bytes = max_bytes
+        self.parser = ParagraphParser(max_chars, text_only)
+        self._decoder = codecs.getincrementaldecoder(response.encoding or "utf-8")(
+            errors="replace"
+        )
+
+    def feed(self, chunk: bytes) -> bool:
+        """Returns whether the rest of the body can be skipped."""
+        self.parser.feed(self._decoder.decode(chunk))
+        if not self.parser.done and self.max_bytes and (
+            self.response.num_bytes_downloaded >= self.max_bytes
+        ):
+            # The open paragraph is cut and left out.
+            self.parser.done = True
+        return self.parser.done
+
+    def finish(self) -> List[str]:
+        if not self.parser.done:
+            self.parser.feed(self._decoder.decode(b"", final=True))
+        return self.parser.finish()
+
+
+def read_paragraphs(
+    response,
+    max_chars: Optional[int] = None,
+    max_bytes: int = DEFAULT_MAX_BYTES,
+    text_only: bool = False,
+) -> List[str]:
+    """Returns the <p> elements of a streamed httpx response (see ParagraphParser).
+
+    The body is read chunk by chunk and reading stops as soon as the
+    character budget is met or ``max_bytes`` were downloaded. Raises
+    NotHtmlError for a content type other than HTML.
+    """
+    reader = _Reader(response, max_chars, max_bytes, text_only)
+    for chunk in response.iter_bytes():
+        if reader.feed(chunk):
+            break
+    return reader.finish()
+
+
+async def aread_paragraphs(
+    response,
+    max_chars: Optional[int] = None,
+    max_bytes: int = DEFAULT_MAX_BYTES,
+    text_only: bool = False,
+) -> List[str]:
+    reader = _Reader(response, max_chars, max_bytes, text_only)
+    async for chunk in response.aiter_bytes():
+        if reader.feed(chunk):
+            break
+    return reader.finish()
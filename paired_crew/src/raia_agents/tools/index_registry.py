@@ -0,0 +1,175 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
+
+from langchain_community.vectorstores import FAISS
+from langchain_core.embeddings import Embeddings
+
+from .lexical_index import attach_folder
+from .mmap_store import load_vector_store
+from .mmr import ensure_direct_map
+
+logger = logging.getLogger(__name__)
+
+# With use_checksum, files whose size and mtime are unchanged are re-hashed at most this often.
+DEFAULT_CHECKSUM_INTERVAL = float(os.environ.get("RAIA_INDEX_CHECKSUM_INTERVAL", "300"))
+
+Fingerprint = Tuple[Tuple[str, int, int, str], ...]
+
+
+def _current_rss() -> int:
+    """Returns the resident set size of the process in bytes (0 if unknown)."""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def _file_checksum(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+@dataclass
+class IndexStats:
+    """Load statistics of one index kept by the registry."""
+
+    folder_path: str
+    version: str = ""
+    num_vectors: int = 0
+    load_seconds: float = 0.0
+    memory_bytes: int = 0
+    loads: int = 0
+    hits: int = 0
+
+
+@dataclass
+class _Entry:
+    lock: threading.Lock = field(default_factory=threading.Lock)
+    vector_store: Optional[FAISS] = None
+    fingerprint: Optional[Fingerprint] = None
+    hashed_at: float = 0.0
+    stats: Optional[IndexStats] = None
+
+
+class IndexRegistry:
+    """Process-wide cache of FAISS vector stores keyed by folder path.
+
+    Vector stores are loaded lazily on first use and shared by every caller,
+    from either the memory-mapped format or a FAISS.save_local folder.
+    An index is reloaded only when the files in its folder change, detected by
+    size and mtime or, with ``use_checksum=True``, by a SHA-256 of the content.
+    A file is hashed again when its size or mtime changed, otherwise at most
+    every ``checksum_interval`` seconds, so get() stays cheap on a hit.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        use_checksum: bool = False,
+        checksum_interval: float = DEFAULT_CHECKSUM_INTERVAL,
+    ):
+        self.embeddings = embeddings
+        self.use_checksum = use_checksum
+        self.checksum_interval = checksum_interval
+        self._entries: Dict[str, _Entry] = {}
+        self._lock = threading.Lock()
+
+    def _fingerprint(self, folder_path: str, entry: _Entry) -> Fingerprint:
+        """Fingerprints the files of ``folder_path``, reusing the checksums in ``entry``.
+
+        Called with ``entry.lock`` held.
+        """
+        rehash = time.monotonic() - entry.hashed_at >= self.checksum_interval
+        known = {} if rehash else {file[:3]: file[3] for file in entry.fingerprint or ()}
+        files = []
+        for name in sorted(os.listdir(folder_path)):
+            path = os.path.join(folder_path, name)
+            if not os.path.isfile(path):
+                continue
+            stat = os.stat(path)
+            identity = (name, stat.st_size, stat.st_mtime_ns)
+            checksum = ""
+            if self.use_checksum:
+                checksum = known.get(identity) or _file_checksum(path)
+            files.append((*identity, checksum))
+        if self.use_checksum and rehash:
+            entry.hashed_at = time.monotonic()
+        return tuple(files)
+
+    def _entry(self, key: str) -> _Entry:
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = _Entry()
+            return self._entries[key]
+
+    def get(self, folder_path: str) -> FAISS:
+        """Returns the vector store saved in ``folder_path``, loading it if needed."""
+        key = os.path.abspath(folder_path)
+        entry = self._entry(key)
+        with entry.lock:
+            fingerprint = self._fingerprint(key, entry)
+            if entry.vector_store is not None and entry.fingerprint == fingerprint:
+                entry.stats.hits += 1
+                return entry.vector_store
+
+            rss_before = _current_rss()
+            start = time.perf_counter()
+            vector_store = load_vector_store(key, self.embeddings)
+            # Built before the index is shared, for MMR and the topic classifier.
+            ensure_direct_map(vector_store.index)
+            elapsed = time.perf_counter() - start
+            attach_folder(vector_store, key)
+
+            stats = entry.stats or IndexStats(folder_path=key)
+            stats.version = hashlib.sha256(repr(fingerprint).encode()).hexdigest()[:16]
+            stats.num_vectors = vector_store.index.ntotal
+            stats.load_seconds = elapsed
+            stats.memory_bytes = max(_current_rss() - rss_before, 0)
+            stats.loads += 1
+
+            entry.vector_store = vector_store
+            entry.fingerprint = fingerprint
+            entry.stats = stats
+            logger.info(
+                "Loaded FAISS index %s (%d vectors) in %.3fs, +%.1f MiB RSS",
+                key,
+                stats.num_vectors,
+                stats.load_seconds,
+                stats.memory_bytes / (1 << 20),
+            )
+            return vector_store
+
+    def version(self, folder_path: str) -> str:
+        """Returns an id of the files the vector store last returned by get was loaded from.
+
+        It changes whenever the index is reloaded, so it can key caches of
+        results derived from the index.
+        """
+        entry = self._entry(os.path.abspath(folder_path))
+        if entry.stats is None:
+            self.get(folder_path)
+        return entry.stats.version
+
+    def stats(self) -> Dict[str, IndexStats]:
+        """Returns a snapshot of the load statistics of every loaded index."""
+        with self._lock:
+            entries = dict(self._entries)
+        return {
+            key: IndexStats(**vars(entry.stats))
+            for key, entry in entries.items()
+            if entry.stats is not None
+        }
+
+    def clear(self) -> None:
+        """Drops every cached vector store."""
+        with self._lock:
+            self._entries.clear()
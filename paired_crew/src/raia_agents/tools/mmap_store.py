@@ -0,0 +1,213 @@
+"""
+Memory-mapped artifact format for the FAISS vector stores.
+
+A folder in this format holds:
+
+- ``index.faiss``: the FAISS index, opened with ``IO_FLAG_MMAP_IFC`` so the
+  vectors stay in the OS page cache and are shared by every process;
+- ``texts.bin`` / ``texts.idx.npy``: concatenated UTF-8 page contents and the
+  ``n + 1`` byte offsets delimiting them;
+- ``records.bin`` / ``records.idx.npy``: the same for one JSON record per
+  document with its original id and metadata.
+
+Documents are decoded lazily, only for the ids a search returns, so loading
+takes milliseconds whatever the corpus size and needs no pickle.
+
+Convert a folder saved by FAISS.save_local (from retrieval_generate_crew/):
+python -m raia_agents.tools.mmap_store artifacts/questions_faiss artifacts/questions_faiss_mmap
+"""
+
+import argparse
+import json
+import mmap
+import os
+from array import array
+from collections.abc import Mapping
+from typing import Any, Dict, Iterable, Iterator, Optional, Union
+
+import faiss
+import numpy as np
+from langchain_community.docstore.base import Docstore
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+INDEX_FILE = "index.faiss"
+TEXTS_FILE = "texts.bin"
+TEXTS_OFFSETS_FILE = "texts.idx.npy"
+RECORDS_FILE = "records.bin"
+RECORDS_OFFSETS_FILE = "records.idx.npy"
+
+
+def is_mmap_store(folder_path: str) -> bool:
+    return os.path.exists(os.path.join(folder_path, TEXTS_OFFSETS_FILE))
+
+
+class _OffsetFile:
+    """Read-only view of variable-length rows stored as bytes plus offsets."""
+
+    def __init__(self, data_path: str, offsets_path: str):
+        self.offsets = np.load(offsets_path, mmap_mode="r")
+        with open(data_path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, row: int) -> bytes:
+        return self.data[int(self.offsets[row]) : int(self.offsets[row + 1])]
+
+
+class _OffsetFileWriter:
+    def __init__(self, data_path: str, offsets_path: str):
+        self.offsets_path = offsets_path
+        self.offsets = array("q", [0])
+        self.file = open(data_path, "wb")
+
+    def append(self, row: bytes) -> None:
+        self.file.write(row)
+        self.offsets.append(self.offsets[-1] + len(row))
+
+    def close(self) -> None:
+        self.file.close()
+        np.save(self.offsets_path, np.frombuffer(self.offsets, dtype=np.int64))
+
+
+class MmapDocstore(Docstore):
+    """Docstore reading documents lazily from the offset-indexed files.
+
+    Document ids are row numbers (as strings), matching the FAISS ids.
+    """
+
+    def __init__(self, folder_path: str):
+        self.texts = _OffsetFile(
+            os.path.join(folder_path, TEXTS_FILE),
+            os.path.join(folder_path, TEXTS_OFFSETS_FILE),
+        )
+        self.records = _OffsetFile(
+            os.path.join(folder_path, RECORDS_FILE),
+            os.path.join(folder_path, RECORDS_OFFSETS_FILE),
+        )
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def _row(self, search: str) -> Optional[int]:
+        try:
+            row = int(search)
+        except (TypeError, ValueError):
+            return None
+        return row if 0 <= row < len(self) else None
+
+    def metadata(self, row: int) -> Dict[str, Any]:
+        """Returns only the metadata of a row, without decoding its text."""
+        return json.loads(self.records[row])["metadata"]
+
+    def search(self, search: str) -> Union[str, Document]:
+        row = self._row(search)
+        if row is None:
+            return f"ID {search} not found."
+        record = json.loads(self.records[row])
+        return Document(
+            id=record.get("id"),
+            page_content=self.texts[row].decode("utf-8"),
+            metadata=record["metadata"],
+        )
+
+
+class RowIds(Mapping):
+    """``index_to_docstore_id`` for a MmapDocstore: FAISS id ``i`` maps to ``"i"``."""
+
+    def __init__(self, size: int):
+        self.size = size
+
+    def __getitem__(self, i: int) -> str:
+        if not 0 <= i < self.size:
+            raise KeyError(i)
+        return str(i)
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(range(self.size))
+
+    def __len__(self) -> int:
+        return self.size
+
+
+def read_index_mmap(path: str) -> faiss.Index:
+    """Opens a FAISS index with its vectors memory-mapped when the type allows it."""
+    try:
+        return faiss.read_index(path, faiss.IO_FLAG_MMAP_IFC | faiss.IO_FLAG_READ_ONLY)
+    except RuntimeError:
+        return faiss.read_index(path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+
+
+def write_mmap_store(
+    folder_path: str, index: faiss.Index, documents: Iterable[Document]
+) -> None:
+    """Writes ``index`` and its documents (in FAISS id order) in the mmap format."""
+    os.makedirs(folder_path, exist_ok=True)
+    texts = _OffsetFileWriter(
+        os.path.join(folder_path, TEXTS_FILE),
+        os.path.join(folder_path, TEXTS_OFFSETS_FILE),
+    )
+    records = _OffsetFileWriter(
+        os.path.join(folder_path, RECORDS_FILE),
+        os.path.join(folder_path, RECORDS_OFFSETS_FILE),
+    )
+    for document in documents:
+        texts.append(document.page_content.encode("utf-8"))
+        record = {"id": document.id, "metadata": document.metadata}
+        records.append(json.dumps(record, ensure_ascii=False).encode("utf-8"))
+    texts.close()
+    records.close()
+
+    num_texts = len(texts.offsets) - 1
+    if num_texts != index.ntotal:
+        raise ValueError(f"{num_texts} documents for an index of {index.ntotal} vectors")
+    faiss.write_index(index, os.path.join(folder_path, INDEX_FILE))
+
+
+def load_mmap_vector_store(folder_path: str, embeddings: Optional[Embeddings]) -> FAISS:
+    index = read_index_mmap(os.path.join(folder_path, INDEX_FILE))
+    docstore = MmapDocstore(folder_path)
+    return FAISS(
+        embedding_function=embeddings,
+        index=index,
+        docstore=docstore,
+        index_to_docstore_id=RowIds(len(docstore)),
+    )
+
+
+def load_vector_store(folder_path: str, embeddings: Optional[Embeddings]) -> FAISS:
+    """Loads a vector store saved in the mmap format or by FAISS.save_local."""
+    if is_mmap_store(folder_path):
+        return load_mmap_vector_store(folder_path, embeddings)
+    return FAISS.load_local(
+        folder_path,
+        embeddings,
+        allow_dangerous_deserialization=True,
+    )
+
+
+def iter_documents(vector_store: FAISS) -> Iterator[Document]:
+    """Yields the documents of ``vector_store`` in FAISS id order."""
+    for i in range(vector_store.index.ntotal):
+        yield vector_store.docstore.search(vector_store.index_to_docstore_id[i])
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Convert a FAISS.save_local folder to the memory-mapped format.",
+    )
+    parser.add_argument("folder_path", help="Folder with index.faiss and index.pkl")
+    parser.add_argument("output_path", help="Folder to write the mmap store to")
+    args = parser.parse_args()
+
+    vector_store = load_vector_store(args.folder_path, None)
+    write_mmap_store(args.output_path, vector_store.index, iter_documents(vector_store))
+    print(f"Converted {vector_store.index.ntotal} documents to {args.output_path}")
+
+
+if __name__ == "__main__":
+    main()
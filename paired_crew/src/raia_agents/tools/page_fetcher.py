@@ -0,0 +1,171 @@
+import asyncio
+import os
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, List, Mapping, Optional, Sequence, Union
+
+import httpx
+
+# Seconds to wait for a page (connect, read, write and pool each).
+DEFAULT_TIMEOUT = float(os.environ.get("RAIA_FETCH_TIMEOUT", "15"))
+# Open connections kept by the shared client (all hosts together).
+DEFAULT_MAX_CONNECTIONS = int(os.environ.get("RAIA_FETCH_CONNECTIONS", "20"))
+# Pages fetched at the same time by fetch_many.
+DEFAULT_CONCURRENCY = int(os.environ.get("RAIA_FETCH_CONCURRENCY", "8"))
+
+
+def http2_available() -> bool:
+    """httpx only speaks HTTP/2 with the optional h2 package installed."""
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class PageFetcher:
+    """Pooled HTTP client shared by the scraping tools.
+
+    Connections are kept alive between calls, so consecutive pages of the
+    same site skip the TCP and TLS handshakes, and HTTP/2 is negotiated when
+    available. The synchronous client is shared by all threads; an async
+    client is created for each event loop that uses ``afetch``, since its
+    connections belong to that loop.
+    """
+
+    def __init__(
+        self,
+        timeout: float = DEFAULT_TIMEOUT,
+        max_connections: int = DEFAULT_MAX_CONNECTIONS,
+        concurrency: int = DEFAULT_CONCURRENCY,
+    ):
+        self.concurrency = max(concurrency, 1)
+        self._options = dict(
+            timeout=httpx.Timeout(timeout),
+            limits=httpx.Limits(
+                max_connections=max_connections, max_keepalive_connections=max_connections
+            ),
+            http2=http2_available(),
+            follow_redirects=True,
+        )
+        self._client = None
+        self._async_clients: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    @property
+    def client(self) -> httpx.Client:
+        with self._lock:
+            if self._client is None:
+                self._client = httpx.Client(**self._options)
+            return self._client
+
+    def _async_client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            client = self._async_clients.get(loop)
+            if client is None:
+                client = httpx.AsyncClient(**self._options)
+                self._async_clients[loop] = client
+            return client
+
+    @staticmethod
+    def _check(response: httpx.Response) -> None:
+        # httpx also raises for 3xx, and a 304 answers a conditional request.
+        if response.is_error:
+            response.raise_for_status()
+
+    def fetch(
+        self,
+        url: str,
+        read: Callable[[httpx.Response], Any],
+        headers: Optional[Mapping[str, str]] = None,
+    ) -> Any:
+        """Streams the page and returns ``read(response)``.
+
+        The body is downloaded only as far as ``read`` consumes it (e.g. with
+        ``response.iter_bytes()``); the connection is released afterwards.
+        """
+        with self.client.stream("GET", url, headers=headers) as response:
+            if response.is_error:
+                response.read()
+            self._check(response)
+            return read(response)
+
+    async def afetch(
+        self,
+        url: str,
+        read: Callable[[httpx.Response], Awaitable[Any]],
+        headers: Optional[Mapping[str, str]] = None,
+    ) -> Any:
+        async with self._async_client().stream("GET", url, headers=headers) as response:
+            if response.is_error:
+                await response.aread()
+            self._check(response)
+            return await read(response)
+
+    def post_json(
+        self, url: str, payload: Any, headers: Optional[Mapping[str, str]] = None
+    ) -> Any:
+        """POSTs ``payload`` as JSON (e.g. to a search API) and returns the decoded response."""
+        response = self.client.post(url, json=payload, headers=headers)
+        self._check(response)
+        return response.json()
+
+    async def apost_json(
+        self, url: str, payload: Any, headers: Optional[Mapping[str, str]] = None
+    ) -> Any:
+        response = await self._async_client().post(url, json=payload, headers=headers)
+        self._check(response)
+        return response.json()
+
+    def fetch_many(
+        self,
+        urls: Sequence[str],
+        read: Callable[[httpx.Response], Any],
+        headers: Optional[Mapping[str, Mapping[str, str]]] = None,
+    ) -> Dict[str, Union[Any, Exception]]:
+        """Fetches the URLs concurrently; a failed URL maps to its exception.
+
+        ``headers`` optionally maps a URL to the extra headers of its request.
+        """
+        urls = list(dict.fromkeys(urls))
+        headers = headers or {}
+
+        def fetch(url):
+            try:
+                return self.fetch(url, read, headers.get(url))
+            except Exception as error:
+                return error
+
+        with ThreadPoolExecutor(
+            max_workers=min(self.concurrency, max(len(urls), 1)), thread_name_prefix="fetch"
+        ) as executor:
+            return dict(zip(urls, executor.map(fetch, urls)))
+
+    async def afetch_many(
+        self,
+        urls: Sequence[str],
+        read: Callable[[httpx.Response], Awaitable[Any]],
+        headers: Optional[Mapping[str, Mapping[str, str]]] = None,
+    ) -> Dict[str, Union[Any, Exception]]:
+        urls = list(dict.fromkeys(urls))
+        headers = headers or {}
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def fetch(url):
+            async with semaphore:
+                return await self.afetch(url, read, headers.get(url))
+
+        results: List = await asyncio.gather(*(fetch(url) for url in urls), return_exceptions=True)
+        return dict(zip(urls, results))
+
+    def close(self) -> None:
+        with self._lock:
+            if self._client is not None:
+                self._client.close()
+                self._client = None
+
+
+# Shared by every tool instance of the process, so the pool is reused.
+fetcher = PageFetcher()
@@ -0,0 +1,106 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from .request_cache import CACHED_TASKS, task_outputs
+
+# Runs the few-shot and web search branches at the same time ("0" runs them in turn).
+DEFAULT_CONCURRENT_BRANCHES = os.environ.get("RAIA_PAIRED_CONCURRENT", "1") not in ("", "0", "false")
+
+# Phases of a question: the RaiaAgents tasks shared by both branches, then
+# one branch per crew, then the RaiaRedacaoCrew tasks that use both.
+PREPARO_TASKS = CACHED_TASKS
+FEW_SHOT_TASKS = ("selecionar_questoes",)
+PESQUISA_TASKS = ("pesquisa_questao",)
+
+
+@dataclass
+class PairedResult:
+    # Output of every task that ran or came from the cache, by task name.
+    outputs: Dict[str, str] = field(default_factory=dict)
+    # CrewOutput of each phase that was kicked off.
+    crew_outputs: List[Any] = field(default_factory=list)
+    # Wall time of each phase, in seconds.
+    timings: Dict[str, float] = field(default_factory=dict)
+
+    @property
+    def redacao_inputs(self) -> Dict[str, str]:
+        return {
+            "solicitacao_melhorada": self.outputs["melhorar_pergunta"],
+            "topicos": self.outputs["filtrar_topicos"],
+            "few_shot_prompt": self.outputs["selecionar_questoes"],
+        }
+
+
+class PairedPipeline:
+    """Runs a question through both crews, each task exactly once.
+
+    The preparation tasks (melhorar_pergunta, filtrar_topicos) run first,
+    since both branches need the improved request. The few-shot branch
+    (selecionar_questoes) and the web search branch (pesquisa_questao) then
+    run concurrently, and the writing tasks of RaiaRedacaoCrew receive the
+    joined outputs: the few-shot prompt as an input and the search result as
+    the context of geração_questao. ``busca_factory`` and ``redacao_factory``
+    are the CrewFactory of RaiaAgents and RaiaRedacaoCrew.
+    """
+
+    def __init__(
+        self,
+        busca_factory,
+        redacao_factory,
+        concurrent_branches: bool = DEFAULT_CONCURRENT_BRANCHES,
+    ):
+        self.busca_factory = busca_factory
+        self.redacao_factory = redacao_factory
+        self.concurrent_branches = concurrent_branches
+
+    @staticmethod
+    def _kickoff(crew, inputs) -> tuple:
+        start = time.perf_counter()
+        crew_output = crew.kickoff(inputs=inputs)
+        return crew_output, time.perf_counter() - start
+
+    def _run_phase(self, result: PairedResult, name: str, crew, inputs) -> None:
+        crew_output, seconds = self._kickoff(crew, inputs)
+        result.crew_outputs.append(crew_output)
+        result.outputs.update(task_outputs(crew_output, names=None))
+        result.timings[name] = seconds
+
+    def run(
+        self, question_id, request: Dict[str, str], cached_outputs: Optional[Dict[str, str]] = None
+    ) -> PairedResult:
+        result = PairedResult(outputs=dict(cached_outputs or {}))
+        start = time.perf_counter()
+
+        if not all(name in result.outputs for name in PREPARO_TASKS):
+            crew = self.busca_factory.create(question_id, cached_outputs, task_names=PREPARO_TASKS)
+            self._run_phase(result, "preparo", crew, request)
+        preparo = {name: result.outputs[name] for name in PREPARO_TASKS}
+
+        few_shot_crew = self.busca_factory.create(question_id, preparo, task_names=FEW_SHOT_TASKS)
+        pesquisa_crew = self.redacao_factory.create(question_id, task_names=PESQUISA_TASKS)
+        pesquisa_inputs = {"solicitacao_melhorada": preparo["melhorar_pergunta"]}
+        branches_start = time.perf_counter()
+        if self.concurrent_branches:
+            with ThreadPoolExecutor(max_workers=2, thread_name_prefix="paired") as executor:
+                few_shot = executor.submit(self._kickoff, few_shot_crew, request)
+                pesquisa = executor.submit(self._kickoff, pesquisa_crew, pesquisa_inputs)
+                branches = {"few_shot": few_shot.result(), "pesquisa": pesquisa.result()}
+        else:
+            branches = {
+                "few_shot": self._kickoff(few_shot_crew, request),
+                "pesquisa": self._kickoff(pesquisa_crew, pesquisa_inputs),
+            }
+        for name, (crew_output, seconds) in branches.items():
+            result.crew_outputs.append(crew_output)
+            result.outputs.update(task_outputs(crew_output, names=None))
+            result.timings[name] = seconds
+        result.timings["branches"] = time.perf_counter() - branches_start
+
+        pesquisa_output = {name: result.outputs[name] for name in PESQUISA_TASKS}
+        redacao_crew = self.redacao_factory.create(question_id, pesquisa_output)
+        self._run_phase(result, "redacao", redacao_crew, result.redacao_inputs)
+        result.timings["total"] = time.perf_counter() - start
+        return result
@@ -0,0 +1,136 @@
+import math
+import os
+import re
+import unicodedata
+from collections import Counter
+from typing import Callable, Dict, List, Sequence, Union
+
+import numpy as np
+
+# "ranked" returns the text of the paragraphs most relevant to the topic;
+# "raw" returns every <p> as HTML, as the tools did originally (kept for
+# comparisons; the task prompts are written for the ranked text).
+DEFAULT_SCRAPE_MODE = os.environ.get("RAIA_SCRAPE_MODE", "ranked")
+# Characters of text read from a page to pick the paragraphs from.
+DEFAULT_CANDIDATE_CHARS = int(os.environ.get("RAIA_SCRAPE_CANDIDATE_CHARS", "40000"))
+# Tokens of paragraphs returned per tool call.
+DEFAULT_TOKEN_BUDGET = int(os.environ.get("RAIA_SCRAPE_TOKEN_BUDGET", "1000"))
+# Shorter paragraphs are captions, bylines or buttons.
+DEFAULT_MIN_WORDS = int(os.environ.get("RAIA_SCRAPE_MIN_WORDS", "8"))
+
+BOILERPLATE = re.compile(
+    r"cookie|pol[ií]tica de privacidade|termos de uso|todos os direitos reservados"
+    r"|all rights reserved|newsletter|inscreva-se|assine|cadastre-se|fa[cç]a login"
+    r"|compartilh|leia tamb[eé]m|veja tamb[eé]m|clique aqui|publicidade|javascript",
+    re.IGNORECASE,
+)
+
+
+def fold(text: str) -> str:
+    """Lowercases and strips accents ("Óptica" -> "optica")."""
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def simple_tokenize(text: str) -> List[str]:
+    """Folded words of three or more letters, cut to a 6-letter prefix as a crude stem."""
+    return [token[:6] for token in re.findall(r"[^\W\d_]{3,}", fold(text))]
+
+
+def approximate_tokens(text: str) -> int:
+    return math.ceil(len(text) / 4)
+
+
+def clean_paragraphs(paragraphs: Sequence[str], min_words: int = DEFAULT_MIN_WORDS) -> List[str]:
+    """Drops boilerplate, too-short and repeated paragraphs, keeping page order."""
+    seen = set()
+    cleaned = []
+    for paragraph in paragraphs:
+        if len(paragraph.split()) < min_words or BOILERPLATE.search(paragraph):
+            continue
+        key = " ".join(re.findall(r"\w+", fold(paragraph)))
+        if key in seen:
+            continue
+        seen.add(key)
+        cleaned.append(paragraph)
+    return cleaned
+
+
+def bm25_scores(
+    paragraphs: Sequence[str],
+    query: str,
+    tokenize: Callable[[str], List[str]] = simple_tokenize,
+    k1: float = 1.2,
+    b: float = 0.75,
+) -> np.ndarray:
+    """Okapi BM25 score of each paragraph for the query, the paragraphs being the corpus."""
+    documents = [Counter(tokenize(paragraph)) for paragraph in paragraphs]
+    scores = np.zeros(len(documents))
+    if not documents:
+        return scores
+    lengths = np.array([sum(document.values()) for document in documents], dtype=float)
+    avg_length = max(lengths.mean(), 1.0)
+    for term in set(tokenize(query)):
+        frequencies = np.array([document[term] for document in documents], dtype=float)
+        matches = np.count_nonzero(frequencies)
+        if not matches:
+            continue
+        idf = math.log(1 + (len(documents) - matches + 0.5) / (matches + 0.5))
+        norm = k1 * (1 - b + b * lengths / avg_length)
+        scores += idf * frequencies * (k1 + 1) / (frequencies + norm)
+    return scores
+
+
+def select_paragraphs(
+    paragraphs: Sequence[str],
+    topic: str = "",
+    token_budget: int = DEFAULT_TOKEN_BUDGET,
+    tokenize: Callable[[str], List[str]] = simple_tokenize,
+    count_tokens: Callable[[str], int] = approximate_tokens,
+) -> List[int]:
+    """Returns the indexes, in page order, of the paragraphs to keep.
+
+    Paragraphs are taken from the most to the least relevant to ``topic``
+    (BM25; page order without a topic) while they fit in ``token_budget``.
+    When some match the topic, the ones with no matching term are left out.
+    """
+    if topic:
+        scores = bm25_scores(paragraphs, topic, tokenize)
+        order = np.argsort(-scores, kind="stable")
+        if scores.max(initial=0.0) > 0:
+            order = [i for i in order if scores[i] > 0]
+    else:
+        order = range(len(paragraphs))
+    selected = []
+    used = 0
+    for i in order:
+        tokens = count_tokens(paragraphs[i])
+        if token_budget and used + tokens > token_budget:
+            continue
+        selected.append(int(i))
+        used += tokens
+    return sorted(selected)
+
+
+def rank_pages(
+    pages: Dict[str, Union[List[str], Exception]],
+    topic: str = "",
+    token_budget: int = DEFAULT_TOKEN_BUDGET,
+    tokenize: Callable[[str], List[str]] = simple_tokenize,
+    count_tokens: Callable[[str], int] = approximate_tokens,
+) -> Dict[str, Union[List[str], Exception]]:
+    """Applies select_paragraphs to the paragraphs of several pages together.
+
+    The budget is shared, so a page with nothing on the topic gives its
+    share to the others; pages that failed keep their exception.
+    """
+    owners = []
+    paragraphs = []
+    for url, page in pages.items():
+        if not isinstance(page, Exception):
+            owners.extend([url] * len(page))
+            paragraphs.extend(page)
+    ranked = {url: page if isinstance(page, Exception) else [] for url, page in pages.items()}
+    for i in select_paragraphs(paragraphs, topic, token_budget, tokenize, count_tokens):
+        ranked[owners[i]].append(paragraphs[i])
+    return ranked
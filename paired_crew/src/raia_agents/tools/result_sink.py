@@ -0,0 +1,70 @@
+import logging
+import os
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Folder of the per-question result files; empty disables writing them.
+DEFAULT_RESULTS_DIR = os.environ.get("RAIA_RESULTS_DIR", "resultados")
+
+# File written for the output of each task, under <results dir>/<question id>/.
+TASK_FILES = {
+    "melhorar_pergunta": "prompt_melhorado.json",
+    "filtrar_topicos": "topicos_questao.json",
+    "selecionar_questoes": "few_shot_prompt.json",
+    "pesquisa_questao": "buscar_dados_para_questao.json",
+    "geração_questao": "questao_gerada.json",
+    "resolucao_questao": "resolucao.json",
+    "correção_questao": "questao_corrigida.json",
+}
+
+
+class ResultSink:
+    """Writes the result files of each question in a background thread.
+
+    The crews hand their outputs to each other in memory; the files are only a
+    record of the run, so writing them stays off the critical path. Each file
+    is written to a temporary name and renamed, so a reader never sees a
+    partially written file. Call ``close`` to wait for pending writes.
+    """
+
+    def __init__(self, results_dir: str = DEFAULT_RESULTS_DIR):
+        self.results_dir = results_dir
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="result-sink")
+        self._pending: List[Future] = []
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.results_dir)
+
+    def _write(self, path: str, content: str) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporary = f"{path}.tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            f.write(content)
+        os.replace(temporary, path)
+
+    def write(self, question_id, file_name: str, content: str) -> Optional[Future]:
+        """Queues ``content`` to be written to <results dir>/<question_id>/<file_name>."""
+        if not self.enabled:
+            return None
+        path = os.path.join(self.results_dir, str(question_id), file_name)
+        future = self._executor.submit(self._write, path, content)
+        self._pending.append(future)
+        return future
+
+    def write_outputs(self, question_id, outputs: Dict[str, str]) -> None:
+        """Queues the file of each task in ``{task name: output}`` listed in TASK_FILES."""
+        for name, output in outputs.items():
+            if name in TASK_FILES:
+                self.write(question_id, TASK_FILES[name], output)
+
+    def close(self) -> None:
+        """Waits for the queued writes and logs the ones that failed."""
+        for future in self._pending:
+            error = future.exception()
+            if error is not None:
+                logger.error("Could not write a result file: %s", error)
+        self._pending.clear()
+        self._executor.shutdown(wait=True)
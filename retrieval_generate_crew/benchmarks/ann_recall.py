@@ -0,0 +1,116 @@
+"""
+Benchmark of the approximate FAISS backends against the exact flat index.
+
+For each corpus size a synthetic clustered corpus of unit vectors (like the
+OpenAI embeddings) is generated, every backend configured in indexes.yaml is
+built over it, and the script reports recall@k against IndexFlatL2, single
+query latency percentiles, build time and serialized index size.
+
+How to execute (from retrieval_generate_crew/):
+python benchmarks/ann_recall.py --sizes 10000 100000 1000000 --dim 256
+
+Use --dim 1536 to match text-embedding-ada-002 (1M vectors then need ~6 GB).
+"""
+
+import argparse
+import json
+import time
+
+import faiss
+import numpy as np
+
+from raia_agents.tools.ann_index import BACKENDS, build_index, load_index_config
+
+
+def synthetic_corpus(num_vectors: int, dim: int, num_clusters: int, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((num_clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, num_clusters, num_vectors)
+    vectors = centers[labels] + 0.5 * rng.standard_normal((num_vectors, dim)).astype(
+        np.float32
+    )
+    faiss.normalize_L2(vectors)
+    return vectors
+
+
+def recall_at_k(ground_truth: np.ndarray, found: np.ndarray) -> float:
+    hits = sum(len(set(truth) & set(row)) for truth, row in zip(ground_truth, found))
+    return hits / ground_truth.size
+
+
+def benchmark_backend(backend, params, corpus, queries, ground_truth, k):
+    start = time.perf_counter()
+    index = build_index(backend, corpus, params)
+    build_seconds = time.perf_counter() - start
+
+    _, found = index.search(queries, k)
+
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        index.search(query.reshape(1, -1), k)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    return {
+        "backend": backend,
+        "params": params,
+        f"recall@{k}": recall_at_k(ground_truth, found),
+        "latency_ms_p50": float(p50),
+        "latency_ms_p95": float(p95),
+        "latency_ms_p99": float(p99),
+        "build_seconds": build_seconds,
+        "index_bytes": int(faiss.serialize_index(index).size),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--index", default="questions_faiss", help="Entry of indexes.yaml")
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS))
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Optional JSON file for the results")
+    args = parser.parse_args()
+
+    results = []
+    for size in args.sizes:
+        # Queries come from the same clusters as the corpus but are not in it.
+        vectors = synthetic_corpus(
+            size + args.queries, args.dim, max(10, size // 1000), args.seed
+        )
+        corpus, queries = vectors[:size], vectors[size:]
+
+        exact = faiss.IndexFlatL2(args.dim)
+        exact.add(corpus)
+        _, ground_truth = exact.search(queries, args.k)
+
+        for backend in args.backends:
+            params = load_index_config(args.index, backend=backend)["params"]
+            if backend == "ivf_pq" and args.dim % params.get("m", 64) != 0:
+                params = {**params, "m": _largest_divisor(args.dim, params.get("m", 64))}
+            result = benchmark_backend(backend, params, corpus, queries, ground_truth, args.k)
+            result["num_vectors"] = size
+            result["dim"] = args.dim
+            results.append(result)
+            print(
+                f"n={size:>8} {backend:>8}  recall@{args.k}={result[f'recall@{args.k}']:.3f}  "
+                f"p50={result['latency_ms_p50']:.3f}ms  p95={result['latency_ms_p95']:.3f}ms  "
+                f"p99={result['latency_ms_p99']:.3f}ms  build={result['build_seconds']:.1f}s  "
+                f"size={result['index_bytes'] / (1 << 20):.1f}MiB"
+            )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+def _largest_divisor(dim, at_most):
+    return max(m for m in range(1, at_most + 1) if dim % m == 0)
+
+
+if __name__ == "__main__":
+    main()
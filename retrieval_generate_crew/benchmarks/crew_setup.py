@@ -0,0 +1,96 @@
+"""
+Per-question crew setup overhead, rebuilding the crew versus CrewFactory.
+
+"rebuild" is what main.run did before: RaiaAgents(question_id=idx).crew()
+for every question, which parses agents.yaml/tasks.yaml and creates the
+agents, LLMs and tools again. "factory" builds the crew once and calls
+CrewFactory.create(idx) per question. Nothing is kicked off, so no API call
+is made (a placeholder OPENAI_API_KEY is enough). Each variant runs in a
+fresh process so imports and peak RSS do not leak from one to the other.
+
+How to execute (from retrieval_generate_crew/):
+python benchmarks/crew_setup.py --questions 50 --output crew_setup.json
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import time
+
+import numpy as np
+
+VARIANTS = ("rebuild", "factory")
+
+
+def run_variant(variant: str, questions: int, connection) -> None:
+    os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+    start = time.perf_counter()
+    from raia_agents.crew import RaiaAgents
+    from raia_agents.tools.crew_factory import CrewFactory
+
+    imports_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    if variant == "factory":
+        factory = CrewFactory(lambda question_id: RaiaAgents(question_id=question_id).crew())
+        create = factory.create
+    else:
+        create = lambda idx: RaiaAgents(question_id=idx).crew()  # noqa: E731
+    once_ms = (time.perf_counter() - start) * 1000
+
+    latencies = []
+    for idx in range(questions):
+        start = time.perf_counter()
+        create(idx)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    p50, p95 = np.percentile(latencies, [50, 95])
+    connection.send(
+        {
+            "variant": variant,
+            "imports_ms": imports_ms,
+            "once_ms": once_ms,
+            "per_question_ms_mean": float(np.mean(latencies)),
+            "per_question_ms_p50": float(p50),
+            "per_question_ms_p95": float(p95),
+            "total_ms": once_ms + float(np.sum(latencies)),
+            # ru_maxrss is in KiB on Linux.
+            "peak_rss_bytes": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+        }
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--questions", type=int, default=50)
+    parser.add_argument("--variants", nargs="+", choices=VARIANTS, default=list(VARIANTS))
+    parser.add_argument("--output", help="Optional JSON file for the results")
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context("spawn")
+    results = []
+    for variant in args.variants:
+        receiver, sender = context.Pipe(duplex=False)
+        process = context.Process(target=run_variant, args=(variant, args.questions, sender))
+        process.start()
+        result = receiver.recv()
+        process.join()
+        results.append(result)
+        print(
+            f"{variant:>8}  once={result['once_ms']:.0f}ms  "
+            f"per question: mean={result['per_question_ms_mean']:.1f}ms "
+            f"p50={result['per_question_ms_p50']:.1f}ms "
+            f"p95={result['per_question_ms_p95']:.1f}ms  "
+            f"total={result['total_ms']:.0f}ms  "
+            f"rss={result['peak_rss_bytes'] / (1 << 20):.0f}MiB"
+        )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"questions": args.questions, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
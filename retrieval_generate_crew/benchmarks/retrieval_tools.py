@@ -0,0 +1,281 @@
+"""
+Latency benchmark of the retrieval tools on synthetic question corpora.
+
+For each corpus size a deterministic corpus of questions (statement,
+alternatives and metadata in the format of artifacts/questions_faiss) and a
+category corpus are generated, embedded with a local stub (no API calls) and
+saved under a temporary artifacts/ folder. Every tool then runs in a fresh
+process, so cold-load time and peak RSS are measured per tool:
+
+- load: load_vector_store of the questions index;
+- retriever: Retriever.invoke;
+- single_rag: SingleRagTool._run (questions and categories);
+- few_shot: RetrieveQuestoesTool._run of fewshot_crews (prompt assembly).
+
+The JSON output records the git commit, so two runs can be compared.
+
+How to execute (from retrieval_generate_crew/):
+python benchmarks/retrieval_tools.py --sizes 1000 10000 100000 --output bench.json
+"""
+
+import argparse
+import importlib
+import json
+import multiprocessing
+import os
+import platform
+import re
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import zlib
+
+import numpy as np
+
+TOOLS = ("load", "retriever", "single_rag", "few_shot")
+
+SUBJECTS = {
+    "Biologia": ["fotossíntese", "célula", "genética", "ecologia", "evolução", "vírus"],
+    "Física": ["óptica", "cinemática", "eletricidade", "termodinâmica", "ondas", "energia"],
+    "Química": ["estequiometria", "ligações", "soluções", "eletroquímica", "orgânica"],
+    "História": ["revolução francesa", "era vargas", "iluminismo", "guerra fria"],
+    "Matemática": ["probabilidade", "funções", "geometria", "progressões", "matrizes"],
+    "Geografia": ["urbanização", "clima", "globalização", "relevo", "hidrografia"],
+}
+UNIVERSITIES = ["ENEM", "FUVEST", "UNICAMP", "UNESP", "UERJ"]
+FILLER = (
+    "considere analise texto situação apresentada gráfico tabela dados resultado "
+    "processo fenômeno sistema valor relação efeito condição alternativa correta"
+).split()
+
+
+def synthetic_questions(size: int, seed: int):
+    """Yields (text, metadata) pairs of questions."""
+    rng = np.random.default_rng(seed)
+    subjects = list(SUBJECTS)
+    for i in range(size):
+        subject = subjects[rng.integers(len(subjects))]
+        topic = SUBJECTS[subject][rng.integers(len(SUBJECTS[subject]))]
+        words = " ".join(rng.choice(FILLER, 12))
+        alternatives = "\n".join(
+            f"{letter}) {' '.join(rng.choice(FILLER, 3))}" for letter in "ABCDE"
+        )
+        text = (
+            f"Questão de {subject} sobre {topic}: {words} {topic}."
+            f"\n\nAlternatives:\n{alternatives}"
+        )
+        yield text, {
+            "question_id": i,
+            "university": UNIVERSITIES[rng.integers(len(UNIVERSITIES))],
+            "year": int(rng.integers(2000, 2025)),
+            "disciplina": subject,
+        }
+
+
+def synthetic_queries(count: int, seed: int):
+    rng = np.random.default_rng(seed + 1)
+    topics = [topic for topics in SUBJECTS.values() for topic in topics]
+    return [
+        f"Questões de {topics[rng.integers(len(topics))]} no "
+        f"{UNIVERSITIES[rng.integers(len(UNIVERSITIES))]}"
+        for _ in range(count)
+    ]
+
+
+def stub_embeddings(dim: int):
+    """Deterministic bag-of-words embeddings, so texts sharing words are close."""
+    from langchain_core.embeddings import Embeddings
+
+    class HashingEmbeddings(Embeddings):
+        def __init__(self):
+            self.word_vectors = {}
+
+        def _word_vector(self, word):
+            if word not in self.word_vectors:
+                rng = np.random.default_rng(zlib.crc32(word.encode("utf-8")))
+                self.word_vectors[word] = rng.standard_normal(dim)
+            return self.word_vectors[word]
+
+        def embed_query(self, text):
+            words = re.findall(r"\w+", text.lower())
+            vector = sum(self._word_vector(word) for word in words)
+            vector = vector / max(np.linalg.norm(vector), 1e-12)
+            return vector.tolist()
+
+        def embed_documents(self, texts):
+            return [self.embed_query(text) for text in texts]
+
+    return HashingEmbeddings()
+
+
+def build_artifacts(workdir: str, size: int, dim: int, seed: int) -> None:
+    """Writes questions_faiss, questions_faiss_v2 and category_faiss in workdir/artifacts."""
+    from langchain_community.vectorstores import FAISS
+
+    from raia_agents.tools.mmap_store import iter_documents, write_mmap_store
+
+    embeddings = stub_embeddings(dim)
+    texts, metadatas = zip(*synthetic_questions(size, seed))
+    questions = FAISS.from_texts(list(texts), embeddings, metadatas=list(metadatas))
+    categories = FAISS.from_texts(
+        [f"{subject}: {topic}" for subject, topics in SUBJECTS.items() for topic in topics],
+        embeddings,
+    )
+    for name, vector_store in (
+        ("questions_faiss", questions),
+        ("questions_faiss_v2", questions),
+        ("category_faiss", categories),
+    ):
+        write_mmap_store(
+            os.path.join(workdir, "artifacts", name),
+            vector_store.index,
+            iter_documents(vector_store),
+        )
+
+
+def _tool_runner(tool: str, dim: int, k: int, fewshot_root: str):
+    """Imports the tool with a stub index registry and returns a ``run(query)``.
+
+    Relevance thresholds are set to -1 so every call returns k documents
+    whatever the stub's similarity scores.
+    """
+    from raia_agents.tools.index_registry import IndexRegistry
+    from raia_agents.tools.mmap_store import load_vector_store
+
+    embeddings = stub_embeddings(dim)
+    if tool == "load":
+        return lambda query: load_vector_store("artifacts/questions_faiss", embeddings)
+
+    if tool == "few_shot":
+        sys.path.insert(0, fewshot_root)
+        module = importlib.import_module("src.raia_agents.tools.custom_tool")
+        module.index_registry = IndexRegistry(embeddings)
+        retrieve = module.RetrieveQuestoesTool()
+        return lambda query: retrieve._run(query, k, -1.0)
+
+    from raia_agents.tools import RAGTool
+
+    RAGTool.index_registry = IndexRegistry(embeddings)
+    if tool == "retriever":
+        return lambda query: RAGTool.Retriever("artifacts/questions_faiss").invoke(
+            query, k, -1.0
+        )
+    single_rag = RAGTool.SingleRagTool()
+    return lambda query: single_rag._run(query, k, -1.0, k, -1.0)
+
+
+def run_tool(tool, workdir, queries, dim, k, fewshot_root, connection):
+    """Runs in a fresh process: one cold call, then every query warm.
+
+    Imports are timed separately (setup_ms), cold_ms is the first call alone.
+    """
+    os.chdir(workdir)
+    os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+    os.environ["RAIA_EMBEDDING_CACHE"] = os.path.join(workdir, "embedding_cache.sqlite")
+    try:
+        start = time.perf_counter()
+        run = _tool_runner(tool, dim, k, fewshot_root)
+        setup_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        run(queries[0])
+        cold_ms = (time.perf_counter() - start) * 1000
+
+        latencies = []
+        for query in queries:
+            start = time.perf_counter()
+            run(query)
+            latencies.append((time.perf_counter() - start) * 1000)
+    except Exception as error:
+        connection.send({"tool": tool, "error": f"{type(error).__name__}: {error}"})
+        return
+
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    connection.send(
+        {
+            "tool": tool,
+            "setup_ms": setup_ms,
+            "cold_ms": cold_ms,
+            "latency_ms_p50": float(p50),
+            "latency_ms_p95": float(p95),
+            "latency_ms_p99": float(p99),
+            "throughput_qps": len(latencies) / (sum(latencies) / 1000),
+            # ru_maxrss is in KiB on Linux.
+            "peak_rss_bytes": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+        }
+    )
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--tools", nargs="+", choices=TOOLS, default=list(TOOLS))
+    parser.add_argument("--fewshot-root", default="../fewshot_crews")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Optional JSON file for the results")
+    args = parser.parse_args()
+
+    queries = synthetic_queries(args.queries, args.seed)
+    fewshot_root = os.path.abspath(args.fewshot_root)
+    context = multiprocessing.get_context("spawn")
+    results = []
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory(prefix="raia_bench_") as workdir:
+            start = time.perf_counter()
+            build_artifacts(workdir, size, args.dim, args.seed)
+            print(f"n={size:>8} corpus built in {time.perf_counter() - start:.1f}s")
+
+            for tool in args.tools:
+                receiver, sender = context.Pipe(duplex=False)
+                process = context.Process(
+                    target=run_tool,
+                    args=(tool, workdir, queries, args.dim, args.k, fewshot_root, sender),
+                )
+                process.start()
+                result = receiver.recv()
+                process.join()
+                result.update(num_documents=size, dim=args.dim, k=args.k)
+                results.append(result)
+
+                if "error" in result:
+                    print(f"n={size:>8} {tool:>10}  failed: {result['error']}")
+                    continue
+                print(
+                    f"n={size:>8} {tool:>10}  setup={result['setup_ms']:.0f}ms  "
+                    f"cold={result['cold_ms']:.1f}ms  "
+                    f"p50={result['latency_ms_p50']:.3f}ms  p95={result['latency_ms_p95']:.3f}ms  "
+                    f"p99={result['latency_ms_p99']:.3f}ms  "
+                    f"qps={result['throughput_qps']:.0f}  "
+                    f"rss={result['peak_rss_bytes'] / (1 << 20):.0f}MiB"
+                )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "commit": _git_commit(),
+                    "python": platform.python_version(),
+                    "queries": args.queries,
+                    "results": results,
+                },
+                f,
+                indent=2,
+            )
+
+
+if __name__ == "__main__":
+    main()
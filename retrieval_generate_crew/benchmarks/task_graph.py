@@ -0,0 +1,136 @@
+"""
+End-to-end latency of a crew's tasks, sequential versus scheduled as a DAG.
+
+The tasks, agents and ``context`` declarations are read from a tasks.yaml
+and ordered by schedule_parallel. Each task is replaced by a sleep of its
+latency (no LLM calls), and the schedule is executed with the semantics of
+crewAI's sequential process: an async task starts at once in a thread, a
+synchronous task first waits for every pending async task. The script
+reports the wall time of the plain sequential run, of the scheduled run, and
+the critical path of the dependency graph (the lower bound).
+
+Latencies default to --default-latency seconds per task; measured ones can
+be given with --latency name=seconds (e.g. from the crew's logs.json).
+
+How to execute (from retrieval_generate_crew/):
+python benchmarks/task_graph.py --tasks src/raia_agents/config/tasks.yaml \
+    --latency melhorar_pergunta=3 filtrar_topicos=2 verificação_ferramenta=6
+"""
+
+import argparse
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+import yaml
+
+from raia_agents.tools.task_graph import schedule_parallel, task_dependencies
+
+
+@dataclass(eq=False)
+class SimulatedTask:
+    name: str
+    agent: str
+    latency: float
+    context: object = None
+    async_execution: bool = False
+    finished_at: Optional[float] = field(default=None, repr=False)
+
+
+def load_tasks(path: str, latencies, default_latency: float) -> List[SimulatedTask]:
+    with open(path, encoding="utf-8") as f:
+        config = yaml.safe_load(f)
+    tasks = {
+        name: SimulatedTask(name, info.get("agent", name), latencies.get(name, default_latency))
+        for name, info in config.items()
+    }
+    for name, info in config.items():
+        if "context" in info:
+            tasks[name].context = [tasks[context] for context in info["context"] or []]
+    return list(tasks.values())
+
+
+def execute(tasks: List[SimulatedTask], scale: float) -> float:
+    """Runs the tasks like crewAI's sequential process; returns the wall time in seconds."""
+    lock = threading.Lock()
+    start = time.perf_counter()
+
+    def run(task):
+        time.sleep(task.latency * scale)
+        with lock:
+            task.finished_at = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=len(tasks)) as executor:
+        futures = []
+        for task in tasks:
+            if task.async_execution:
+                futures.append(executor.submit(run, task))
+                continue
+            for future in futures:
+                future.result()
+            futures.clear()
+            run(task)
+        for future in futures:
+            future.result()
+    return (time.perf_counter() - start) / scale
+
+
+def critical_path(tasks: List[SimulatedTask]) -> float:
+    dependencies = task_dependencies(tasks)
+    finish = []
+    for i, task in enumerate(tasks):
+        finish.append(max((finish[j] for j in dependencies[i]), default=0.0) + task.latency)
+    return max(finish, default=0.0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--tasks", default="src/raia_agents/config/tasks.yaml")
+    parser.add_argument("--latency", nargs="*", default=[], help="name=seconds")
+    parser.add_argument("--default-latency", type=float, default=2.0)
+    parser.add_argument("--scale", type=float, default=0.05, help="Sleep scale factor")
+    parser.add_argument("--output", help="Optional JSON file for the results")
+    args = parser.parse_args()
+
+    latencies = {
+        name: float(seconds) for name, seconds in (item.split("=", 1) for item in args.latency)
+    }
+    sequential = execute(load_tasks(args.tasks, latencies, args.default_latency), args.scale)
+
+    tasks = load_tasks(args.tasks, latencies, args.default_latency)
+    bound = critical_path(tasks)
+    scheduled_tasks = schedule_parallel(tasks, enabled=True)
+    scheduled = execute(scheduled_tasks, args.scale)
+
+    for task in scheduled_tasks:
+        mode = "async" if task.async_execution else "sync "
+        print(f"{mode}  {task.name:<28} context={[c.name for c in task.context]}")
+    print(
+        f"sequential={sequential:.2f}s  scheduled={scheduled:.2f}s  "
+        f"critical_path={bound:.2f}s  speedup={sequential / scheduled:.2f}x"
+    )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "tasks": args.tasks,
+                    "latencies": {task.name: task.latency for task in scheduled_tasks},
+                    "schedule": [
+                        {"task": task.name, "async": task.async_execution}
+                        for task in scheduled_tasks
+                    ],
+                    "sequential_seconds": sequential,
+                    "scheduled_seconds": scheduled,
+                    "critical_path_seconds": bound,
+                },
+                f,
+                indent=2,
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""
+Accuracy and latency of the local topic classifier against the LLM labels.
+
+The 50 requests of main.py are classified with TopicClassifier over
+artifacts/category_faiss and compared, key by key, with the topics chosen by
+the filtrar_topicos task. The LLM labels are read from the
+resultados/<idx>/topicos_questao.json files of a previous run (--labels-dir);
+with --run-llm the filtrar_topicos task is run again here, alone, and its
+latency is reported next to the classifier's.
+
+Requests below --min-confidence would fall back to the LLM, so accuracy is
+reported both over all requests and over the accepted ones (with coverage).
+
+How to execute (from retrieval_generate_crew/, needs OPENAI_API_KEY):
+python benchmarks/topic_classifier.py --labels-dir resultados --method knn centroid
+"""
+
+import argparse
+import json
+import os
+import time
+import unicodedata
+
+import numpy as np
+
+from raia_agents.main import QUESTIONS
+from raia_agents.tools.RAGTool import index_registry
+from raia_agents.tools.topic_classifier import (
+    CLASSIFIER_METHODS,
+    DEFAULT_MIN_CONFIDENCE,
+    LABEL_FIELDS,
+    TopicClassifier,
+)
+
+
+def _normalize(value) -> str:
+    text = unicodedata.normalize("NFKD", str(value or "")).encode("ascii", "ignore")
+    return text.decode().strip().lower()
+
+
+def _parse_topics(raw: str):
+    """Reads the JSON object of a filtrar_topicos output (possibly in a code fence)."""
+    start, end = raw.find("{"), raw.rfind("}")
+    if start == -1 or end == -1:
+        return None
+    try:
+        return json.loads(raw[start : end + 1])
+    except json.JSONDecodeError:
+        return None
+
+
+def read_labels(labels_dir: str):
+    labels = {}
+    for idx in range(len(QUESTIONS)):
+        path = os.path.join(labels_dir, str(idx), "topicos_questao.json")
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                topics = _parse_topics(f.read())
+            if topics is not None:
+                labels[idx] = topics
+    return labels
+
+
+def run_llm_labels():
+    """Runs filtrar_topicos alone for each request; returns the labels and latencies."""
+    from crewai import Crew, Process
+
+    from raia_agents.crew import RaiaAgents
+
+    labels, latencies = {}, []
+    for idx, question in enumerate(QUESTIONS):
+        agents = RaiaAgents(question_id=idx)
+        crew = Crew(
+            agents=[agents.identificador_topicos()],
+            tasks=[agents.filtrar_topicos()],
+            process=Process.sequential,
+        )
+        start = time.perf_counter()
+        result = crew.kickoff(inputs={"input_user": question})
+        latencies.append((time.perf_counter() - start) * 1000)
+        topics = _parse_topics(result.raw)
+        if topics is not None:
+            labels[idx] = topics
+    return labels, latencies
+
+
+def evaluate(classifier: TopicClassifier, labels, min_confidence: float):
+    predictions, latencies = [], []
+    for question in QUESTIONS:
+        start = time.perf_counter()
+        predictions.append(classifier.predict(question))
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    per_key = {key: [] for key in LABEL_FIELDS}
+    exact, accepted_exact = [], []
+    for idx, (topics, confidence) in enumerate(predictions):
+        if idx not in labels:
+            continue
+        topics = topics or {}
+        matches = {
+            key: _normalize(topics.get(key)) == _normalize(labels[idx].get(key))
+            for key in LABEL_FIELDS
+        }
+        for key, match in matches.items():
+            per_key[key].append(match)
+        exact.append(all(matches.values()))
+        if confidence >= min_confidence:
+            accepted_exact.append(all(matches.values()))
+
+    p50, p95 = np.percentile(latencies, [50, 95])
+    return {
+        "method": classifier.method,
+        "labelled": len(exact),
+        **{f"accuracy_{key}": float(np.mean(values)) for key, values in per_key.items() if values},
+        "accuracy_exact": float(np.mean(exact)) if exact else 0.0,
+        "coverage": len(accepted_exact) / len(exact) if exact else 0.0,
+        "accuracy_exact_accepted": float(np.mean(accepted_exact)) if accepted_exact else 0.0,
+        "latency_ms_p50": float(p50),
+        "latency_ms_p95": float(p95),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--labels-dir", default="resultados")
+    parser.add_argument("--run-llm", action="store_true", help="Label with filtrar_topicos now")
+    parser.add_argument("--method", nargs="+", choices=CLASSIFIER_METHODS, default=["knn"])
+    parser.add_argument("--index", default="artifacts/category_faiss")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--min-confidence", type=float, default=DEFAULT_MIN_CONFIDENCE)
+    parser.add_argument("--output", help="Optional JSON file for the results")
+    args = parser.parse_args()
+
+    llm_latencies = []
+    if args.run_llm:
+        labels, llm_latencies = run_llm_labels()
+    else:
+        labels = read_labels(args.labels_dir)
+    print(f"{len(labels)}/{len(QUESTIONS)} requests with LLM labels")
+
+    vector_store = index_registry.get(args.index)
+    results = []
+    for method in args.method:
+        classifier = TopicClassifier(vector_store, method, k=args.k)
+        result = evaluate(classifier, labels, args.min_confidence)
+        results.append(result)
+        print(
+            f"{method:>8}  exact={result['accuracy_exact']:.2%}  "
+            f"coverage={result['coverage']:.2%}  "
+            f"exact@accepted={result['accuracy_exact_accepted']:.2%}  "
+            f"p50={result['latency_ms_p50']:.2f}ms  p95={result['latency_ms_p95']:.2f}ms"
+        )
+
+    llm = {}
+    if llm_latencies:
+        p50, p95 = np.percentile(llm_latencies, [50, 95])
+        llm = {"latency_ms_p50": float(p50), "latency_ms_p95": float(p95)}
+        print(f"{'llm':>8}  p50={p50:.0f}ms  p95={p95:.0f}ms")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(
+                {"min_confidence": args.min_confidence, "llm": llm, "results": results},
+                f,
+                indent=2,
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,12 @@
-from typing import List
+from typing import Dict, List, Optional
 
 from crewai import LLM, Agent, Crew, Process, Task
 from crewai.agents.agent_builder.base_agent import BaseAgent
 from crewai.project import CrewBase, agent, crew, task
 
 from raia_agents.tools.RAGTool import SingleRagTool
+from raia_agents.tools.request_cache import apply_cached_outputs
+from raia_agents.tools.task_graph import schedule_parallel
 
 llm = LLM(
     model="openai/gpt-4o", temperature=0.3, seed=42  # call model by provider/model_name
@@ -22,8 +24,12 @@ class RaiaAgents:
     agents: List[BaseAgent]
     tasks: List[Task]
 
-    def __init__(self, question_id: int):
+    def __init__(
+        self, question_id: int, cached_outputs: Optional[Dict[str, str]] = None
+    ):
         self.question_id = question_id
+        # Outputs of melhorar_pergunta/filtrar_topicos reused from the request cache.
+        self.cached_outputs = cached_outputs
         self.agents_config = "config/agents.yaml"
         self.tasks_config = "config/tasks.yaml"
 
@@ -128,7 +134,8 @@ class RaiaAgents:
 
         return Crew(
             agents=self.agents,  # Automatically created by the @agent decorator
-            tasks=self.tasks,  # Automatically created by the @task decorator
+            # Automatically created by the @task decorator
+            tasks=schedule_parallel(apply_cached_outputs(self.tasks, self.cached_outputs)),
             process=Process.sequential,
             verbose=True,
             output_log_file="logs.json",
@@ -1,83 +1,124 @@
 #!/usr/bin/env python
+import json
 import sys
 import warnings
 
 from datetime import datetime
 
 from raia_agents.crew import RaiaAgents
-from raia_agents.tools.RAGTool import EmptyToolResultError
+from raia_agents.tools.batch_runner import BatchRunner, print_summary
+from raia_agents.tools.crew_factory import CrewFactory
+from raia_agents.tools.RAGTool import EmptyToolResultError, embeddings, index_registry
+from raia_agents.tools.request_cache import SemanticRequestCache, task_outputs
+from raia_agents.tools.run_manifest import RunManifest, restart_requested, resume_requested
+from raia_agents.tools.topic_classifier import DEFAULT_CLASSIFIER_METHOD, TopicClassifier
 
 warnings.filterwarnings("ignore", category=SyntaxWarning, module="pysbd")
 
+# The 50 benchmark requests.
+QUESTIONS = [
+    "Quero uma questão de ENEM sobre funções exponenciais.",
+    "Me envie uma questão de história sobre a Revolução Francesa.",
+    "Pode gerar uma questão de física sobre leis de Newton?",
+    "Quero uma questão de biologia sobre fotossíntese.",
+    "Gere uma questão de química sobre ligações químicas.",
+    "Quero uma questão de geografia sobre mudanças climáticas.",
+    "Manda uma questão de sociologia sobre desigualdade social.",
+    "Me dá uma questão de filosofia sobre Sócrates.",
+    "Quero uma questão de português sobre análise sintática.",
+    "Gera uma questão de matemática sobre probabilidade.",
+    "Quero uma questão de física sobre eletromagnetismo.",
+    "Me envie uma questão de história do Brasil sobre a Era Vargas.",
+    "Quero uma questão de biologia sobre genética.",
+    "Pode gerar uma questão de química sobre pH e soluções?",
+    "Quero uma questão de geografia sobre globalização.",
+    "Me dá uma questão de filosofia sobre empirismo.",
+    "Gere uma questão de português sobre interpretação de texto.",
+    "Quero uma questão de matemática sobre matrizes.",
+    "Manda uma questão de física sobre termodinâmica.",
+    "Preciso de uma questão de sociologia sobre movimentos sociais.",
+    "Me envie uma questão de história sobre a Guerra Fria.",
+    "Quero uma questão de biologia sobre sistema imunológico.",
+    "Gera uma questão de química sobre tabela periódica.",
+    "Quero uma questão de geografia sobre urbanização.",
+    "Me dá uma questão de filosofia sobre ética.",
+    "Manda uma questão de português sobre funções da linguagem.",
+    "Preciso de uma questão de matemática sobre análise combinatória.",
+    "Quero uma questão de física sobre óptica geométrica.",
+    "Me envie uma questão de história sobre o Império Romano.",
+    "Gera uma questão de biologia sobre ciclo do carbono.",
+    "Quero uma questão de química sobre reações de oxirredução.",
+    "Me dá uma questão de geografia sobre migração populacional.",
+    "Pode gerar uma questão de sociologia sobre cultura e identidade?",
+    "Quero uma questão de filosofia sobre Kant.",
+    "Me envie uma questão de português sobre crase.",
+    "Gere uma questão de matemática sobre geometria espacial.",
+    "Quero uma questão de física sobre movimento uniformemente variado.",
+    "Me dá uma questão de história sobre o Iluminismo.",
+    "Manda uma questão de biologia sobre evolução das espécies.",
+    "Preciso de uma questão de química sobre gases.",
+    "Quero uma questão de geografia sobre fontes de energia renovável.",
+    "Gere uma questão de sociologia sobre trabalho e sociedade.",
+    "Me envie uma questão de filosofia sobre niilismo.",
+    "Quero uma questão de português sobre figuras de linguagem.",
+    "Pode gerar uma questão de matemática sobre estatística descritiva?",
+    "Me dá uma questão de física sobre leis de Kepler.",
+    "Quero uma questão de história sobre o período colonial brasileiro.",
+    "Manda uma questão de biologia sobre respiração celular.",
+    "Gera uma questão de química sobre equilíbrio químico.",
+    "Preciso de uma questão de geografia sobre biomas brasileiros.",
+]
+
 
 def run():
     """
     Run the crew.
     """
-    questions = [
-        "Quero uma questão de ENEM sobre funções exponenciais.",
-        "Me envie uma questão de história sobre a Revolução Francesa.",
-        "Pode gerar uma questão de física sobre leis de Newton?",
-        "Quero uma questão de biologia sobre fotossíntese.",
-        "Gere uma questão de química sobre ligações químicas.",
-        "Quero uma questão de geografia sobre mudanças climáticas.",
-        "Manda uma questão de sociologia sobre desigualdade social.",
-        "Me dá uma questão de filosofia sobre Sócrates.",
-        "Quero uma questão de português sobre análise sintática.",
-        "Gera uma questão de matemática sobre probabilidade.",
-        "Quero uma questão de física sobre eletromagnetismo.",
-        "Me envie uma questão de história do Brasil sobre a Era Vargas.",
-        "Quero uma questão de biologia sobre genética.",
-        "Pode gerar uma questão de química sobre pH e soluções?",
-        "Quero uma questão de geografia sobre globalização.",
-        "Me dá uma questão de filosofia sobre empirismo.",
-        "Gere uma questão de português sobre interpretação de texto.",
-        "Quero uma questão de matemática sobre matrizes.",
-        "Manda uma questão de física sobre termodinâmica.",
-        "Preciso de uma questão de sociologia sobre movimentos sociais.",
-        "Me envie uma questão de história sobre a Guerra Fria.",
-        "Quero uma questão de biologia sobre sistema imunológico.",
-        "Gera uma questão de química sobre tabela periódica.",
-        "Quero uma questão de geografia sobre urbanização.",
-        "Me dá uma questão de filosofia sobre ética.",
-        "Manda uma questão de português sobre funções da linguagem.",
-        "Preciso de uma questão de matemática sobre análise combinatória.",
-        "Quero uma questão de física sobre óptica geométrica.",
-        "Me envie uma questão de história sobre o Império Romano.",
-        "Gera uma questão de biologia sobre ciclo do carbono.",
-        "Quero uma questão de química sobre reações de oxirredução.",
-        "Me dá uma questão de geografia sobre migração populacional.",
-        "Pode gerar uma questão de sociologia sobre cultura e identidade?",
-        "Quero uma questão de filosofia sobre Kant.",
-        "Me envie uma questão de português sobre crase.",
-        "Gere uma questão de matemática sobre geometria espacial.",
-        "Quero uma questão de física sobre movimento uniformemente variado.",
-        "Me dá uma questão de história sobre o Iluminismo.",
-        "Manda uma questão de biologia sobre evolução das espécies.",
-        "Preciso de uma questão de química sobre gases.",
-        "Quero uma questão de geografia sobre fontes de energia renovável.",
-        "Gere uma questão de sociologia sobre trabalho e sociedade.",
-        "Me envie uma questão de filosofia sobre niilismo.",
-        "Quero uma questão de português sobre figuras de linguagem.",
-        "Pode gerar uma questão de matemática sobre estatística descritiva?",
-        "Me dá uma questão de física sobre leis de Kepler.",
-        "Quero uma questão de história sobre o período colonial brasileiro.",
-        "Manda uma questão de biologia sobre respiração celular.",
-        "Gera uma questão de química sobre equilíbrio químico.",
-        "Preciso de uma questão de geografia sobre biomas brasileiros.",
-    ]
     inputs = []
-    for question in questions:
+    for question in QUESTIONS:
         inputs.append(
             {
                 "input_user": question,
             }
         )
-    try:
-        for idx, question in enumerate(inputs):
-            RaiaAgents(question_id=idx).crew().kickoff(inputs=question)
+    request_cache = SemanticRequestCache(embeddings)
+    # Configs, agents, LLMs and tools are built once; each question gets a copy.
+    crew_factory = CrewFactory(lambda question_id: RaiaAgents(question_id=question_id).crew())
+    topic_classifier = None
+    if DEFAULT_CLASSIFIER_METHOD:
+        topic_classifier = TopicClassifier(
+            index_registry.get("artifacts/category_faiss"), DEFAULT_CLASSIFIER_METHOD
+        )
+
+    def run_question(idx, question):
+        cached_outputs = request_cache.lookup(question["input_user"])
+        if cached_outputs is None and topic_classifier is not None:
+            topics = topic_classifier.classify(question["input_user"])
+            if topics is not None:
+                cached_outputs = {
+                    "filtrar_topicos": json.dumps(topics, ensure_ascii=False, indent=2)
+                }
+        result = crew_factory.create(idx, cached_outputs).kickoff(inputs=question)
+        if cached_outputs is None or "melhorar_pergunta" not in cached_outputs:
+            request_cache.store(
+                question["input_user"],
+                {**(cached_outputs or {}), **task_outputs(result)},
+            )
+        return result
 
-    except EmptyToolResultError as e:
-        return "Erro ao formular pergunta"
-    except Exception as e:
-        raise Exception(f"An error occurred while running the crew: {e}")
+    # Questions already done (or running in another worker of the run) are
+    # skipped; --resume also retries the failed ones, --restart runs them all again.
+    manifest = RunManifest(strategy="retrieval")
+    manifest.enqueue(
+        {str(idx): question for idx, question in enumerate(inputs)},
+        reset=restart_requested(),
+        retry_failed=resume_requested(),
+    )
+    # A failing question (e.g. EmptyToolResultError) no longer aborts the batch.
+    report = BatchRunner(run_question, no_retry_errors=(EmptyToolResultError,)).run(
+        inputs, manifest=manifest
+    )
+    print_summary(report)
+    print("Run manifest:", manifest.summary())
+    print("Request cache:", request_cache.stats())
+    return report
@@ -1,6 +1,6 @@
 import getpass
 import os
-from typing import List, Optional, Tuple, Type, Union
+from typing import Dict, List, Optional, Tuple, Type, Union
 
 import faiss
 from crewai.tools import BaseTool
@@ -11,6 +11,10 @@ from langchain_core.documents import Document
 from langchain_openai import OpenAIEmbeddings
 from pydantic import BaseModel, Field
 
+from raia_agents.tools.batch_search import DEFAULT_SEARCH_MODE, search_many
+from raia_agents.tools.embedding_cache import CachedEmbeddings
+from raia_agents.tools.index_registry import IndexRegistry
+
 load_dotenv()
 
 if not os.environ.get("OPENAI_API_KEY"):
@@ -23,7 +27,7 @@ class EmptyToolResultError(Exception):
     pass
 
 
-embeddings = OpenAIEmbeddings(model="text-embedding-ada-002")
+embeddings = CachedEmbeddings(OpenAIEmbeddings(model="text-embedding-ada-002"))
 
 index = faiss.IndexFlatL2()
 
@@ -34,6 +38,9 @@ vector_store = FAISS(
     index_to_docstore_id={},
 )
 
+# Shared by every Retriever so each FAISS folder is deserialized once per process.
+index_registry = IndexRegistry(embeddings)
+
 
 class RagToolSchema(BaseModel):
     """Schema para pegar o tópico de interesse do usuário para poder gerar questões"""
@@ -47,6 +54,10 @@ class RagToolSchema(BaseModel):
     threshold: float = Field(
         description="Limite de similaridade para considerar um trecho relevante. Um valor razoável é 0.2, mas pode ser ajustado conforme necessário."
     )
+    diversity: Optional[float] = Field(
+        default=None,
+        description="Peso de diversidade entre 0 e 1 para evitar trechos quase idênticos (0 ordena só por similaridade). Um valor razoável é 0.3.",
+    )
 
 
 class QuestionsRagToolSchema(RagToolSchema):
@@ -83,17 +94,29 @@ class SingleRagToolSchema(BaseModel):
     threshold_category: Optional[float] = Field(
         description="Limite de similaridade para considerar um trecho relevante na busca por categorias. Um valor razoável é 0.7."
     )
+    diversity: Optional[float] = Field(
+        default=None,
+        description="Peso de diversidade entre 0 e 1 para evitar trechos quase idênticos (0 ordena só por similaridade). Um valor razoável é 0.3.",
+    )
 
 
 class Retriever:
     def __init__(self, folder_path: str = "artifacts/"):
-        self.vector_store = FAISS.load_local(
-            folder_path,
-            embeddings,
-            allow_dangerous_deserialization=True,
-        )
+        self.vector_store = index_registry.get(folder_path)
+
+    def invoke(
+        self, topic, amount_to_retrieve, threshold, mode=DEFAULT_SEARCH_MODE, diversity=0.0
+    ):
+        if mode != "vector" or diversity:
+            return search_many(
+                {"store": self.vector_store},
+                [topic],
+                amount_to_retrieve,
+                threshold,
+                mode,
+                diversity,
+            )[0]["store"]
 
-    def invoke(self, topic, amount_to_retrieve, threshold):
         retrieve = self.vector_store.similarity_search_with_relevance_scores(
             k=amount_to_retrieve,
             query=topic,
@@ -103,18 +126,46 @@ class Retriever:
         return retrieve
 
 
+class BatchRetriever:
+    """Searches a list of topics in several indexes with one embeddings request."""
+
+    def __init__(self, folder_paths: Dict[str, str]):
+        self.vector_stores = {
+            name: index_registry.get(folder_path)
+            for name, folder_path in folder_paths.items()
+        }
+
+    def invoke(
+        self,
+        topics: List[str],
+        amount_to_retrieve: Union[int, Dict[str, int]],
+        threshold: Union[None, float, Dict[str, Optional[float]]],
+        mode: str = DEFAULT_SEARCH_MODE,
+        diversity: float = 0.0,
+    ) -> List[Dict[str, List[Tuple[Document, float]]]]:
+        return search_many(
+            self.vector_stores, topics, amount_to_retrieve, threshold, mode, diversity
+        )
+
+
 class CategoryRAGTool(BaseTool):
     name: str = "Category Retriever"
     description: str = (
         "Function that retrieves data of a database, based on user topic of interest, so that it helps to generate questions."
     )
     args_schema: Type[BaseModel] = CategoriesRagToolSchema
+    # "vector", "hybrid" (vector + BM25) or "lexical" (BM25 only, no API call).
+    search_mode: str = DEFAULT_SEARCH_MODE
 
     def _run(
-        self, topic: str, amount_to_retrieve: int, threshold: float = 0.2
+        self,
+        topic: str,
+        amount_to_retrieve: int,
+        threshold: float = 0.2,
+        diversity: Optional[float] = None,
     ) -> Union[List[Tuple[Document, float]], str]:
         retrieved = Retriever(folder_path="artifacts/questions_faiss").invoke(
-            topic, amount_to_retrieve, threshold
+            topic, amount_to_retrieve, threshold, self.search_mode, diversity or 0.0
         )
 
         if not retrieved or len(retrieved) == 0:
@@ -128,12 +179,18 @@ class QuestionsRAGTool(BaseTool):
         "Function that retrieves data of a database, based on user topic of interest, so that it helps to generate questions."
     )
     args_schema: Type[BaseModel] = QuestionsRagToolSchema
+    # "vector", "hybrid" (vector + BM25) or "lexical" (BM25 only, no API call).
+    search_mode: str = DEFAULT_SEARCH_MODE
 
     def _run(
-        self, topic: str, amount_to_retrieve: int, threshold: float = 0.2
+        self,
+        topic: str,
+        amount_to_retrieve: int,
+        threshold: float = 0.2,
+        diversity: Optional[float] = None,
     ) -> Union[List[Tuple[Document, float]], str]:
         retrieved = Retriever(folder_path="artifacts/questions_faiss").invoke(
-            topic, amount_to_retrieve, threshold
+            topic, amount_to_retrieve, threshold, self.search_mode, diversity or 0.0
         )
 
         if not retrieved or len(retrieved) == 0:
@@ -147,6 +204,8 @@ class SingleRagTool(BaseTool):
         "Function that retrieves data of a database, based on user topic of interest, so that it helps to generate questions."
     )
     args_schema: Type[BaseModel] = SingleRagToolSchema
+    # "vector", "hybrid" (vector + BM25) or "lexical" (BM25 only, no API call).
+    search_mode: str = DEFAULT_SEARCH_MODE
 
     def _run(
         self,
@@ -155,26 +214,32 @@ class SingleRagTool(BaseTool):
         threshold_question,
         amount_to_retrieve_category,
         threshold_category,
+        diversity=None,
     ) -> Union[List[Tuple[Document, float]], str]:
-        topic = topic
-        amount_to_retrieve = amount_to_retrieve_question or 4
-        threshold = threshold_question or 0.2
-        retrieved_questions = CategoryRAGTool()._run(
-            topic=topic,
-            amount_to_retrieve=amount_to_retrieve,
-            threshold=threshold,
-        )
-
+        retrieved = BatchRetriever(
+            {
+                "questions": "artifacts/questions_faiss",
+                "categories": "artifacts/category_faiss",
+            }
+        ).invoke(
+            [topic],
+            amount_to_retrieve={
+                "questions": amount_to_retrieve_question or 4,
+                "categories": amount_to_retrieve_category or 4,
+            },
+            threshold={
+                "questions": threshold_question or 0.2,
+                "categories": threshold_category or 0.7,
+            },
+            mode=self.search_mode,
+            diversity=diversity or 0.0,
+        )[0]
+
+        retrieved_questions = retrieved["questions"]
         if not retrieved_questions or len(retrieved_questions) == 0:
-            return "No question documents found for the given topic."
-        if isinstance(retrieved_questions, str):
-            return retrieved_questions
-
-        amount_to_retrieve = amount_to_retrieve_category or 4
-        threshold = threshold_category or 0.7
-        retrieved_categories = Retriever(folder_path="artifacts/category_faiss").invoke(
-            topic, amount_to_retrieve, threshold
-        )
+            return "No documents found for the given topic."
+
+        retrieved_categories = retrieved["categories"]
         if not retrieved_categories or len(retrieved_categories) == 0:
             return "No category documents found for the given topic."
 
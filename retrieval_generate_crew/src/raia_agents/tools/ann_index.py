@@ -0,0 +1,139 @@
+import argparse
+import math
+import os
+from typing import Any, Dict, Optional
+
+import faiss
+import numpy as np
+import yaml
+from langchain_community.vectorstores import FAISS
+
+from .mmap_store import iter_documents, load_vector_store, write_mmap_store
+
+DEFAULT_CONFIG_PATH = os.path.join(
+    os.path.dirname(__file__), "..", "config", "indexes.yaml"
+)
+
+BACKENDS = ("flat", "ivf_flat", "hnsw", "ivf_pq")
+
+
+def load_index_config(
+    name: str, config_path: str = DEFAULT_CONFIG_PATH, backend: Optional[str] = None
+) -> Dict[str, Any]:
+    """Returns the backend and its parameters configured for the index ``name``.
+
+    ``backend`` overrides the configured backend, returning its parameters.
+    """
+    with open(config_path, encoding="utf-8") as f:
+        config = yaml.safe_load(f) or {}
+    index_config = config.get(name, {})
+    backend = backend or index_config.get("backend", "flat")
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown FAISS backend {backend!r}, expected one of {BACKENDS}")
+    return {"backend": backend, "params": dict(index_config.get(backend, {}) or {})}
+
+
+def _clamp_nlist(nlist: int, num_vectors: int) -> int:
+    # FAISS wants about 39 training points per cluster.
+    return max(1, min(nlist, num_vectors // 39))
+
+
+def create_index(
+    backend: str,
+    dim: int,
+    params: Optional[Dict[str, Any]] = None,
+    train_vectors: Optional[np.ndarray] = None,
+) -> faiss.Index:
+    """Creates an empty L2 index of ``backend`` type, trained on ``train_vectors`` if needed."""
+    params = params or {}
+
+    if backend == "flat":
+        return faiss.IndexFlatL2(dim)
+    if backend == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, params.get("m", 32))
+        index.hnsw.efConstruction = params.get("ef_construction", 200)
+        index.hnsw.efSearch = params.get("ef_search", 64)
+        return index
+    if backend not in ("ivf_flat", "ivf_pq"):
+        raise ValueError(f"Unknown FAISS backend {backend!r}, expected one of {BACKENDS}")
+    if train_vectors is None or len(train_vectors) == 0:
+        raise ValueError(f"The {backend} backend needs training vectors")
+
+    train_vectors = np.ascontiguousarray(train_vectors, dtype=np.float32)
+    num_vectors = len(train_vectors)
+    nlist = _clamp_nlist(params.get("nlist", 1024), num_vectors)
+    quantizer = faiss.IndexFlatL2(dim)
+    if backend == "ivf_flat":
+        index = faiss.IndexIVFFlat(quantizer, dim, nlist)
+    else:
+        m = params.get("m", 64)
+        if dim % m != 0:
+            raise ValueError(f"ivf_pq m={m} must divide the dimension {dim}")
+        # Each sub-quantizer wants about 39 training points per centroid.
+        nbits = min(
+            params.get("nbits", 8), max(1, int(math.log2(max(num_vectors // 39, 2))))
+        )
+        index = faiss.IndexIVFPQ(quantizer, dim, nlist, m, nbits)
+    index.train(train_vectors)
+    index.nprobe = min(params.get("nprobe", 16), nlist)
+    return index
+
+
+def build_index(
+    backend: str, vectors: np.ndarray, params: Optional[Dict[str, Any]] = None
+) -> faiss.Index:
+    """Builds (and trains, if needed) an L2 index of ``backend`` type over ``vectors``."""
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    index = create_index(backend, vectors.shape[1], params, vectors)
+    index.add(vectors)
+    return index
+
+
+def rebuild_vector_store(
+    vector_store: FAISS, backend: str, params: Optional[Dict[str, Any]] = None
+) -> FAISS:
+    """Returns a copy of ``vector_store`` whose index uses ``backend``.
+
+    The vectors are reconstructed from the current index, so no embeddings
+    requests are needed. Documents and ids are kept as they are.
+    """
+    vectors = vector_store.index.reconstruct_n(0, vector_store.index.ntotal)
+    return FAISS(
+        embedding_function=vector_store.embedding_function,
+        index=build_index(backend, vectors, params),
+        docstore=vector_store.docstore,
+        index_to_docstore_id=vector_store.index_to_docstore_id,
+        normalize_L2=vector_store._normalize_L2,
+        distance_strategy=vector_store.distance_strategy,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Rebuild a saved FAISS vector store with the backend set in indexes.yaml.",
+    )
+    parser.add_argument("folder_path", help="Folder of the index, e.g. artifacts/questions_faiss")
+    parser.add_argument("output_path", help="Folder to write the rebuilt index to")
+    parser.add_argument(
+        "--name",
+        help="Entry of indexes.yaml to use. Defaults to the folder name.",
+    )
+    parser.add_argument("--config", default=DEFAULT_CONFIG_PATH)
+    args = parser.parse_args()
+
+    name = args.name or os.path.basename(os.path.normpath(args.folder_path))
+    index_config = load_index_config(name, args.config)
+    # Only the vectors are needed, so no embeddings model is attached.
+    vector_store = load_vector_store(args.folder_path, None)
+    rebuilt = rebuild_vector_store(
+        vector_store, index_config["backend"], index_config["params"]
+    )
+    write_mmap_store(args.output_path, rebuilt.index, iter_documents(rebuilt))
+    print(
+        f"Rebuilt {args.folder_path} ({rebuilt.index.ntotal} vectors) as "
+        f"{index_config['backend']} in {args.output_path}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+import os
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import faiss
+import numpy as np
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+
+from .lexical_index import lexical_index_for
+from .metadata_index import metadata_index_for, search_selected
+from .mmr import ScoredIds, rerank
+
+ScoredDocuments = List[Tuple[Document, float]]
+
+SEARCH_MODES = ("vector", "hybrid", "lexical")
+DEFAULT_SEARCH_MODE = os.environ.get("RAIA_SEARCH_MODE", "vector")
+
+
+def embed_topics(vector_store: FAISS, topics: List[str]) -> np.ndarray:
+    """Embeds every topic with a single batched request to the store's embeddings."""
+    vectors = vector_store.embedding_function.embed_documents(topics)
+    return np.asarray(vectors, dtype=np.float32).reshape(len(topics), -1)
+
+
+def _documents(vector_store: FAISS, scored_ids: ScoredIds) -> ScoredDocuments:
+    return [
+        (vector_store.docstore.search(vector_store.index_to_docstore_id[i]), score)
+        for i, score in scored_ids
+    ]
+
+
+def search_vectors(
+    vector_store: FAISS,
+    query_vectors: np.ndarray,
+    k: int,
+    score_threshold: Optional[float] = None,
+    filter: Optional[Dict[str, Any]] = None,
+    fetch_k: int = 20,
+    diversity: float = 0.0,
+) -> List[ScoredDocuments]:
+    """Runs one matrix search for all query vectors.
+
+    Scores are converted with the store's relevance function and filtered with
+    ``>= score_threshold``, the same semantics as
+    ``FAISS.similarity_search_with_relevance_scores``. Filters on fields of the
+    metadata index run inside FAISS and always return k hits when enough
+    documents match; other filters fall back to over-fetching ``fetch_k`` hits.
+    With ``diversity`` > 0, k of ``fetch_k`` candidates are picked by MMR.
+    """
+    vectors = np.array(query_vectors, dtype=np.float32)
+    if vector_store._normalize_L2:
+        faiss.normalize_L2(vectors)
+
+    selected_ids = None
+    if filter is not None:
+        selected_ids = metadata_index_for(vector_store).select(filter)
+
+    search_k = max(k, fetch_k) if diversity else k
+    filter_func = None
+    if selected_ids is not None:
+        distances, indices = search_selected(
+            vector_store.index, vectors, search_k, selected_ids
+        )
+    elif filter is not None:
+        distances, indices = vector_store.index.search(vectors, max(k, fetch_k))
+        filter_func = vector_store._create_filter_func(filter)
+    else:
+        distances, indices = vector_store.index.search(vectors, search_k)
+    relevance_score_fn = vector_store._select_relevance_score_fn()
+
+    results = []
+    for row_distances, row_indices in zip(distances, indices):
+        candidates = []
+        for distance, i in zip(row_distances, row_indices):
+            if i == -1:
+                continue
+            if filter_func is not None:
+                doc = vector_store.docstore.search(vector_store.index_to_docstore_id[i])
+                if not filter_func(doc.metadata):
+                    continue
+            score = relevance_score_fn(float(distance))
+            if score_threshold is not None and score < score_threshold:
+                continue
+            candidates.append((int(i), score))
+        results.append(
+            _documents(vector_store, rerank(vector_store.index, candidates, k, diversity))
+        )
+    return results
+
+
+def search_lexical(
+    vector_store: FAISS,
+    topics: List[str],
+    k: int,
+    fetch_k: int = 20,
+    diversity: float = 0.0,
+) -> List[ScoredDocuments]:
+    """BM25 search over the store's documents, without any embeddings request.
+
+    Scores are divided by the best score of each topic, so the top hit scores
+    1.0; they are not comparable to relevance scores and no threshold applies.
+    """
+    lexical_index = lexical_index_for(vector_store)
+    search_k = max(k, fetch_k) if diversity else k
+    results = []
+    for topic in topics:
+        ids, scores = lexical_index.search(topic, search_k)
+        candidates = [(int(i), float(score / scores[0])) for i, score in zip(ids, scores)]
+        results.append(
+            _documents(vector_store, rerank(vector_store.index, candidates, k, diversity))
+        )
+    return results
+
+
+def search_hybrid(
+    vector_store: FAISS,
+    topics: List[str],
+    query_vectors: np.ndarray,
+    k: int,
+    score_threshold: Optional[float] = None,
+    alpha: float = 0.5,
+    fetch_k: int = 20,
+    diversity: float = 0.0,
+) -> List[ScoredDocuments]:
+    """Fuses the vector and BM25 rankings of ``fetch_k`` candidates per topic.
+
+    The fused score is ``alpha * relevance + (1 - alpha) * normalized BM25``,
+    where a candidate missing from one ranking scores 0 in it. The threshold
+    keeps the semantics of the vector search: it drops vector candidates below
+    it, while documents matched by BM25 are always eligible.
+    """
+    vectors = np.array(query_vectors, dtype=np.float32)
+    if vector_store._normalize_L2:
+        faiss.normalize_L2(vectors)
+    fetch_k = max(k, fetch_k)
+    distances, indices = vector_store.index.search(vectors, fetch_k)
+    relevance_score_fn = vector_store._select_relevance_score_fn()
+    lexical_index = lexical_index_for(vector_store)
+
+    results = []
+    for topic, row_distances, row_indices in zip(topics, distances, indices):
+        fused: Dict[int, float] = {}
+        for distance, i in zip(row_distances, row_indices):
+            score = relevance_score_fn(float(distance))
+            if i == -1 or (score_threshold is not None and score < score_threshold):
+                continue
+            fused[int(i)] = alpha * score
+        ids, scores = lexical_index.search(topic, fetch_k)
+        for i, score in zip(ids, scores):
+            fused[int(i)] = fused.get(int(i), 0.0) + (1 - alpha) * float(score / scores[0])
+
+        candidates = sorted(fused.items(), key=lambda item: item[1], reverse=True)
+        results.append(
+            _documents(vector_store, rerank(vector_store.index, candidates, k, diversity))
+        )
+    return results
+
+
+def search_many(
+    vector_stores: Dict[str, FAISS],
+    topics: List[str],
+    k: Union[int, Dict[str, int]],
+    score_threshold: Union[None, float, Dict[str, Optional[float]]] = None,
+    mode: str = "vector",
+    diversity: float = 0.0,
+) -> List[Dict[str, ScoredDocuments]]:
+    """Searches several topics in several vector stores at once.
+
+    Topics are embedded once per distinct embeddings object, so stores built
+    with the same model share a single batched embeddings request. ``mode`` is
+    one of SEARCH_MODES; "lexical" embeds nothing. ``diversity`` (0 to 1)
+    re-ranks the candidates with MMR over their stored vectors. Returns one
+    ``{store name: [(document, score), ...]}`` dict per topic.
+    """
+    if mode not in SEARCH_MODES:
+        raise ValueError(f"Unknown search mode {mode!r}, expected one of {SEARCH_MODES}")
+    vectors_by_embeddings: Dict[int, np.ndarray] = {}
+    results: List[Dict[str, ScoredDocuments]] = [{} for _ in topics]
+    if not topics:
+        return results
+
+    for name, vector_store in vector_stores.items():
+        store_k = k[name] if isinstance(k, dict) else k
+        store_threshold = (
+            score_threshold.get(name)
+            if isinstance(score_threshold, dict)
+            else score_threshold
+        )
+        if mode == "lexical":
+            matches = search_lexical(vector_store, topics, store_k, diversity=diversity)
+            for topic_results, docs in zip(results, matches):
+                topic_results[name] = docs
+            continue
+
+        key = id(vector_store.embedding_function)
+        if key not in vectors_by_embeddings:
+            vectors_by_embeddings[key] = embed_topics(vector_store, topics)
+        query_vectors = vectors_by_embeddings[key]
+        if mode == "hybrid":
+            matches = search_hybrid(
+                vector_store,
+                topics,
+                query_vectors,
+                store_k,
+                store_threshold,
+                diversity=diversity,
+            )
+        else:
+            matches = search_vectors(
+                vector_store, query_vectors, store_k, store_threshold, diversity=diversity
+            )
+        for topic_results, docs in zip(results, matches):
+            topic_results[name] = docs
+    return results
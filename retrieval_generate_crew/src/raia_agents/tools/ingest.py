@@ -0,0 +1,380 @@
+"""
+Streaming, resumable build of the FAISS question stores in artifacts/.
+
+Questions are read one row at a time from a CSV or JSONL file, embedded in
+batches with a bounded number of concurrent requests and appended to a
+work directory together with a checkpoint. If the process dies, running the
+same command again resumes after the last checkpointed batch. Once every row
+is embedded the index is built with the backend configured in indexes.yaml,
+saved as a new version with a manifest and published to the output folder in
+the memory-mapped format of mmap_store.
+
+How to execute (from retrieval_generate_crew/):
+python -m raia_agents.tools.ingest questions.jsonl artifacts/questions_faiss
+
+Use --stub-embeddings DIM to build with deterministic local vectors
+(no API calls), e.g. to test the pipeline.
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import os
+import shutil
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from itertools import islice
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+from langchain_core.documents import Document
+
+from .ann_index import DEFAULT_CONFIG_PATH, create_index, load_index_config
+from .lexical_index import LEXICAL_INDEX_FILE, BM25Index
+from .mmap_store import write_mmap_store
+
+EmbedFunction = Callable[[List[str]], List[List[float]]]
+
+DEFAULT_METADATA_COLUMNS = ("university", "year", "disciplina", "question_id")
+# Metadata stored as integers, so filters like {"year": 2020} match CSV rows too.
+DEFAULT_INT_COLUMNS = ("year", "question_id")
+
+
+def _coerce_int(value: Any) -> Any:
+    if isinstance(value, str):
+        try:
+            return int(value.strip())
+        except ValueError:
+            pass
+    return value
+
+
+def iter_source(
+    path: str,
+    text_column: str,
+    metadata_columns: Sequence[str],
+    int_columns: Sequence[str] = DEFAULT_INT_COLUMNS,
+) -> Iterator[Optional[Dict[str, Any]]]:
+    """Yields one ``{"text", "metadata"}`` dict per source row (None for empty rows).
+
+    Values of ``int_columns`` that read as integers are stored as int; CSV
+    gives every value as a string.
+    """
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        if path.endswith(".jsonl"):
+            rows = (json.loads(line) if line.strip() else {} for line in f)
+        else:
+            rows = csv.DictReader(f)
+        for row in rows:
+            text = row.get(text_column)
+            if not text:
+                yield None
+                continue
+            metadata = {
+                column: _coerce_int(row[column]) if column in int_columns else row[column]
+                for column in metadata_columns
+                if row.get(column) not in (None, "")
+            }
+            yield {"text": text, "metadata": metadata}
+
+
+def _source_fingerprint(path: str) -> str:
+    stat = os.stat(path)
+    return hashlib.sha256(
+        f"{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}".encode()
+    ).hexdigest()
+
+
+def _write_json_atomic(path: str, data: Dict[str, Any]) -> None:
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def _embed_with_retries(
+    embed: EmbedFunction, texts: List[str], retries: int = 3
+) -> np.ndarray:
+    if not texts:
+        return np.empty((0, 0), dtype=np.float32)
+    for attempt in range(retries):
+        try:
+            return np.asarray(embed(texts), dtype=np.float32)
+        except Exception:
+            if attempt == retries - 1:
+                raise
+            time.sleep(2**attempt)
+
+
+class IndexBuilder:
+    """Embeds a question source into ``<output>.versions/`` and publishes it to ``output``.
+
+    Work files in ``<output>.versions/partial/``:
+    ``vectors.f32`` (raw float32 rows), ``docs.jsonl`` (one document per
+    vector) and ``checkpoint.json`` (how many source rows and bytes are done).
+    """
+
+    def __init__(
+        self,
+        source_path: str,
+        output_path: str,
+        embed: EmbedFunction,
+        embedding_model: str,
+        text_column: str = "text",
+        metadata_columns: Sequence[str] = DEFAULT_METADATA_COLUMNS,
+        int_columns: Sequence[str] = DEFAULT_INT_COLUMNS,
+        batch_size: int = 256,
+        concurrency: int = 4,
+        index_name: Optional[str] = None,
+        config_path: str = DEFAULT_CONFIG_PATH,
+    ):
+        self.source_path = source_path
+        self.output_path = os.path.normpath(output_path)
+        self.embed = embed
+        self.embedding_model = embedding_model
+        self.text_column = text_column
+        self.metadata_columns = tuple(metadata_columns)
+        self.int_columns = frozenset(int_columns)
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.index_name = index_name or os.path.basename(self.output_path)
+        self.config_path = config_path
+
+        self.versions_path = f"{self.output_path}.versions"
+        self.work_path = os.path.join(self.versions_path, "partial")
+        self.vectors_path = os.path.join(self.work_path, "vectors.f32")
+        self.docs_path = os.path.join(self.work_path, "docs.jsonl")
+        self.checkpoint_path = os.path.join(self.work_path, "checkpoint.json")
+
+    def _load_checkpoint(self, restart: bool) -> Dict[str, Any]:
+        fingerprint = _source_fingerprint(self.source_path)
+        if not restart and os.path.exists(self.checkpoint_path):
+            with open(self.checkpoint_path, encoding="utf-8") as f:
+                checkpoint = json.load(f)
+            if checkpoint["source_fingerprint"] != fingerprint:
+                raise RuntimeError(
+                    f"{self.source_path} changed since the interrupted build; "
+                    "use --restart to start over"
+                )
+            # Drop anything written after the last checkpoint.
+            with open(self.vectors_path, "r+b") as f:
+                f.truncate(checkpoint["vectors_bytes"])
+            with open(self.docs_path, "r+b") as f:
+                f.truncate(checkpoint["docs_bytes"])
+            return checkpoint
+
+        shutil.rmtree(self.work_path, ignore_errors=True)
+        os.makedirs(self.work_path)
+        open(self.vectors_path, "wb").close()
+        open(self.docs_path, "wb").close()
+        checkpoint = {
+            "source_fingerprint": fingerprint,
+            "rows_done": 0,
+            "num_vectors": 0,
+            "dim": None,
+            "vectors_bytes": 0,
+            "docs_bytes": 0,
+        }
+        _write_json_atomic(self.checkpoint_path, checkpoint)
+        return checkpoint
+
+    def _batches(self, rows_done: int) -> Iterator[List[Optional[Dict[str, Any]]]]:
+        rows = iter_source(
+            self.source_path, self.text_column, self.metadata_columns, self.int_columns
+        )
+        rows = islice(rows, rows_done, None)
+        while True:
+            batch = list(islice(rows, self.batch_size))
+            if not batch:
+                return
+            yield batch
+
+    def _append(self, checkpoint, batch, vectors: np.ndarray) -> None:
+        docs = [row for row in batch if row is not None]
+        if docs:
+            if checkpoint["dim"] is None:
+                checkpoint["dim"] = int(vectors.shape[1])
+            with open(self.vectors_path, "ab") as f:
+                f.write(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            with open(self.docs_path, "ab") as f:
+                for doc in docs:
+                    doc = {"id": str(uuid.uuid4()), **doc}
+                    f.write((json.dumps(doc, ensure_ascii=False) + "\n").encode("utf-8"))
+                f.flush()
+                os.fsync(f.fileno())
+
+        checkpoint["rows_done"] += len(batch)
+        checkpoint["num_vectors"] += len(docs)
+        checkpoint["vectors_bytes"] = os.path.getsize(self.vectors_path)
+        checkpoint["docs_bytes"] = os.path.getsize(self.docs_path)
+        _write_json_atomic(self.checkpoint_path, checkpoint)
+
+    def embed_source(self, restart: bool = False) -> Dict[str, Any]:
+        """Embeds every remaining source row, checkpointing after each batch."""
+        checkpoint = self._load_checkpoint(restart)
+        if checkpoint["rows_done"]:
+            print(f"Resuming after {checkpoint['rows_done']} rows")
+
+        start = time.perf_counter()
+        pending = deque()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            batches = self._batches(checkpoint["rows_done"])
+            for batch in batches:
+                texts = [row["text"] for row in batch if row is not None]
+                pending.append(
+                    (batch, executor.submit(_embed_with_retries, self.embed, texts))
+                )
+                # Batches are written in source order, so the checkpoint is a prefix.
+                if len(pending) >= self.concurrency:
+                    done_batch, future = pending.popleft()
+                    self._append(checkpoint, done_batch, future.result())
+            while pending:
+                done_batch, future = pending.popleft()
+                self._append(checkpoint, done_batch, future.result())
+
+        elapsed = time.perf_counter() - start
+        print(
+            f"Embedded {checkpoint['num_vectors']} documents from "
+            f"{checkpoint['rows_done']} rows in {elapsed:.1f}s"
+        )
+        return checkpoint
+
+    def build(self, checkpoint: Dict[str, Any], train_size: int = 100_000) -> str:
+        """Builds the index from the work files and writes it as a new version."""
+        num_vectors, dim = checkpoint["num_vectors"], checkpoint["dim"]
+        if not num_vectors:
+            raise RuntimeError(f"No documents with {self.text_column!r} in {self.source_path}")
+
+        vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="r").reshape(
+            num_vectors, dim
+        )
+        index_config = load_index_config(self.index_name, self.config_path)
+        rng = np.random.default_rng(0)
+        sample = np.sort(rng.choice(num_vectors, min(num_vectors, train_size), replace=False))
+        index = create_index(
+            index_config["backend"], dim, index_config["params"], vectors[sample]
+        )
+        for start in range(0, num_vectors, self.batch_size * 16):
+            index.add(np.ascontiguousarray(vectors[start : start + self.batch_size * 16]))
+
+        def documents():
+            with open(self.docs_path, encoding="utf-8") as f:
+                for line in f:
+                    doc = json.loads(line)
+                    yield Document(
+                        id=doc["id"], page_content=doc["text"], metadata=doc["metadata"]
+                    )
+
+        version = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        version_path = os.path.join(self.versions_path, version)
+        write_mmap_store(version_path, index, documents())
+        BM25Index.from_documents(documents()).save(
+            os.path.join(version_path, LEXICAL_INDEX_FILE)
+        )
+        _write_json_atomic(
+            os.path.join(version_path, "manifest.json"),
+            {
+                "version": version,
+                "created_at": datetime.now(timezone.utc).isoformat(),
+                "source_path": os.path.abspath(self.source_path),
+                "source_fingerprint": checkpoint["source_fingerprint"],
+                "source_rows": checkpoint["rows_done"],
+                "num_vectors": num_vectors,
+                "dim": dim,
+                "embedding_model": self.embedding_model,
+                "backend": index_config["backend"],
+                "backend_params": index_config["params"],
+                "batch_size": self.batch_size,
+            },
+        )
+        return version_path
+
+    def publish(self, version_path: str) -> None:
+        """Replaces the contents of the output folder with ``version_path``."""
+        staging_path = f"{self.output_path}.staging"
+        old_path = f"{self.output_path}.old"
+        shutil.rmtree(staging_path, ignore_errors=True)
+        shutil.rmtree(old_path, ignore_errors=True)
+        shutil.copytree(version_path, staging_path)
+        if os.path.exists(self.output_path):
+            os.rename(self.output_path, old_path)
+        os.rename(staging_path, self.output_path)
+        shutil.rmtree(old_path, ignore_errors=True)
+        shutil.rmtree(self.work_path, ignore_errors=True)
+
+    def run(self, restart: bool = False) -> str:
+        checkpoint = self.embed_source(restart)
+        version_path = self.build(checkpoint)
+        self.publish(version_path)
+        print(f"Published {version_path} to {self.output_path}")
+        return version_path
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Build a FAISS question store from a CSV or JSONL file.",
+    )
+    parser.add_argument("source_path", help="CSV or .jsonl file with one question per row")
+    parser.add_argument("output_path", help="Index folder, e.g. artifacts/questions_faiss")
+    parser.add_argument("--text-column", default="text")
+    parser.add_argument(
+        "--metadata-columns", nargs="*", default=list(DEFAULT_METADATA_COLUMNS)
+    )
+    parser.add_argument(
+        "--int-columns",
+        nargs="*",
+        default=list(DEFAULT_INT_COLUMNS),
+        help="Metadata columns stored as integers.",
+    )
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--model", default="text-embedding-ada-002")
+    parser.add_argument("--index-name", help="Entry of indexes.yaml. Defaults to the folder name.")
+    parser.add_argument("--config", default=DEFAULT_CONFIG_PATH)
+    parser.add_argument(
+        "--stub-embeddings",
+        type=int,
+        metavar="DIM",
+        help="Use deterministic local embeddings of this size instead of OpenAI.",
+    )
+    parser.add_argument(
+        "--restart", action="store_true", help="Ignore an interrupted build and start over."
+    )
+    args = parser.parse_args()
+
+    if args.stub_embeddings:
+        from langchain_core.embeddings import DeterministicFakeEmbedding
+
+        embeddings = DeterministicFakeEmbedding(size=args.stub_embeddings)
+        model = f"stub-{args.stub_embeddings}"
+    else:
+        from langchain_openai import OpenAIEmbeddings
+
+        embeddings = OpenAIEmbeddings(model=args.model)
+        model = args.model
+
+    IndexBuilder(
+        args.source_path,
+        args.output_path,
+        embeddings.embed_documents,
+        model,
+        text_column=args.text_column,
+        metadata_columns=args.metadata_columns,
+        int_columns=args.int_columns,
+        batch_size=args.batch_size,
+        concurrency=args.concurrency,
+        index_name=args.index_name,
+        config_path=args.config,
+    ).run(restart=args.restart)
+
+
+if __name__ == "__main__":
+    main()
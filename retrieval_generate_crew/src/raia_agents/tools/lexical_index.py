@@ -0,0 +1,196 @@
+import os
+import re
+import unicodedata
+import weakref
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+
+from .mmap_store import iter_documents
+
+LEXICAL_INDEX_FILE = "bm25.npz"
+
+STOPWORDS = frozenset(
+    """
+    a ao aos aquela aquelas aquele aqueles aquilo as ate com como da das de dela
+    delas dele deles depois do dos e ela elas ele eles em entre era eram essa essas
+    esse esses esta estas este estes eu foi foram ha isso isto ja la lhe lhes mais
+    mas me mesmo meu minha muito na nas nem no nos nossa nosso num numa o os ou para
+    pela pelas pelo pelos por qual quando que quem se sem ser seu seus sua suas so
+    sobre tambem te tem ter um uma umas uns voce voces
+    """.split()
+)
+
+# (suffix, replacement, minimum stem length), longest suffixes first. The
+# plural step runs before the derivational one ("fisicas" -> "fisica" -> "fisic").
+_PLURAL_SUFFIXES = (
+    ("oes", "ao", 2), ("aes", "ao", 2), ("ais", "al", 2), ("eis", "el", 2),
+    ("ois", "ol", 2), ("res", "r", 2), ("ns", "m", 2), ("s", "", 3),
+)
+_SUFFIXES = (
+    ("amento", "", 4), ("imento", "", 4), ("mente", "", 4), ("idade", "", 4),
+    ("ismo", "", 4), ("ista", "", 4), ("encia", "", 4), ("ancia", "", 4),
+    ("ica", "", 4), ("ico", "", 4), ("ao", "", 3), ("a", "", 3), ("o", "", 3),
+    ("e", "", 3),
+)
+
+
+def fold(text: str) -> str:
+    """Lowercases and strips accents ("Óptica" -> "optica")."""
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def _strip_suffix(token: str, suffixes) -> str:
+    for suffix, replacement, min_stem in suffixes:
+        if token.endswith(suffix) and len(token) - len(suffix) >= min_stem:
+            return token[: -len(suffix)] + replacement
+    return token
+
+
+def stem(token: str) -> str:
+    """Light Portuguese stemmer: strips plural, gender and common derivational suffixes."""
+    return _strip_suffix(_strip_suffix(token, _PLURAL_SUFFIXES), _SUFFIXES)
+
+
+def tokenize(text: str) -> List[str]:
+    """Folds, stems and drops stopwords and numbers (years are kept)."""
+    return [
+        stem(token)
+        for token in re.findall(r"\w+", fold(text))
+        if token not in STOPWORDS and (not token.isdigit() or len(token) == 4)
+    ]
+
+
+class BM25Index:
+    """Okapi BM25 inverted index over the documents of a vector store.
+
+    Document ids are the FAISS ids of the store, so lexical and vector hits
+    can be fused directly.
+    """
+
+    def __init__(
+        self,
+        vocabulary: Dict[str, int],
+        offsets: np.ndarray,
+        doc_ids: np.ndarray,
+        term_frequencies: np.ndarray,
+        doc_lengths: np.ndarray,
+        k1: float = 1.2,
+        b: float = 0.75,
+    ):
+        self.vocabulary = vocabulary
+        self.offsets = offsets
+        self.doc_ids = doc_ids
+        self.term_frequencies = term_frequencies
+        self.doc_lengths = doc_lengths
+        self.k1 = k1
+        self.b = b
+        num_docs = len(doc_lengths)
+        document_frequencies = np.diff(offsets)
+        self.idf = np.log(
+            1 + (num_docs - document_frequencies + 0.5) / (document_frequencies + 0.5)
+        )
+        self.avg_length = float(doc_lengths.mean()) if num_docs else 0.0
+
+    @classmethod
+    def from_documents(cls, documents: Iterable[Document]) -> "BM25Index":
+        """Indexes ``documents``, whose positions must be their FAISS ids."""
+        postings = defaultdict(list)
+        doc_lengths = []
+        for i, document in enumerate(documents):
+            tokens = tokenize(document.page_content)
+            doc_lengths.append(len(tokens))
+            for term, count in Counter(tokens).items():
+                postings[term].append((i, count))
+
+        vocabulary = {term: n for n, term in enumerate(postings)}
+        lengths = [len(postings[term]) for term in vocabulary]
+        offsets = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+        pairs = [pair for term in vocabulary for pair in postings[term]]
+        pairs = np.array(pairs, dtype=np.int64).reshape(-1, 2)
+        return cls(
+            vocabulary,
+            offsets,
+            pairs[:, 0].copy(),
+            pairs[:, 1].astype(np.float32),
+            np.array(doc_lengths, dtype=np.float32),
+        )
+
+    @classmethod
+    def from_vector_store(cls, vector_store: FAISS) -> "BM25Index":
+        return cls.from_documents(iter_documents(vector_store))
+
+    def save(self, path: str) -> None:
+        terms = np.array(sorted(self.vocabulary, key=self.vocabulary.get))
+        np.savez(
+            path,
+            terms=terms,
+            offsets=self.offsets,
+            doc_ids=self.doc_ids,
+            term_frequencies=self.term_frequencies,
+            doc_lengths=self.doc_lengths,
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "BM25Index":
+        data = np.load(path, allow_pickle=False)
+        vocabulary = {str(term): n for n, term in enumerate(data["terms"])}
+        return cls(
+            vocabulary,
+            data["offsets"],
+            data["doc_ids"],
+            data["term_frequencies"],
+            data["doc_lengths"],
+        )
+
+    def search(self, query: str, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Returns the ids and BM25 scores of the ``k`` best documents for ``query``."""
+        ids, scores = [], []
+        for term in set(tokenize(query)):
+            n = self.vocabulary.get(term)
+            if n is None:
+                continue
+            start, end = self.offsets[n], self.offsets[n + 1]
+            doc_ids = self.doc_ids[start:end]
+            tf = self.term_frequencies[start:end]
+            norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[doc_ids] / self.avg_length)
+            ids.append(doc_ids)
+            scores.append(self.idf[n] * tf * (self.k1 + 1) / (tf + norm))
+        if not ids:
+            return np.empty(0, np.int64), np.empty(0, np.float32)
+
+        unique_ids, inverse = np.unique(np.concatenate(ids), return_inverse=True)
+        totals = np.bincount(inverse, weights=np.concatenate(scores))
+        top = np.argsort(-totals, kind="stable")[:k]
+        return unique_ids[top], totals[top]
+
+
+_lexical_indexes: "weakref.WeakKeyDictionary[FAISS, BM25Index]" = (
+    weakref.WeakKeyDictionary()
+)
+_folder_paths: "weakref.WeakKeyDictionary[FAISS, str]" = weakref.WeakKeyDictionary()
+
+
+def attach_folder(vector_store: FAISS, folder_path: str) -> None:
+    """Records where ``vector_store`` was loaded from, to find its ``bm25.npz``."""
+    _folder_paths[vector_store] = folder_path
+
+
+def lexical_index_for(vector_store: FAISS) -> BM25Index:
+    """Returns the BM25 index of ``vector_store``.
+
+    It is read from ``bm25.npz`` in the store's folder when present, otherwise
+    built from the documents on first use and kept for the store's lifetime.
+    """
+    if vector_store not in _lexical_indexes:
+        folder_path = _folder_paths.get(vector_store)
+        path = folder_path and os.path.join(folder_path, LEXICAL_INDEX_FILE)
+        if path and os.path.exists(path):
+            _lexical_indexes[vector_store] = BM25Index.load(path)
+        else:
+            _lexical_indexes[vector_store] = BM25Index.from_vector_store(vector_store)
+    return _lexical_indexes[vector_store]
@@ -0,0 +1,213 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+DEFAULT_REQUEST_CACHE_PATH = os.environ.get(
+    "RAIA_REQUEST_CACHE", "artifacts/request_cache.sqlite"
+)
+# Cosine distance under which two requests share their outputs; 0 disables the cache.
+DEFAULT_MAX_DISTANCE = float(os.environ.get("RAIA_REQUEST_CACHE_DISTANCE", "0.03"))
+DEFAULT_TTL_SECONDS = float(os.environ.get("RAIA_REQUEST_CACHE_TTL", str(7 * 24 * 3600)))
+
+# Tasks whose output depends only on input_user.
+CACHED_TASKS = ("melhorar_pergunta", "filtrar_topicos")
+
+
+class SemanticRequestCache:
+    """Cache of task outputs keyed by the embedding of the user request.
+
+    A request reuses the outputs stored for the closest cached request when
+    their cosine distance is at most ``max_distance``, so small rewordings of
+    the same request skip the LLM calls. Entries older than ``ttl_seconds``
+    expire and the least recently used ones are evicted above ``max_entries``.
+    Entries live in SQLite; their vectors are kept in memory for the lookup.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        path: str = DEFAULT_REQUEST_CACHE_PATH,
+        max_distance: float = DEFAULT_MAX_DISTANCE,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        max_entries: int = 10_000,
+        model_name: Optional[str] = None,
+    ):
+        self.embeddings = embeddings
+        self.max_distance = max_distance
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.model_name = model_name or getattr(
+            embeddings, "model_name", getattr(embeddings, "model", type(embeddings).__name__)
+        )
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS requests (
+                id INTEGER PRIMARY KEY,
+                model TEXT NOT NULL,
+                request TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                outputs TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+        self._ids = np.empty(0, dtype=np.int64)
+        self._vectors = np.empty((0, 0), dtype=np.float32)
+        self._reload()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_distance > 0
+
+    def _reload(self) -> None:
+        """Drops expired entries and reloads the unit vectors of the others."""
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM requests WHERE created_at < ?",
+                (time.time() - self.ttl_seconds,),
+            )
+            self._conn.commit()
+            rows = self._conn.execute(
+                "SELECT id, vector FROM requests WHERE model = ?", (self.model_name,)
+            ).fetchall()
+        ids = np.array([row[0] for row in rows], dtype=np.int64)
+        if rows:
+            vectors = np.stack([np.frombuffer(row[1], dtype=np.float32) for row in rows])
+            vectors = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+        else:
+            vectors = np.empty((0, 0), dtype=np.float32)
+        # Swapped under the lock, so concurrent lookups see matching ids and vectors.
+        with self._lock:
+            self._ids, self._vectors = ids, vectors
+
+    def _embed(self, request: str) -> np.ndarray:
+        vector = np.asarray(self.embeddings.embed_query(request), dtype=np.float32)
+        return vector / max(float(np.linalg.norm(vector)), 1e-12)
+
+    def lookup(self, request: str) -> Optional[Dict[str, str]]:
+        """Returns the cached ``{task name: output}`` of the closest request, if close enough."""
+        if not self.enabled:
+            return None
+        with self._lock:
+            ids, vectors = self._ids, self._vectors
+        if len(ids):
+            query = self._embed(request)
+            distances = 1 - vectors @ query
+            best = int(np.argmin(distances))
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT request, outputs, created_at FROM requests WHERE id = ?",
+                    (int(ids[best]),),
+                ).fetchone()
+                fresh = row is not None and row[2] >= time.time() - self.ttl_seconds
+                if fresh and distances[best] <= self.max_distance:
+                    self._conn.execute(
+                        "UPDATE requests SET last_used = ? WHERE id = ?",
+                        (time.time(), int(ids[best])),
+                    )
+                    self._conn.commit()
+                    self.hits += 1
+                    print(
+                        f"Request cache hit (distance {distances[best]:.4f}): "
+                        f"{request!r} reuses {row[0]!r}"
+                    )
+                    return json.loads(row[1])
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def store(self, request: str, outputs: Dict[str, str]) -> None:
+        if not self.enabled or not outputs:
+            return
+        vector = self._embed(request)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO requests (model, request, vector, outputs, created_at, last_used)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    self.model_name,
+                    request,
+                    vector.tobytes(),
+                    json.dumps(outputs, ensure_ascii=False),
+                    now,
+                    now,
+                ),
+            )
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM requests").fetchone()
+            if count > self.max_entries:
+                self._conn.execute(
+                    """
+                    DELETE FROM requests WHERE id IN (
+                        SELECT id FROM requests ORDER BY last_used LIMIT ?
+                    )
+                    """,
+                    (count - self.max_entries,),
+                )
+            self._conn.commit()
+        self._reload()
+
+    def stats(self) -> Dict[str, float]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": len(self._ids),
+        }
+
+
+def task_outputs(crew_output, names=CACHED_TASKS) -> Dict[str, str]:
+    """Returns ``{task name: raw output}`` of the given tasks (all if None) of a CrewOutput."""
+    return {
+        task_output.name: task_output.raw
+        for task_output in crew_output.tasks_output
+        if names is None or task_output.name in names
+    }
+
+
+def apply_cached_outputs(tasks: List, cached_outputs: Optional[Dict[str, str]]) -> List:
+    """Removes the tasks whose output is cached from a sequential task list.
+
+    The cached outputs are written to the removed tasks' output files, as if
+    they had run, and passed as context to the first task after them.
+    """
+    if not cached_outputs:
+        return tasks
+    remaining = []
+    skipped = False
+    for task in tasks:
+        if task.name not in cached_outputs:
+            if skipped:
+                context = "\n\n".join(cached_outputs.values())
+                task.description = (
+                    f"{task.description}\n\nResultados das etapas anteriores:\n{context}"
+                )
+                skipped = False
+            remaining.append(task)
+            continue
+        skipped = True
+        if task.output_file:
+            directory = os.path.dirname(task.output_file)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(task.output_file, "w", encoding="utf-8") as f:
+                f.write(cached_outputs[task.name])
+    return remaining
@@ -0,0 +1,123 @@
+import logging
+import os
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+import faiss
+import numpy as np
+from langchain_community.vectorstores import FAISS
+
+from raia_agents.tools.mmap_store import iter_documents
+from raia_agents.tools.mmr import reconstruct_vectors
+
+logger = logging.getLogger(__name__)
+
+# Keys of topicos_questao.json and the metadata fields they may be read from.
+LABEL_FIELDS = {
+    "disciplina": ("disciplina", "subject"),
+    "categoria": ("categoria", "category"),
+    "subcategoria": ("subcategoria", "subcategory"),
+}
+CLASSIFIER_METHODS = ("knn", "centroid")
+# Set RAIA_TOPIC_CLASSIFIER to "knn" or "centroid" to classify locally.
+DEFAULT_CLASSIFIER_METHOD = os.environ.get("RAIA_TOPIC_CLASSIFIER", "")
+DEFAULT_MIN_CONFIDENCE = float(os.environ.get("RAIA_TOPIC_CLASSIFIER_CONFIDENCE", "0.6"))
+
+Label = Tuple[Tuple[str, str], ...]
+
+
+def document_label(metadata: Dict) -> Optional[Label]:
+    """Returns the (key, value) pairs of the taxonomy found in ``metadata``."""
+    label = []
+    for key, fields in LABEL_FIELDS.items():
+        value = next((metadata[field] for field in fields if metadata.get(field)), None)
+        if value is not None:
+            label.append((key, str(value)))
+    return tuple(label) or None
+
+
+class TopicClassifier:
+    """Maps a request to disciplina/categoria/subcategoria without an LLM call.
+
+    The request is embedded and compared with the documents of the category
+    store. With "knn" the labels of the ``k`` nearest documents vote, weighted
+    by relevance, and the confidence is the share of the winning label. With
+    "centroid" the request goes to the most similar label centroid and the
+    confidence is its softmax probability over all centroids.
+    """
+
+    def __init__(
+        self,
+        vector_store: FAISS,
+        method: str = "knn",
+        k: int = 10,
+        min_confidence: float = DEFAULT_MIN_CONFIDENCE,
+        temperature: float = 0.02,
+    ):
+        if method not in CLASSIFIER_METHODS:
+            raise ValueError(f"Unknown method {method!r}, expected one of {CLASSIFIER_METHODS}")
+        self.vector_store = vector_store
+        self.method = method
+        self.k = k
+        self.min_confidence = min_confidence
+        self.temperature = temperature
+
+        labels: List[Optional[Label]] = [
+            document_label(doc.metadata) for doc in iter_documents(vector_store)
+        ]
+        self.labels = labels
+        if method == "centroid":
+            self._build_centroids(labels)
+
+    def _build_centroids(self, labels: List[Optional[Label]]) -> None:
+        rows_by_label = defaultdict(list)
+        for row, label in enumerate(labels):
+            if label is not None:
+                rows_by_label[label].append(row)
+        self.centroid_labels = list(rows_by_label)
+        vectors = reconstruct_vectors(self.vector_store.index, range(len(labels)))
+        centroids = np.stack(
+            [vectors[rows_by_label[label]].mean(axis=0) for label in self.centroid_labels]
+        )
+        self.centroids = centroids / np.linalg.norm(centroids, axis=1, keepdims=True)
+
+    def _embed(self, request: str) -> np.ndarray:
+        vector = self.vector_store.embedding_function.embed_query(request)
+        query = np.asarray(vector, dtype=np.float32).reshape(1, -1)
+        if self.vector_store._normalize_L2:
+            faiss.normalize_L2(query)
+        return query
+
+    def predict(self, request: str) -> Tuple[Optional[Dict[str, str]], float]:
+        """Returns the predicted topics (or None) and the confidence in [0, 1]."""
+        query = self._embed(request)
+        if self.method == "centroid":
+            similarities = self.centroids @ (query[0] / np.linalg.norm(query[0]))
+            weights = np.exp((similarities - similarities.max()) / self.temperature)
+            best = int(np.argmax(weights))
+            return dict(self.centroid_labels[best]), float(weights[best] / weights.sum())
+
+        votes: Dict[Label, float] = defaultdict(float)
+        distances, indices = self.vector_store.index.search(query, self.k)
+        relevance_score_fn = self.vector_store._select_relevance_score_fn()
+        for distance, i in zip(distances[0], indices[0]):
+            if i != -1 and self.labels[i] is not None:
+                votes[self.labels[i]] += max(relevance_score_fn(float(distance)), 0.0)
+        total = sum(votes.values())
+        if not total:
+            return None, 0.0
+        label = max(votes, key=votes.get)
+        return dict(label), votes[label] / total
+
+    def classify(self, request: str) -> Optional[Dict[str, str]]:
+        """Returns the topics when the confidence reaches ``min_confidence``, else None."""
+        topics, confidence = self.predict(request)
+        if topics is None or confidence < self.min_confidence:
+            logger.info(
+                "Topic classifier below confidence (%.2f < %.2f) for %r, using the LLM",
+                confidence,
+                self.min_confidence,
+                request,
+            )
+            return None
+        return topics
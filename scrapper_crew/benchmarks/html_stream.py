@@ -0,0 +1,150 @@
+"""
+Paragraph extraction from large pages, full BeautifulSoup parse versus streaming.
+
+A local HTTP stand-in serves pages of --page-kb kilobytes with <p> text
+spread through the document. "bs4" is what RawParagraphTool did before:
+download the whole body, build the BeautifulSoup DOM, collect the <p> tags
+and keep those within the character budget. "stream" feeds the body to
+html_stream.read_paragraphs as it downloads and stops reading at the budget
+(or at --max-bytes). For each variant the script reports latency, bytes
+downloaded, peak Python memory and the paragraphs returned.
+
+How to execute (from scrapper_crew/):
+PYTHONPATH=src python benchmarks/html_stream.py --page-kb 2048 --max-chars 10000
+"""
+
+import argparse
+import json
+import threading
+import time
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import numpy as np
+from bs4 import BeautifulSoup
+
+from raia_agents.tools.html_stream import read_paragraphs
+
+VARIANTS = ("bs4", "stream")
+
+
+def build_page(kilobytes: int) -> bytes:
+    head = "<html><head><title>Página</title><style>p { margin: 0 }</style></head><body>"
+    block = (
+        '<div class="conteudo"><nav><a href="/">Início</a> | <a href="/sobre">Sobre</a></nav>'
+        "<p>A função exponencial f(x) = a<sup>x</sup> descreve crescimentos e "
+        "decaimentos em que a taxa de variação é proporcional ao próprio valor.</p>"
+        '<table><tr><td>x</td><td>f(x)</td></tr></table><p class="nota">Exemplos: '
+        "juros compostos, decaimento radioativo e crescimento populacional.</p></div>"
+    )
+    repeats = max(kilobytes * 1024 // len(block.encode("utf-8")), 1)
+    return (head + block * repeats + "</body></html>").encode("utf-8")
+
+
+def serve(page: bytes) -> ThreadingHTTPServer:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(page)))
+            self.end_headers()
+            try:
+                for start in range(0, len(page), 16 * 1024):
+                    self.wfile.write(page[start : start + 16 * 1024])
+            except (BrokenPipeError, ConnectionResetError):
+                # The streaming client stopped reading.
+                pass
+
+        def handle(self):
+            try:
+                super().handle()
+            except ConnectionResetError:
+                pass
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def bs4_paragraphs(client: httpx.Client, url: str, max_chars: int, max_bytes: int):
+    response = client.get(url)
+    soup = BeautifulSoup(response.text, "html.parser")
+    paras, total_chars = [], 0
+    for p in soup.find_all("p"):
+        p_str = str(p)
+        if total_chars + len(p_str) > max_chars:
+            break
+        paras.append(p_str)
+        total_chars += len(p_str)
+    return paras, response.num_bytes_downloaded
+
+
+def stream_paragraphs(client: httpx.Client, url: str, max_chars: int, max_bytes: int):
+    with client.stream("GET", url) as response:
+        paras = read_paragraphs(response, max_chars=max_chars, max_bytes=max_bytes)
+        return paras, response.num_bytes_downloaded
+
+
+def measure(variant: str, url: str, args) -> dict:
+    extract = bs4_paragraphs if variant == "bs4" else stream_paragraphs
+    latencies = []
+    with httpx.Client() as client:
+        for _ in range(args.repeats):
+            start = time.perf_counter()
+            paras, downloaded = extract(client, url, args.max_chars, args.max_bytes)
+            latencies.append((time.perf_counter() - start) * 1000)
+        # Separate run: tracing allocations slows the parse down.
+        tracemalloc.start()
+        extract(client, url, args.max_chars, args.max_bytes)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    p50, p95 = np.percentile(latencies, [50, 95])
+    return {
+        "variant": variant,
+        "latency_ms_p50": float(p50),
+        "latency_ms_p95": float(p95),
+        "bytes_downloaded": downloaded,
+        "peak_memory_bytes": peak,
+        "paragraphs": len(paras),
+        "chars": sum(len(p) for p in paras),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--page-kb", type=int, default=2048)
+    parser.add_argument("--max-chars", type=int, default=10000)
+    parser.add_argument("--max-bytes", type=int, default=2 << 20)
+    parser.add_argument("--repeats", type=int, default=10)
+    parser.add_argument("--output", help="Optional JSON file for the results")
+    args = parser.parse_args()
+
+    page = build_page(args.page_kb)
+    server = serve(page)
+    url = f"http://127.0.0.1:{server.server_port}/pagina"
+    results = []
+    for variant in VARIANTS:
+        result = measure(variant, url, args)
+        results.append(result)
+        print(
+            f"{variant:>6}  p50={result['latency_ms_p50']:.1f}ms "
+            f"p95={result['latency_ms_p95']:.1f}ms  "
+            f"downloaded={result['bytes_downloaded'] / 1024:.0f}KiB  "
+            f"peak={result['peak_memory_bytes'] / (1 << 20):.1f}MiB  "
+            f"paragraphs={result['paragraphs']} chars={result['chars']}"
+        )
+    server.shutdown()
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"page_bytes": len(page), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+Network cost of scraping the same pages again, with and without PageCache.
+
+A local HTTP stand-in serves --pages HTML pages with ETag and Last-Modified
+headers and answers conditional requests with 304. The pages are scraped
+four times, each time with RawParagraphTool's streaming extraction:
+"uncached" fetches every page; "cold" fills an empty cache; "warm" reads it
+within the TTL; "revalidate" reads it with a TTL of 0, so every page is
+revalidated. The script reports wall time, requests, 200 responses and
+bytes served for each pass, and the cache counters.
+
+How to execute (from scrapper_crew/):
+PYTHONPATH=src python benchmarks/page_cache.py --pages 40 --paragraphs 300
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from raia_agents.tools.html_stream import read_paragraphs
+from raia_agents.tools.page_cache import PageCache
+from raia_agents.tools.page_fetcher import PageFetcher
+
+
+def extract(response) -> dict:
+    # Same extraction as RawParagraphTool._read (imported without crewai).
+    return {"raw_html_paragraphs": read_paragraphs(response)}
+
+
+class StandIn:
+    """Local HTTP server with validators, counting what it serves."""
+
+    def __init__(self, pages: int, paragraphs: int):
+        self.bodies = {
+            f"/pagina/{page}": (
+                "<html><body><nav>Menu</nav>"
+                + "".join(
+                    f"<p>Página {page}, parágrafo {i}: texto de apoio sobre o tema.</p>"
+                    for i in range(paragraphs)
+                )
+                + "</body></html>"
+            ).encode("utf-8")
+            for page in range(pages)
+        }
+        self.last_modified = formatdate(time.time() - 3600, usegmt=True)
+        self.counters = {"requests": 0, "ok": 0, "not_modified": 0, "bytes": 0}
+        self._lock = threading.Lock()
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                body = stand_in.bodies.get(self.path)
+                if body is None:
+                    self.send_error(404)
+                    return
+                etag = '"' + hashlib.sha256(body).hexdigest()[:16] + '"'
+                not_modified = self.headers.get("If-None-Match") == etag
+                with stand_in._lock:
+                    stand_in.counters["requests"] += 1
+                    stand_in.counters["not_modified" if not_modified else "ok"] += 1
+                    stand_in.counters["bytes"] += 0 if not_modified else len(body)
+                if not_modified:
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("ETag", etag)
+                self.send_header("Last-Modified", stand_in.last_modified)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.urls = [f"http://127.0.0.1:{self.server.server_port}{path}" for path in self.bodies]
+
+    def take_counters(self) -> dict:
+        with self._lock:
+            counters = dict(self.counters)
+            self.counters = {name: 0 for name in counters}
+        return counters
+
+
+def run_pass(name: str, stand_in: StandIn, scrape) -> dict:
+    start = time.perf_counter()
+    results = scrape(stand_in.urls)
+    seconds = time.perf_counter() - start
+    paragraphs = sum(len(result["raw_html_paragraphs"]) for result in results.values())
+    result = {"pass": name, "seconds": seconds, "paragraphs": paragraphs}
+    result.update(stand_in.take_counters())
+    print(
+        f"{name:>10}  {seconds * 1000:8.1f}ms  requests={result['requests']:<4} "
+        f"200={result['ok']:<4} 304={result['not_modified']:<4} bytes={result['bytes']}"
+    )
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pages", type=int, default=40)
+    parser.add_argument("--paragraphs", type=int, default=300, help="Paragraphs per page")
+    parser.add_argument("--output", help="Optional JSON file for the results")
+    args = parser.parse_args()
+
+    stand_in = StandIn(args.pages, args.paragraphs)
+    fetcher = PageFetcher()
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "page_cache.sqlite")
+        results.append(run_pass("uncached", stand_in, lambda urls: fetcher.fetch_many(urls, extract)))
+        cache = PageCache(fetcher, path=path)
+        results.append(
+            run_pass("cold", stand_in, lambda urls: cache.paragraphs_many(urls, extract, "bench"))
+        )
+        results.append(
+            run_pass("warm", stand_in, lambda urls: cache.paragraphs_many(urls, extract, "bench"))
+        )
+        cache.ttl_seconds = 0
+        results.append(
+            run_pass(
+                "revalidate", stand_in, lambda urls: cache.paragraphs_many(urls, extract, "bench")
+            )
+        )
+        stats = cache.stats()
+    print("Page cache:", stats)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(
+                {"pages": args.pages, "paragraphs": args.paragraphs, "results": results, "stats": stats},
+                f,
+                indent=2,
+            )
+    stand_in.server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
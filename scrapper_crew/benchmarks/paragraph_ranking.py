@@ -0,0 +1,134 @@
+"""
+Tokens handed to the LLM per scraped page, raw <p> HTML versus ranked text.
+
+A local HTTP stand-in serves a page like the educational sites the crew
+scrapes: a cookie banner and menus, on-topic paragraphs with inline markup,
+off-topic paragraphs, a repeated call to action and a footer. "raw" is the
+RawParagraphTool output in RAIA_SCRAPE_MODE=raw (every <p> as HTML);
+"ranked" is the default mode (clean text, boilerplate and repeats dropped,
+BM25-ranked against --topic within --token-budget). The script reports the
+tokens of each output and how many of the on-topic paragraphs it kept.
+
+How to execute (from scrapper_crew/):
+PYTHONPATH=src python benchmarks/paragraph_ranking.py --topic "funções exponenciais"
+"""
+
+import argparse
+import json
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from raia_agents.tools.html_stream import read_paragraphs
+from raia_agents.tools.page_fetcher import PageFetcher
+from raia_agents.tools.paragraph_ranker import approximate_tokens, clean_paragraphs, rank_pages
+
+ON_TOPIC = [
+    "A função exponencial é definida por f(x) = a elevado a x, com a positivo e diferente "
+    "de 1, e descreve grandezas que crescem ou decrescem a uma taxa proporcional ao seu valor.",
+    "Quando a base é maior que 1 a função exponencial é crescente; quando está entre 0 e 1, "
+    "ela é decrescente, e em ambos os casos o gráfico passa pelo ponto (0, 1).",
+    "Os juros compostos são um exemplo de função exponencial: um capital aplicado a uma taxa "
+    "fixa por período cresce multiplicado pelo mesmo fator a cada período.",
+    "O decaimento radioativo segue uma função exponencial decrescente, e a meia-vida é o "
+    "tempo necessário para que a quantidade de material se reduza à metade.",
+]
+OFF_TOPIC = [
+    "A Revolução Francesa começou em 1789 e marcou o fim do Antigo Regime na França, com a "
+    "queda da monarquia absolutista e a ascensão da burguesia ao poder político.",
+    "A fotossíntese é o processo pelo qual as plantas produzem glicose a partir de gás "
+    "carbônico e água, usando a energia da luz absorvida pela clorofila das folhas.",
+    "As leis de Newton descrevem a relação entre as forças que atuam sobre um corpo e o seu "
+    "movimento, sendo a base da mecânica clássica estudada no ensino médio.",
+]
+
+
+def build_page(filler: int) -> bytes:
+    def p(text, attrs=""):
+        return f'<p{attrs}>{text.replace("função", "<strong>função</strong>", 1)}</p>'
+
+    body = [
+        '<div id="cookies"><p>Usamos cookies para melhorar sua experiência. Ao continuar '
+        'navegando, você concorda com a nossa <a href="/privacidade">política de privacidade</a>.</p></div>',
+        '<header><nav><p><a href="/">Início</a> | <a href="/mat">Matemática</a> | '
+        '<a href="/bio">Biologia</a></p></nav></header><main>',
+        '<script>window.dataLayer = window.dataLayer || [];</script>',
+    ]
+    for i in range(filler):
+        body.append(p(OFF_TOPIC[i % len(OFF_TOPIC)], f' class="texto" data-i="{i}"'))
+        if i < len(ON_TOPIC):
+            body.append(p(ON_TOPIC[i], ' class="texto destaque"'))
+        body.append('<p class="cta">Assine a nossa newsletter e receba resumos de todas as matérias.</p>')
+    body.append('</main><footer><p>© 2024 Portal Educação. Todos os direitos reservados.</p></footer>')
+    return ("<html><body>" + "".join(body) + "</body></html>").encode("utf-8")
+
+
+def count_tokens(text: str) -> int:
+    try:
+        from raia_agents.tools.few_shot import tokenizer_for
+    except ImportError:
+        return approximate_tokens(text)
+    return tokenizer_for().count(text)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--topic", default="funções exponenciais")
+    parser.add_argument("--filler", type=int, default=30, help="Off-topic paragraphs")
+    parser.add_argument("--token-budget", type=int, default=1000)
+    parser.add_argument("--output", help="Optional JSON file for the results")
+    args = parser.parse_args()
+
+    page = build_page(args.filler)
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(page)))
+            self.end_headers()
+            self.wfile.write(page)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/pagina"
+    fetcher = PageFetcher()
+
+    raw = fetcher.fetch(url, read_paragraphs)
+    candidates = fetcher.fetch(
+        url, lambda response: clean_paragraphs(read_paragraphs(response, text_only=True))
+    )
+    ranked = rank_pages({url: candidates}, args.topic, args.token_budget)[url]
+    server.shutdown()
+
+    results = []
+    outputs = {"raw": {"raw_html_paragraphs": raw}, "ranked": {"paragrafos": ranked}}
+    for variant, output in outputs.items():
+        (paragraphs,) = output.values()
+        texts = [re.sub(r"<[^>]+>", "", paragraph) for paragraph in paragraphs]
+        kept = sum(any(topic in text for text in texts) for topic in ON_TOPIC)
+        result = {
+            "variant": variant,
+            "paragraphs": len(paragraphs),
+            "tokens": count_tokens(json.dumps(output, ensure_ascii=False)),
+            "on_topic_kept": kept,
+        }
+        results.append(result)
+        print(
+            f"{variant:>7}  paragraphs={result['paragraphs']:<4} tokens={result['tokens']:<6} "
+            f"on-topic kept={kept}/{len(ON_TOPIC)}"
+        )
+    print(f"token reduction: {1 - results[1]['tokens'] / results[0]['tokens']:.0%}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"topic": args.topic, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
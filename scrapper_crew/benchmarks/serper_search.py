@@ -0,0 +1,199 @@
+"""
+Web search through Serper, '-site:' operators in the query versus cached client-side filtering.
+
+A local HTTP stand-in for the Serper API answers POST /search with results
+in which sites of BlacklistSerperDevTool.DOMINIOS_BLOQUEADOS (and their
+subdomains) take many of the top slots, after --latency-ms. Like Google, it
+reads only the first 32 words of the query, so '-site:' operators past that
+limit are ignored. "site_query" is what BlacklistSerperDevTool did before:
+the question plus one '-site:' per blocked domain, num=k, no cache.
+"client" is serper_search.SerperSearch: the question as written, over-fetched
+and filtered against the blocklist, every page cached on disk. Each variant
+runs the questions --runs times, as consecutive crew runs would, and the
+script reports API calls, latency, and the allowed and blocked results
+returned per search.
+
+How to execute (from scrapper_crew/):
+PYTHONPATH=src python benchmarks/serper_search.py --runs 2 --k 10
+"""
+
+import argparse
+import ast
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from raia_agents.tools.page_fetcher import PageFetcher
+from raia_agents.tools.serper_search import DomainBlocklist, SearchCache, SerperSearch
+
+# As the agent writes them: short topics and whole reworded questions.
+QUESTIONS = [
+    "função exponencial exercícios resolvidos",
+    "revolução francesa causas e consequências",
+    "leis de newton exemplos do cotidiano",
+    "fotossíntese etapas fase clara e escura",
+    "questão de múltipla escolha estilo ENEM sobre ligações químicas iônicas, covalentes e "
+    "metálicas com gabarito comentado",
+    "explicação sobre as causas e os efeitos das mudanças climáticas e do aquecimento global "
+    "para estudantes do ensino médio",
+    "resumo do Estado Novo na Era Vargas com as principais medidas trabalhistas e a política "
+    "de industrialização",
+    "questões de vestibular sobre probabilidade condicional e eventos independentes com "
+    "resolução passo a passo",
+]
+ALLOWED_SITES = [
+    "www.gov.br",
+    "educacao.uol.com.br",
+    "www.khanacademy.org",
+    "www.preparaenem.com",
+    "www.estudopratico.com.br",
+    "querobolsa.com.br",
+    "www.colegioweb.com.br",
+    "www.stoodi.com.br",
+    "descomplica.com.br",
+    "www.sobiologia.com.br",
+]
+# Google reads only this many words of a query.
+QUERY_WORDS = 32
+
+
+def blocked_domains():
+    """DOMINIOS_BLOQUEADOS, read from Serper.py, which needs crewai_tools to import."""
+    path = os.path.join(
+        os.path.dirname(__file__), "..", "src", "raia_agents", "tools", "Serper.py"
+    )
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    for node in ast.walk(tree):
+        if isinstance(node, ast.AnnAssign) and node.target.id == "DOMINIOS_BLOQUEADOS":
+            return sorted(ast.literal_eval(node.value))
+    raise ValueError("DOMINIOS_BLOQUEADOS not found")
+
+
+def fake_results(query: str, blocked, total: int = 100):
+    """Deterministic ranking for a query; every third result is a blocked site."""
+    seed = int(hashlib.sha256(query.encode("utf-8")).hexdigest()[:8], 16)
+    results = []
+    for position in range(total):
+        if position % 3 == 0:
+            host = "pt." + blocked[(seed + position) % len(blocked)]
+        else:
+            host = ALLOWED_SITES[(seed + position) % len(ALLOWED_SITES)]
+        results.append(
+            {
+                "title": f"{query} ({position + 1})",
+                "link": f"https://{host}/{seed % 997}/{position}",
+                "snippet": f"Resultado {position + 1} para {query}.",
+            }
+        )
+    return results
+
+
+def serve(blocked, latency: float):
+    calls = {"count": 0}
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            calls["count"] += 1
+            time.sleep(latency)
+            words = payload["q"].split()[:QUERY_WORDS]
+            excluded = DomainBlocklist(
+                word[len("-site:"):] for word in words if word.startswith("-site:")
+            )
+            query = " ".join(word for word in words if not word.startswith("-site:"))
+            results = [
+                result for result in fake_results(query, blocked)
+                if not excluded.blocked(result["link"])
+            ]
+            num, page = payload.get("num", 10), payload.get("page", 1)
+            organic = results[(page - 1) * num : page * num]
+            for position, result in enumerate(organic, (page - 1) * num + 1):
+                result["position"] = position
+            body = json.dumps(
+                {"searchParameters": payload, "organic": organic, "credits": 1}
+            ).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=2)
+    parser.add_argument("--k", type=int, default=10, help="Results wanted per search")
+    parser.add_argument("--latency-ms", type=float, default=300)
+    parser.add_argument("--output", help="Optional JSON file for the results")
+    args = parser.parse_args()
+
+    blocked = blocked_domains()
+    blocklist = DomainBlocklist(blocked)
+    server, calls = serve(blocked, args.latency_ms / 1000)
+    base_url = f"http://127.0.0.1:{server.server_port}"
+    fetcher = PageFetcher()
+    exclusions = " ".join(f"-site:{domain}" for domain in blocked)
+
+    with tempfile.TemporaryDirectory() as directory:
+        client = SerperSearch(
+            fetcher, SearchCache(os.path.join(directory, "search.sqlite")), blocklist, base_url
+        )
+        variants = {
+            "site_query": lambda question: fetcher.post_json(
+                f"{base_url}/search", {"q": f"{question} {exclusions}", "num": args.k}
+            ),
+            "client": lambda question: client.search(question, args.k),
+        }
+        results = []
+        for variant, search in variants.items():
+            calls["count"] = 0
+            latencies, allowed, blocked_returned = [], [], []
+            for _ in range(args.runs):
+                for question in QUESTIONS:
+                    start = time.perf_counter()
+                    organic = search(question)["organic"]
+                    latencies.append((time.perf_counter() - start) * 1000)
+                    hits = sum(blocklist.blocked(result["link"]) for result in organic)
+                    blocked_returned.append(hits)
+                    allowed.append(len(organic) - hits)
+            result = {
+                "variant": variant,
+                "searches": len(latencies),
+                "api_calls": calls["count"],
+                "latency_ms_mean": float(np.mean(latencies)),
+                "allowed_per_search": float(np.mean(allowed)),
+                "blocked_per_search": float(np.mean(blocked_returned)),
+            }
+            results.append(result)
+            print(
+                f"{variant:>10}  searches={result['searches']} api_calls={result['api_calls']}  "
+                f"mean={result['latency_ms_mean']:.0f}ms  "
+                f"allowed/search={result['allowed_per_search']:.1f} "
+                f"blocked/search={result['blocked_per_search']:.1f}"
+            )
+        print("Search cache:", client.cache.stats())
+    server.shutdown()
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"k": args.k, "runs": args.runs, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
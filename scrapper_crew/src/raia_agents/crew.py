@@ -1,9 +1,11 @@
-from typing import List
+from typing import Dict, List, Optional
 
 from crewai import Agent, Crew, Process, Task
 from crewai.agents.agent_builder.base_agent import BaseAgent
 from crewai.project import CrewBase, agent, crew, task
-from src.raia_agents.tools.RawParagraphTool import RawParagraphTool
+from src.raia_agents.tools.RawParagraphTool import RawParagraphsBatchTool, RawParagraphTool
+from src.raia_agents.tools.request_cache import apply_cached_outputs
+from src.raia_agents.tools.task_graph import schedule_parallel
 from src.raia_agents.tools.Serper import BlacklistSerperDevTool
 
 
@@ -14,8 +16,12 @@ class RaiaAgents:
     agents: List[BaseAgent]
     tasks: List[Task]
 
-    def __init__(self, question_id: int):
+    def __init__(
+        self, question_id: int, cached_outputs: Optional[Dict[str, str]] = None
+    ):
         self.question_id = question_id
+        # Outputs of melhorar_pergunta/filtrar_topicos reused from the request cache.
+        self.cached_outputs = cached_outputs
         self.agents_config = "config/agents.yaml"
         self.tasks_config = "config/tasks.yaml"
 
@@ -40,7 +46,7 @@ class RaiaAgents:
         return Agent(
             config=self.agents_config["pesquisa_e_extracao"],
             # Substituímos SerperDevTool() por BlacklistSerperDevTool()
-            tools=[BlacklistSerperDevTool(), RawParagraphTool()],
+            tools=[BlacklistSerperDevTool(), RawParagraphTool(), RawParagraphsBatchTool()],
             verbose=True,
         )
 
@@ -113,7 +119,8 @@ class RaiaAgents:
         """Creates the RaiaAgents crew"""
         return Crew(
             agents=self.agents,  # Automatically created by the @agent decorator
-            tasks=self.tasks,  # Automatically created by the @task decorator
+            # Automatically created by the @task decorator
+            tasks=schedule_parallel(apply_cached_outputs(self.tasks, self.cached_outputs)),
             process=Process.sequential,
             verbose=True,
             output_log_file="logs.json",
@@ -2,7 +2,17 @@
 import json
 import warnings
 
+from langchain_openai import OpenAIEmbeddings
+
 from raia_agents.crew import RaiaAgents
+from src.raia_agents.tools.batch_runner import BatchRunner, print_summary
+from src.raia_agents.tools.crew_factory import CrewFactory
+from src.raia_agents.tools.embedding_cache import CachedEmbeddings
+# Same module object as the tool used by crew.py.
+from src.raia_agents.tools.RawParagraphTool import page_cache
+from src.raia_agents.tools.request_cache import SemanticRequestCache, task_outputs
+from src.raia_agents.tools.run_manifest import RunManifest, restart_requested, resume_requested
+from src.raia_agents.tools.Serper import search_cache, serper_search
 
 warnings.filterwarnings("ignore", category=SyntaxWarning, module="pysbd")
 
@@ -72,5 +82,30 @@ def run():
             }
         )
 
-    for idx, question in enumerate(inputs):
-        RaiaAgents(question_id=idx).crew().kickoff(inputs=question)
+    request_cache = SemanticRequestCache(
+        CachedEmbeddings(OpenAIEmbeddings(model="text-embedding-ada-002"))
+    )
+    # Configs, agents, LLMs and tools are built once; each question gets a copy.
+    crew_factory = CrewFactory(lambda question_id: RaiaAgents(question_id=question_id).crew())
+
+    def run_question(idx, question):
+        cached_outputs = request_cache.lookup(question["input_user"])
+        result = crew_factory.create(idx, cached_outputs).kickoff(inputs=question)
+        if cached_outputs is None:
+            request_cache.store(question["input_user"], task_outputs(result))
+        return result
+
+    # Questions already done (or running in another worker of the run) are
+    # skipped; --resume also retries the failed ones, --restart runs them all again.
+    manifest = RunManifest(strategy="scrapper")
+    manifest.enqueue(
+        {str(idx): question for idx, question in enumerate(inputs)},
+        reset=restart_requested(),
+        retry_failed=resume_requested(),
+    )
+    print_summary(BatchRunner(run_question).run(inputs, manifest=manifest))
+    print("Run manifest:", manifest.summary())
+    print("Request cache:", request_cache.stats())
+    print("Page cache:", page_cache.stats())
+    print("Search cache:", search_cache.stats())
+    print("Serper API calls:", serper_search.api_calls)
@@ -1,33 +1,129 @@
 # raw_paragraph_tool.py
-from typing import Type
+from typing import List, Type
 
 from crewai.tools import BaseTool
 from pydantic import BaseModel, Field
 
+from .html_stream import aread_paragraphs, read_paragraphs
+from .page_cache import PageCache
+from .page_fetcher import fetcher
+from .paragraph_ranker import (
+    DEFAULT_CANDIDATE_CHARS,
+    DEFAULT_MIN_WORDS,
+    DEFAULT_SCRAPE_MODE,
+    clean_paragraphs,
+    rank_pages,
+)
+
+# Pages already scraped are served from disk (see PageCache).
+page_cache = PageCache(fetcher)
+# Name the two extractions below in the page cache.
+EXTRACTOR = "raw_html_paragraphs:stream"
+TEXT_EXTRACTOR = f"text_paragraphs:stream:{DEFAULT_CANDIDATE_CHARS}:{DEFAULT_MIN_WORDS}"
+
+RAW_DESCRIPTION = (
+    "Dada uma URL, retorna todos os parágrafos <p> na íntegra, sem limpar "
+    "ou alterar nada no texto original."
+)
+RANKED_DESCRIPTION = (
+    "Dada uma URL e o tema da busca, retorna o texto dos parágrafos da página "
+    "mais relevantes para o tema, na íntegra e na ordem da página, sem menus, "
+    "avisos ou parágrafos repetidos."
+)
+RAW_BATCH_DESCRIPTION = (
+    "Dada uma lista de URLs (por exemplo, os resultados da busca), baixa as "
+    "páginas ao mesmo tempo e retorna, para cada URL, todos os parágrafos <p> "
+    "na íntegra, sem limpar ou alterar nada no texto original."
+)
+RANKED_BATCH_DESCRIPTION = (
+    "Dada uma lista de URLs (por exemplo, os resultados da busca) e o tema da "
+    "busca, baixa as páginas ao mesmo tempo e retorna, para cada URL, o texto "
+    "na íntegra dos parágrafos mais relevantes para o tema."
+)
+
+
+def _results(pages: dict) -> dict:
+    if DEFAULT_SCRAPE_MODE == "raw":
+        return {
+            url: {"erro": str(page)} if isinstance(page, Exception) else page
+            for url, page in pages.items()
+        }
+    return {
+        url: {"erro": str(page)} if isinstance(page, Exception) else {"paragrafos": page}
+        for url, page in pages.items()
+    }
+
 
 class RawParagraphInput(BaseModel):
     url: str = Field(..., description="URL da página a extrair")
+    topic: str = Field("", description="Tema da busca, usado para escolher os parágrafos")
 
 
 class RawParagraphTool(BaseTool):
     # → ANOTAÇÃO de tipo obrigatória
-    name: str = "raw_paragraphs"
-    description: str = (
-        "Dada uma URL, retorna todos os parágrafos <p> na íntegra, sem limpar "
-        "ou alterar nada no texto original."
-    )
+    name: str = "page_paragraphs"
+    description: str = RAW_DESCRIPTION if DEFAULT_SCRAPE_MODE == "raw" else RANKED_DESCRIPTION
     args_schema: Type[BaseModel] = RawParagraphInput
 
-    def _run(self, url: str) -> dict:
-        import requests
-        from bs4 import BeautifulSoup
+    # The page is parsed while it downloads (see html_stream).
+    @staticmethod
+    def _read(response) -> dict:
+        return {"raw_html_paragraphs": read_paragraphs(response)}
+
+    @staticmethod
+    async def _aread(response) -> dict:
+        return {"raw_html_paragraphs": await aread_paragraphs(response)}
+
+    # Ranked mode caches the clean paragraphs and ranks them for each topic.
+    @staticmethod
+    def _read_text(response) -> List[str]:
+        return clean_paragraphs(
+            read_paragraphs(response, max_chars=DEFAULT_CANDIDATE_CHARS, text_only=True)
+        )
+
+    @staticmethod
+    async def _aread_text(response) -> List[str]:
+        return clean_paragraphs(
+            await aread_paragraphs(response, max_chars=DEFAULT_CANDIDATE_CHARS, text_only=True)
+        )
+
+    def _run(self, url: str, topic: str = "") -> dict:
+        if DEFAULT_SCRAPE_MODE == "raw":
+            return page_cache.paragraphs(url, self._read, EXTRACTOR)
+        paragraphs = page_cache.paragraphs(url, self._read_text, TEXT_EXTRACTOR)
+        return _results(rank_pages({url: paragraphs}, topic))[url]
+
+    async def _arun(self, url: str, topic: str = "") -> dict:
+        if DEFAULT_SCRAPE_MODE == "raw":
+            return await page_cache.aparagraphs(url, self._aread, EXTRACTOR)
+        paragraphs = await page_cache.aparagraphs(url, self._aread_text, TEXT_EXTRACTOR)
+        return _results(rank_pages({url: paragraphs}, topic))[url]
+
+
+class RawParagraphsBatchInput(BaseModel):
+    urls: List[str] = Field(..., description="URLs das páginas a extrair")
+    topic: str = Field("", description="Tema da busca, usado para escolher os parágrafos")
+
+
+class RawParagraphsBatchTool(BaseTool):
+    name: str = "page_paragraphs_batch"
+    description: str = (
+        RAW_BATCH_DESCRIPTION if DEFAULT_SCRAPE_MODE == "raw" else RANKED_BATCH_DESCRIPTION
+    )
+    args_schema: Type[BaseModel] = RawParagraphsBatchInput
 
-        resp = requests.get(url)
-        resp.raise_for_status()
-        soup = BeautifulSoup(resp.text, "html.parser")
-        paras = [str(p) for p in soup.find_all("p")]
-        return {"raw_html_paragraphs": paras}
+    def _run(self, urls: List[str], topic: str = "") -> dict:
+        if DEFAULT_SCRAPE_MODE == "raw":
+            return _results(page_cache.paragraphs_many(urls, RawParagraphTool._read, EXTRACTOR))
+        pages = page_cache.paragraphs_many(urls, RawParagraphTool._read_text, TEXT_EXTRACTOR)
+        return _results(rank_pages(pages, topic))
 
-    async def _arun(self, url: str) -> dict:
-        # se seu framework chamar async
-        return self._run(url)
+    async def _arun(self, urls: List[str], topic: str = "") -> dict:
+        if DEFAULT_SCRAPE_MODE == "raw":
+            return _results(
+                await page_cache.aparagraphs_many(urls, RawParagraphTool._aread, EXTRACTOR)
+            )
+        pages = await page_cache.aparagraphs_many(
+            urls, RawParagraphTool._aread_text, TEXT_EXTRACTOR
+        )
+        return _results(rank_pages(pages, topic))
@@ -2,11 +2,18 @@ from typing import ClassVar, Set
 
 from crewai_tools import SerperDevTool
 
+from .page_fetcher import fetcher
+from .serper_search import DomainBlocklist, SearchCache, SerperSearch
+
+# Identical searches, within and across runs, are answered from disk.
+search_cache = SearchCache()
+
 
 class BlacklistSerperDevTool(SerperDevTool):
     """
-    Extensão de SerperDevTool que insere operadores '-site:' automaticamente,
-    bloqueando domínios indesejados na busca.
+    Extensão de SerperDevTool que remove dos resultados os domínios
+    bloqueados (e seus subdomínios), buscando mais resultados quando
+    necessário para devolver n_results, e guarda as respostas em cache.
     """
 
     # Lista de domínios a bloquear (sem 'https://' ou 'www.')
@@ -32,24 +39,26 @@ class BlacklistSerperDevTool(SerperDevTool):
         "mundoeducacao.uol.com.br",
         "teachy.com.br",
     }
+    # Compilada uma vez; a query enviada não leva mais operadores '-site:'.
+    BLOQUEIO: ClassVar[DomainBlocklist] = DomainBlocklist(DOMINIOS_BLOQUEADOS)
 
-    def _build_query(self, original_query: str) -> str:
-        """
-        Constrói a query final adicionando '-site:dominio' para cada domínio bloqueado.
-        """
-        exclusoes = " ".join(f"-site:{dominio}" for dominio in self.DOMINIOS_BLOQUEADOS)
-        return f"{original_query} {exclusoes}".strip()
+    def _params(self) -> dict:
+        return {
+            "search_type": getattr(self, "search_type", "search"),
+            "gl": getattr(self, "country", None),
+            "hl": getattr(self, "locale", None),
+            "location": getattr(self, "location", None),
+        }
 
-    # Sobrescrevemos o método _run para aceitar kwargs e inserir a blacklist
+    # Sobrescrevemos o método _run para aceitar kwargs e filtrar os resultados
     def _run(self, **kwargs) -> dict:
-        # Extrai a query original
-        original_query = kwargs.get("search_query", "")
-        # Insere a blacklist na query
-        query_com_blacklist = self._build_query(original_query)
-        # Chama o SerperDevTool original com a query ajustada
-        return super()._run(search_query=query_com_blacklist)
+        query = kwargs.get("search_query", "")
+        return serper_search.search(query, self.n_results, **self._params())
 
     async def _arun(self, **kwargs) -> dict:
-        original_query = kwargs.get("search_query", "")
-        query_com_blacklist = self._build_query(original_query)
-        return await super()._arun(search_query=query_com_blacklist)
+        query = kwargs.get("search_query", "")
+        return await serper_search.asearch(query, self.n_results, **self._params())
+
+
+# Shared by every tool instance, so api_calls counts the whole run.
+serper_search = SerperSearch(fetcher, search_cache, BlacklistSerperDevTool.BLOQUEIO)
@@ -0,0 +1,365 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Sequence, Tuple, Union
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from .page_fetcher import PageFetcher
+
+# Empty disables the cache.
+DEFAULT_PAGE_CACHE_PATH = os.environ.get("RAIA_PAGE_CACHE", "artifacts/page_cache.sqlite")
+# Pages younger than this are served without a request; older ones are revalidated.
+DEFAULT_TTL_SECONDS = float(os.environ.get("RAIA_PAGE_CACHE_TTL", str(24 * 3600)))
+# Size of the stored paragraphs above which the least recently used pages are evicted.
+DEFAULT_MAX_BYTES = int(float(os.environ.get("RAIA_PAGE_CACHE_MAX_MB", "200")) * (1 << 20))
+
+# Query parameters that do not change the page.
+TRACKING_PARAMS = ("utm_", "gclid", "fbclid", "mc_cid", "mc_eid")
+DEFAULT_PORTS = {"http": 80, "https": 443}
+# Read result of a 304 response: the cached value is still current.
+NOT_MODIFIED = object()
+
+
+def normalize_url(url: str) -> str:
+    """Normalizes a URL so the links to the same page share a cache key.
+
+    Scheme and host are lowercased, default ports, fragments and tracking
+    parameters are dropped and the remaining query parameters are sorted.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    query = sorted(
+        (name, value)
+        for name, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not name.lower().startswith(TRACKING_PARAMS)
+    )
+    return urlunsplit((scheme, host, parts.path or "/", urlencode(query), ""))
+
+
+def content_hash(value: str) -> str:
+    return hashlib.sha256(value.encode("utf-8")).hexdigest()
+
+
+class PageCache:
+    """On-disk cache of the paragraphs extracted from scraped pages.
+
+    Entries are keyed by extractor name and normalized URL, and hold the
+    extracted paragraphs rather than the HTML. The paragraphs are stored
+    content-addressed, so mirrors of the same page share one copy. A page
+    younger than ``ttl_seconds`` is served without a request. An older one is
+    revalidated with its ETag/Last-Modified, and a 304 renews it without
+    downloading or parsing the page again. When the revalidation fails the
+    stale copy is served. Above ``max_bytes`` the least recently used pages
+    are evicted. Responses with ``Cache-Control: no-store`` are not stored.
+    """
+
+    def __init__(
+        self,
+        fetcher: PageFetcher,
+        path: str = DEFAULT_PAGE_CACHE_PATH,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+    ):
+        self.fetcher = fetcher
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self.stale = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = None
+        if not self.enabled:
+            return
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS pages (
+                extractor TEXT NOT NULL,
+                url TEXT NOT NULL,
+                content_hash TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (extractor, url)
+            )
+            """
+        )
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS contents (
+                hash TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS pages_last_used ON pages (last_used)")
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS pages_content_hash ON pages (content_hash)"
+        )
+        self._conn.commit()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    def _lookup(self, extractor: str, key: str) -> Optional[Dict[str, Any]]:
+        if not self.enabled:
+            return None
+        with self._lock:
+            row = self._conn.execute(
+                """
+                SELECT contents.value, pages.etag, pages.last_modified, pages.fetched_at
+                FROM pages JOIN contents ON contents.hash = pages.content_hash
+                WHERE pages.extractor = ? AND pages.url = ?
+                """,
+                (extractor, key),
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            "value": json.loads(row[0]),
+            "etag": row[1],
+            "last_modified": row[2],
+            "fetched_at": row[3],
+        }
+
+    def _touch(self, extractor: str, key: str, renewed: bool) -> None:
+        now = time.time()
+        with self._lock:
+            if renewed:
+                self._conn.execute(
+                    "UPDATE pages SET fetched_at = ?, last_used = ? WHERE extractor = ? AND url = ?",
+                    (now, now, extractor, key),
+                )
+            else:
+                self._conn.execute(
+                    "UPDATE pages SET last_used = ? WHERE extractor = ? AND url = ?",
+                    (now, extractor, key),
+                )
+            self._conn.commit()
+
+    def _store(self, extractor: str, key: str, response, value: Any) -> None:
+        if "no-store" in response.headers.get("cache-control", "").lower():
+            return
+        serialized = json.dumps(value, ensure_ascii=False)
+        digest = content_hash(serialized)
+        now = time.time()
+        with self._lock:
+            replaced = self._conn.execute(
+                "SELECT content_hash FROM pages WHERE extractor = ? AND url = ?",
+                (extractor, key),
+            ).fetchone()
+            self._conn.execute(
+                "INSERT OR IGNORE INTO contents VALUES (?, ?, ?)",
+                (digest, serialized, len(serialized.encode("utf-8"))),
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    extractor,
+                    key,
+                    digest,
+                    response.headers.get("etag"),
+                    response.headers.get("last-modified"),
+                    now,
+                    now,
+                ),
+            )
+            if replaced is not None and replaced[0] != digest:
+                self._release(replaced[0])
+            self._evict()
+            self._conn.commit()
+
+    def _release(self, digest: str) -> None:
+        """Deletes the paragraphs of ``digest`` once no page refers to them."""
+        self._conn.execute(
+            "DELETE FROM contents WHERE hash = ?"
+            " AND NOT EXISTS (SELECT 1 FROM pages WHERE content_hash = ?)",
+            (digest, digest),
+        )
+
+    def _evict(self) -> None:
+        (total,) = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM contents").fetchone()
+        while total > self.max_bytes:
+            row = self._conn.execute(
+                "SELECT extractor, url, content_hash FROM pages ORDER BY last_used LIMIT 1"
+            ).fetchone()
+            if row is None:
+                break
+            self._conn.execute("DELETE FROM pages WHERE extractor = ? AND url = ?", row[:2])
+            self._release(row[2])
+            self.evictions += 1
+            (total,) = self._conn.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM contents"
+            ).fetchone()
+
+    def _fresh(self, entry: Optional[Dict[str, Any]]) -> bool:
+        return entry is not None and time.time() - entry["fetched_at"] < self.ttl_seconds
+
+    @staticmethod
+    def _conditional_headers(entry: Optional[Dict[str, Any]]) -> Dict[str, str]:
+        headers = {}
+        if entry is not None and entry["etag"]:
+            headers["If-None-Match"] = entry["etag"]
+        if entry is not None and entry["last_modified"]:
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    @staticmethod
+    def _reader(read: Callable[[Any], Any]) -> Callable[[Any], Tuple[Any, Any]]:
+        def read_page(response):
+            if response.status_code == 304:
+                return response, NOT_MODIFIED
+            return response, read(response)
+
+        return read_page
+
+    @staticmethod
+    def _areader(
+        aread: Callable[[Any], Awaitable[Any]]
+    ) -> Callable[[Any], Awaitable[Tuple[Any, Any]]]:
+        async def read_page(response):
+            if response.status_code == 304:
+                return response, NOT_MODIFIED
+            return response, await aread(response)
+
+        return read_page
+
+    def _resolve(self, extractor, key, entry, outcome) -> Any:
+        """Turns the outcome of a fetch, (response, value) or an exception, into the value."""
+        if isinstance(outcome, Exception):
+            if entry is None:
+                raise outcome
+            self.stale += 1
+            return entry["value"]
+        response, value = outcome
+        if value is NOT_MODIFIED:
+            if entry is None:
+                raise ValueError(f"{response.url} respondeu 304 sem requisição condicional")
+            self.revalidated += 1
+            self._touch(extractor, key, renewed=True)
+            return entry["value"]
+        self.misses += 1
+        if self.enabled:
+            self._store(extractor, key, response, value)
+        return value
+
+    def _cached(self, extractor: str, url: str):
+        """Returns (key, entry, fresh value or None)."""
+        key = normalize_url(url)
+        entry = self._lookup(extractor, key)
+        if self._fresh(entry):
+            self.hits += 1
+            self._touch(extractor, key, renewed=False)
+            return key, entry, entry["value"]
+        return key, entry, None
+
+    def paragraphs(self, url: str, read: Callable[[Any], Any], extractor: str) -> Any:
+        """Returns ``read(response)`` of the page, from the cache when possible.
+
+        ``read`` extracts the paragraphs from the streamed response (see
+        PageFetcher.fetch); ``extractor`` names the extraction, so tools
+        extracting differently do not share entries.
+        """
+        key, entry, value = self._cached(extractor, url)
+        if value is not None:
+            return value
+        try:
+            outcome = self.fetcher.fetch(url, self._reader(read), self._conditional_headers(entry))
+        except Exception as error:
+            outcome = error
+        return self._resolve(extractor, key, entry, outcome)
+
+    async def aparagraphs(
+        self, url: str, aread: Callable[[Any], Awaitable[Any]], extractor: str
+    ) -> Any:
+        key, entry, value = self._cached(extractor, url)
+        if value is not None:
+            return value
+        try:
+            outcome = await self.fetcher.afetch(
+                url, self._areader(aread), self._conditional_headers(entry)
+            )
+        except Exception as error:
+            outcome = error
+        return self._resolve(extractor, key, entry, outcome)
+
+    def _resolve_many(self, extractor, pending, outcomes, results) -> None:
+        for url, (key, entry) in pending.items():
+            try:
+                results[url] = self._resolve(extractor, key, entry, outcomes[url])
+            except Exception as error:
+                results[url] = error
+
+    def _split(self, urls: Sequence[str], extractor: str):
+        results: Dict[str, Any] = {}
+        pending = {}
+        for url in dict.fromkeys(urls):
+            key, entry, value = self._cached(extractor, url)
+            if value is not None:
+                results[url] = value
+            else:
+                pending[url] = (key, entry)
+        headers = {url: self._conditional_headers(entry) for url, (_, entry) in pending.items()}
+        return results, pending, headers
+
+    def paragraphs_many(
+        self, urls: Sequence[str], read: Callable[[Any], Any], extractor: str
+    ) -> Dict[str, Union[Any, Exception]]:
+        """Like ``paragraphs`` for several URLs; only the misses are fetched, concurrently."""
+        results, pending, headers = self._split(urls, extractor)
+        if pending:
+            outcomes = self.fetcher.fetch_many(list(pending), self._reader(read), headers)
+            self._resolve_many(extractor, pending, outcomes, results)
+        return {url: results[url] for url in dict.fromkeys(urls)}
+
+    async def aparagraphs_many(
+        self, urls: Sequence[str], aread: Callable[[Any], Awaitable[Any]], extractor: str
+    ) -> Dict[str, Union[Any, Exception]]:
+        results, pending, headers = self._split(urls, extractor)
+        if pending:
+            outcomes = await self.fetcher.afetch_many(list(pending), self._areader(aread), headers)
+            self._resolve_many(extractor, pending, outcomes, results)
+        return {url: results[url] for url in dict.fromkeys(urls)}
+
+    def stats(self) -> Dict[str, float]:
+        """Returns the counters of this instance and the cache size on disk.
+
+        ``hits`` were served without a request and ``revalidated`` with a 304,
+        neither downloading the page; ``stale`` were served after a failed
+        revalidation.
+        """
+        entries = size = 0
+        if self.enabled:
+            with self._lock:
+                (entries,) = self._conn.execute("SELECT COUNT(*) FROM pages").fetchone()
+                (size,) = self._conn.execute(
+                    "SELECT COALESCE(SUM(size), 0) FROM contents"
+                ).fetchone()
+        total = self.hits + self.revalidated + self.misses + self.stale
+        return {
+            "hits": self.hits,
+            "revalidated": self.revalidated,
+            "misses": self.misses,
+            "stale": self.stale,
+            "hit_rate": (self.hits + self.revalidated) / total if total else 0.0,
+            "evictions": self.evictions,
+            "entries": entries,
+            "bytes": size,
+        }
@@ -0,0 +1,272 @@
+import hashlib
+import json
+import os
+import socket
+import sqlite3
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+# One manifest may hold several runs, told apart by RAIA_RUN_ID.
+DEFAULT_MANIFEST_PATH = os.environ.get("RAIA_RUN_MANIFEST", "resultados/manifest.sqlite")
+DEFAULT_RUN_ID = os.environ.get("RAIA_RUN_ID", "default")
+# A running item whose worker stopped answering is claimed again after this.
+DEFAULT_LEASE_SECONDS = float(os.environ.get("RAIA_RUN_LEASE", "1800"))
+
+STATUSES = ("pending", "running", "done", "failed")
+
+
+def _flag(name: str, env_var: str, argv: Optional[List[str]]) -> bool:
+    argv = sys.argv[1:] if argv is None else argv
+    return name in argv or os.environ.get(env_var, "") not in ("", "0", "false")
+
+
+def resume_requested(argv: Optional[List[str]] = None) -> bool:
+    """Whether the run was started with --resume (or RAIA_RESUME=1)."""
+    return _flag("--resume", "RAIA_RESUME", argv)
+
+
+def restart_requested(argv: Optional[List[str]] = None) -> bool:
+    """Whether the run was started with --restart (or RAIA_RESTART=1)."""
+    return _flag("--restart", "RAIA_RESTART", argv)
+
+
+def input_hash(value: Any) -> str:
+    if not isinstance(value, str):
+        value = json.dumps(value, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(value.encode("utf-8")).hexdigest()
+
+
+def default_worker() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+
+
+def worker_alive(worker: Optional[str]) -> bool:
+    """Whether the process of a default_worker() name may still be running.
+
+    Only processes on this host can be checked; the others are assumed
+    alive, and their items come back when the lease expires.
+    """
+    host, _, rest = (worker or "").partition(":")
+    pid = rest.partition(":")[0]
+    if host != socket.gethostname() or not pid.isdigit():
+        return True
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class RunManifest:
+    """Per-item status of a batch run, in SQLite, doubling as a work queue.
+
+    Each item (a question id) records its status, the hash of its input, the
+    strategy, attempts, timings, token usage, error and an optional JSON
+    result. Workers take items with ``claim``, which is atomic across threads
+    and processes sharing the file, so several workers can drain one run.
+    An item whose input hash changed is queued again.
+    """
+
+    def __init__(
+        self,
+        path: str = DEFAULT_MANIFEST_PATH,
+        run_id: str = DEFAULT_RUN_ID,
+        strategy: str = "",
+        lease_seconds: float = DEFAULT_LEASE_SECONDS,
+    ):
+        self.path = path
+        self.run_id = run_id
+        self.strategy = strategy
+        self.lease_seconds = lease_seconds
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Autocommit mode: transactions are opened explicitly with BEGIN IMMEDIATE.
+        self._conn = sqlite3.connect(
+            path, timeout=60, check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS items (
+                run_id TEXT NOT NULL,
+                item_id TEXT NOT NULL,
+                strategy TEXT NOT NULL,
+                input_hash TEXT NOT NULL,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                worker TEXT,
+                started_at REAL,
+                finished_at REAL,
+                seconds REAL,
+                requests INTEGER,
+                tokens INTEGER,
+                error TEXT,
+                result TEXT,
+                PRIMARY KEY (run_id, item_id)
+            )
+            """
+        )
+
+    def _transaction(self, statements):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = statements(self._conn)
+                self._conn.execute("COMMIT")
+                return result
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def enqueue(
+        self, inputs: Dict[str, Any], reset: bool = False, retry_failed: bool = False
+    ) -> None:
+        """Adds the items ``{item id: input}`` without disturbing the run's progress.
+
+        New items and items whose input changed are queued, as are running
+        ones whose process died. Done and running items are otherwise kept,
+        so a worker joining a run shared with others repeats nothing. With
+        ``retry_failed`` failed items are queued again (the --resume
+        behavior); ``reset`` queues every item again (--restart).
+        """
+
+        def statements(conn):
+            for item_id, value in inputs.items():
+                digest = input_hash(value)
+                row = conn.execute(
+                    "SELECT input_hash, status, worker FROM items"
+                    " WHERE run_id = ? AND item_id = ?",
+                    (self.run_id, str(item_id)),
+                ).fetchone()
+                if row is None:
+                    conn.execute(
+                        "INSERT INTO items (run_id, item_id, strategy, input_hash, status)"
+                        " VALUES (?, ?, ?, ?, 'pending')",
+                        (self.run_id, str(item_id), self.strategy, digest),
+                    )
+                elif (
+                    reset
+                    or row[0] != digest
+                    or (retry_failed and row[1] == "failed")
+                    or (row[1] == "running" and not worker_alive(row[2]))
+                ):
+                    conn.execute(
+                        "UPDATE items SET input_hash = ?, strategy = ?, status = 'pending',"
+                        " attempts = CASE WHEN ? THEN 0 ELSE attempts END, error = NULL"
+                        " WHERE run_id = ? AND item_id = ?",
+                        (digest, self.strategy, reset, self.run_id, str(item_id)),
+                    )
+
+        self._transaction(statements)
+
+    def requeue(self, item_ids) -> None:
+        """Queues the given items again, whatever their status."""
+        self._transaction(
+            lambda conn: conn.executemany(
+                "UPDATE items SET status = 'pending', error = NULL"
+                " WHERE run_id = ? AND item_id = ?",
+                [(self.run_id, str(item_id)) for item_id in item_ids],
+            )
+        )
+
+    def claim(self, worker: Optional[str] = None) -> Optional[str]:
+        """Marks the next pending item (or one whose lease expired) as running.
+
+        Returns its id, or None when the run has nothing left to do. Items that
+        fail stay failed until an ``enqueue`` with ``retry_failed``.
+        """
+        now = time.time()
+
+        def statements(conn):
+            row = conn.execute(
+                """
+                SELECT item_id FROM items
+                WHERE run_id = ? AND (
+                    status = 'pending' OR (status = 'running' AND started_at < ?)
+                )
+                ORDER BY CAST(item_id AS INTEGER), item_id
+                LIMIT 1
+                """,
+                (self.run_id, now - self.lease_seconds),
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE items SET status = 'running', worker = ?, started_at = ?,"
+                " attempts = attempts + 1 WHERE run_id = ? AND item_id = ?",
+                (worker or default_worker(), now, self.run_id, row[0]),
+            )
+            return row[0]
+
+        return self._transaction(statements)
+
+    def complete(
+        self,
+        item_id: str,
+        seconds: Optional[float] = None,
+        requests: Optional[int] = None,
+        tokens: Optional[int] = None,
+        result: Any = None,
+    ) -> None:
+        self._finish(item_id, "done", seconds, requests, tokens, None, result)
+
+    def fail(self, item_id: str, error: BaseException, seconds: Optional[float] = None) -> None:
+        error_text = f"{type(error).__name__}: {error}"
+        self._finish(item_id, "failed", seconds, None, None, error_text, None)
+
+    def _finish(self, item_id, status, seconds, requests, tokens, error, result) -> None:
+        self._transaction(
+            lambda conn: conn.execute(
+                "UPDATE items SET status = ?, finished_at = ?, seconds = ?, requests = ?,"
+                " tokens = ?, error = ?, result = ? WHERE run_id = ? AND item_id = ?",
+                (
+                    status,
+                    time.time(),
+                    seconds,
+                    requests,
+                    tokens,
+                    error,
+                    None if result is None else json.dumps(result, ensure_ascii=False),
+                    self.run_id,
+                    str(item_id),
+                ),
+            )
+        )
+
+    def items(self, status: Optional[str] = None) -> List[Dict[str, Any]]:
+        query = "SELECT * FROM items WHERE run_id = ?"
+        params: tuple = (self.run_id,)
+        if status is not None:
+            query += " AND status = ?"
+            params += (status,)
+        with self._lock:
+            cursor = self._conn.execute(
+                query + " ORDER BY CAST(item_id AS INTEGER), item_id", params
+            )
+            columns = [column[0] for column in cursor.description]
+            rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+        for row in rows:
+            if row["result"] is not None:
+                row["result"] = json.loads(row["result"])
+        return rows
+
+    def summary(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT status, COUNT(*), COALESCE(SUM(tokens), 0) FROM items"
+                " WHERE run_id = ? GROUP BY status",
+                (self.run_id,),
+            ).fetchall()
+        summary = {status: 0 for status in STATUSES}
+        summary["tokens"] = 0
+        for status, count, tokens in rows:
+            summary[status] = count
+            summary["tokens"] += tokens
+        return summary
@@ -0,0 +1,298 @@
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+from urllib.parse import urlsplit
+
+from .page_fetcher import PageFetcher
+
+DEFAULT_SERPER_URL = os.environ.get("RAIA_SERPER_URL", "https://google.serper.dev")
+# Empty disables the cache.
+DEFAULT_SEARCH_CACHE_PATH = os.environ.get("RAIA_SEARCH_CACHE", "artifacts/search_cache.sqlite")
+# Responses younger than this are served without calling the API.
+DEFAULT_TTL_SECONDS = float(os.environ.get("RAIA_SEARCH_CACHE_TTL", str(7 * 24 * 3600)))
+# Results requested per page, as a multiple of the results wanted, to make up for blocked ones.
+DEFAULT_OVERFETCH = float(os.environ.get("RAIA_SEARCH_OVERFETCH", "2"))
+# Pages requested at most when the blocked results still leave too few.
+DEFAULT_MAX_PAGES = int(os.environ.get("RAIA_SEARCH_MAX_PAGES", "3"))
+
+# Largest "num" Serper accepts.
+MAX_RESULTS_PER_PAGE = 100
+# Key of the result list in the response of each search type ("news" -> "news", ...).
+RESULT_KEYS = {"search": "organic"}
+
+
+def normalize_query(query: str) -> str:
+    """Normalizes a query so the same search typed differently shares a cache key.
+
+    Unicode is composed (NFC), case is folded and whitespace collapsed;
+    accents are kept, since the search engine may rank them differently.
+    """
+    return " ".join(unicodedata.normalize("NFC", query).casefold().split())
+
+
+class DomainBlocklist:
+    """Matches URLs whose host is a blocked domain or one of its subdomains.
+
+    The domains are kept in a set, so a lookup checks each suffix of the
+    host ("pt.wikipedia.org", "wikipedia.org", "org") instead of every
+    blocked domain.
+    """
+
+    def __init__(self, domains: Iterable[str]):
+        self.domains = frozenset(self._host(domain) for domain in domains)
+
+    @staticmethod
+    def _host(value: str) -> str:
+        value = value.strip().lower()
+        host = urlsplit(value if "//" in value else f"//{value}").hostname or ""
+        return host.rstrip(".")
+
+    def blocked(self, url: str) -> bool:
+        labels = self._host(url).split(".")
+        return any(".".join(labels[i:]) in self.domains for i in range(len(labels)))
+
+
+class SearchCache:
+    """On-disk cache of search API responses, keyed by request.
+
+    A response younger than ``ttl_seconds`` is served without a call. When
+    the call for an older one fails (quota, outage), the stale copy is
+    served instead.
+    """
+
+    def __init__(
+        self, path: str = DEFAULT_SEARCH_CACHE_PATH, ttl_seconds: float = DEFAULT_TTL_SECONDS
+    ):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self._lock = threading.Lock()
+        self._conn = None
+        if not self.enabled:
+            return
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS searches (
+                key TEXT PRIMARY KEY,
+                response TEXT NOT NULL,
+                fetched_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    @staticmethod
+    def key(endpoint: str, payload: Dict[str, Any]) -> str:
+        payload = dict(payload, q=normalize_query(payload.get("q", "")))
+        return json.dumps([endpoint, payload], sort_keys=True, ensure_ascii=False)
+
+    def _lookup(self, key: str) -> Optional[Dict[str, Any]]:
+        if not self.enabled:
+            return None
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, fetched_at FROM searches WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {"value": json.loads(row[0]), "fetched_at": row[1]}
+
+    def _store(self, key: str, value: Any) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO searches VALUES (?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), time.time()),
+            )
+            self._conn.commit()
+
+    def _fresh(self, entry: Optional[Dict[str, Any]]) -> bool:
+        return entry is not None and time.time() - entry["fetched_at"] < self.ttl_seconds
+
+    def _resolve(self, key: str, entry: Optional[Dict[str, Any]], outcome: Any) -> Any:
+        if isinstance(outcome, Exception):
+            if entry is None:
+                raise outcome
+            self.stale += 1
+            return entry["value"]
+        self.misses += 1
+        self._store(key, outcome)
+        return outcome
+
+    def get(self, key: str, request: Callable[[], Any]) -> Any:
+        """Returns the cached response for ``key``, calling ``request()`` when needed."""
+        entry = self._lookup(key)
+        if self._fresh(entry):
+            self.hits += 1
+            return entry["value"]
+        try:
+            outcome = request()
+        except Exception as error:
+            outcome = error
+        return self._resolve(key, entry, outcome)
+
+    async def aget(self, key: str, arequest: Callable[[], Awaitable[Any]]) -> Any:
+        entry = self._lookup(key)
+        if self._fresh(entry):
+            self.hits += 1
+            return entry["value"]
+        try:
+            outcome = await arequest()
+        except Exception as error:
+            outcome = error
+        return self._resolve(key, entry, outcome)
+
+    def stats(self) -> Dict[str, float]:
+        entries = 0
+        if self.enabled:
+            with self._lock:
+                (entries,) = self._conn.execute("SELECT COUNT(*) FROM searches").fetchone()
+        total = self.hits + self.misses + self.stale
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale": self.stale,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": entries,
+        }
+
+
+class SerperSearch:
+    """Serper client that filters blocked domains out of the results.
+
+    Blocked results are removed after the call rather than with '-site:'
+    operators in the query, so the query stays as the agent wrote it (and
+    as the cache key). Each page asks for ``overfetch`` times the results
+    wanted; while blocked results leave fewer than ``k``, the next page is
+    requested, up to ``max_pages``. Every page goes through ``cache``.
+    """
+
+    def __init__(
+        self,
+        fetcher: PageFetcher,
+        cache: SearchCache,
+        blocklist: DomainBlocklist,
+        base_url: str = DEFAULT_SERPER_URL,
+        overfetch: float = DEFAULT_OVERFETCH,
+        max_pages: int = DEFAULT_MAX_PAGES,
+    ):
+        self.fetcher = fetcher
+        self.cache = cache
+        self.blocklist = blocklist
+        self.base_url = base_url.rstrip("/")
+        self.overfetch = max(overfetch, 1.0)
+        self.max_pages = max(max_pages, 1)
+        self.api_calls = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _headers() -> Dict[str, str]:
+        return {
+            "X-API-KEY": os.environ.get("SERPER_API_KEY", ""),
+            "Content-Type": "application/json",
+        }
+
+    def _count_call(self) -> None:
+        with self._lock:
+            self.api_calls += 1
+
+    def _page_size(self, k: int) -> int:
+        return min(math.ceil(k * self.overfetch), MAX_RESULTS_PER_PAGE)
+
+    @staticmethod
+    def _payload(query: str, num: int, page: int, params: Dict[str, Any]) -> Dict[str, Any]:
+        payload = {"q": query, "num": num}
+        payload.update((name, value) for name, value in params.items() if value)
+        if page > 1:
+            payload["page"] = page
+        return payload
+
+    def _allowed(self, results: List[Any]) -> List[Any]:
+        return [
+            result
+            for result in results
+            if not (isinstance(result, dict) and self.blocklist.blocked(result.get("link", "")))
+        ]
+
+    def _merge(self, responses: List[Dict[str, Any]], result_key: str, k: int) -> Dict[str, Any]:
+        """The first response with the allowed results of every page, cut to ``k``.
+
+        Other link lists (peopleAlsoAsk, topStories, ...) are filtered too.
+        """
+        merged = {
+            name: self._allowed(value) if isinstance(value, list) else value
+            for name, value in responses[0].items()
+        }
+        links = set()
+        results = []
+        for response in responses:
+            for result in self._allowed(response.get(result_key, [])):
+                link = result.get("link") if isinstance(result, dict) else None
+                if link in links:
+                    continue
+                links.add(link)
+                results.append(result)
+        merged[result_key] = results[:k]
+        return merged
+
+    def _done(self, responses, result_key: str, k: int, num: int) -> bool:
+        results = responses[-1].get(result_key, [])
+        allowed = sum(len(self._allowed(response.get(result_key, []))) for response in responses)
+        # A short page is the last one.
+        return allowed >= k or len(results) < num or len(responses) >= self.max_pages
+
+    def search(self, query: str, k: int = 10, search_type: str = "search", **params) -> dict:
+        """Returns Serper's response for ``query`` with at most ``k`` allowed results.
+
+        ``params`` are passed on to the API (gl, hl, location, ...).
+        """
+        endpoint = f"{self.base_url}/{search_type}"
+        result_key = RESULT_KEYS.get(search_type, search_type)
+        num = self._page_size(k)
+        responses = []
+        while True:
+            payload = self._payload(query, num, len(responses) + 1, params)
+
+            def request():
+                self._count_call()
+                return self.fetcher.post_json(endpoint, payload, self._headers())
+
+            responses.append(self.cache.get(self.cache.key(endpoint, payload), request))
+            if self._done(responses, result_key, k, num):
+                return self._merge(responses, result_key, k)
+
+    async def asearch(
+        self, query: str, k: int = 10, search_type: str = "search", **params
+    ) -> dict:
+        endpoint = f"{self.base_url}/{search_type}"
+        result_key = RESULT_KEYS.get(search_type, search_type)
+        num = self._page_size(k)
+        responses = []
+        while True:
+            payload = self._payload(query, num, len(responses) + 1, params)
+
+            async def arequest():
+                self._count_call()
+                return await self.fetcher.apost_json(endpoint, payload, self._headers())
+
+            responses.append(await self.cache.aget(self.cache.key(endpoint, payload), arequest))
+            if self._done(responses, result_key, k, num):
+                return self._merge(responses, result_key, k)
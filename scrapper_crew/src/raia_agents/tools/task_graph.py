@@ -0,0 +1,85 @@
+import os
+from typing import Dict, List
+
+# Set RAIA_PARALLEL_TASKS=0 to keep running the tasks one after the other.
+DEFAULT_PARALLEL_TASKS = os.environ.get("RAIA_PARALLEL_TASKS", "1") not in ("", "0", "false")
+
+
+def task_dependencies(tasks: List) -> Dict[int, List[int]]:
+    """Returns, for each task position, the positions of the tasks it depends on.
+
+    A task whose ``context`` is set (in tasks.yaml or in crew.py; ``context: []``
+    declares an independent task) depends on those tasks. Without ``context``
+    crewAI hands it the outputs of every previous task, so it depends on all of
+    them. Context tasks missing from ``tasks`` (e.g. skipped by the request
+    cache) are ignored.
+    """
+    positions = {id(task): i for i, task in enumerate(tasks)}
+    dependencies = {}
+    for i, task in enumerate(tasks):
+        if isinstance(task.context, list):
+            dependencies[i] = sorted(
+                positions[id(context)] for context in task.context if id(context) in positions
+            )
+        else:
+            dependencies[i] = list(range(i))
+    return dependencies
+
+
+def task_levels(tasks: List) -> List[List]:
+    """Groups the tasks into levels that can run at the same time.
+
+    A task goes one level after its latest dependency, and further down when
+    its agent already has a task in that level (an agent runs one task at a
+    time). Tasks keep their declaration order inside a level.
+    """
+    dependencies = task_dependencies(tasks)
+    level_of: Dict[int, int] = {}
+    agents_in_level: Dict[int, set] = {}
+    for i, task in enumerate(tasks):
+        level = max((level_of[j] + 1 for j in dependencies[i]), default=0)
+        while id(task.agent) in agents_in_level.get(level, set()):
+            level += 1
+        level_of[i] = level
+        agents_in_level.setdefault(level, set()).add(id(task.agent))
+    levels = [[] for _ in range(max(level_of.values(), default=-1) + 1)]
+    for i, task in enumerate(tasks):
+        levels[level_of[i]].append(task)
+    return levels
+
+
+def schedule_parallel(tasks: List, enabled: bool = DEFAULT_PARALLEL_TASKS) -> List:
+    """Orders the tasks of a sequential crew so independent tasks run concurrently.
+
+    It relies on crewAI's async tasks: a run of ``async_execution`` tasks
+    starts at once and the next synchronous task waits for all of them. The
+    first level runs fully async; in the others the first task is synchronous,
+    which is the barrier that waits for the previous level, and the rest are
+    async. Only one async task may end the crew, so the extra ones of the
+    last level stay synchronous.
+
+    Each task's ``context`` is set to its dependencies in declaration order, so
+    every task receives the same context, in the same order, whatever the
+    completion order of the concurrent ones.
+    """
+    if not enabled or len(tasks) <= 1:
+        return tasks
+    dependencies = task_dependencies(tasks)
+    for i, task in enumerate(tasks):
+        task.context = [tasks[j] for j in dependencies[i]]
+
+    levels = task_levels(tasks)
+    scheduled = []
+    for number, level in enumerate(levels):
+        for position, task in enumerate(level):
+            task.async_execution = len(level) > 1 and (number == 0 or position > 0)
+        scheduled.extend(level)
+
+    trailing_async = 0
+    for task in reversed(scheduled):
+        if not task.async_execution:
+            break
+        trailing_async += 1
+    for task in scheduled[len(scheduled) - trailing_async : -1]:
+        task.async_execution = False
+    return scheduled